@@ -9,6 +9,7 @@ from .. import likelihoods
 from .. import kern
 from ..inference.latent_function_inference import exact_gaussian_inference, expectation_propagation
 from ..util.normalizer import Standardize
+from ..util import profiling
 from paramz import ObsAr
 
 import logging
@@ -181,6 +182,114 @@ class GP(Model):
         """
         self.set_XY(Y=Y)
 
+    def _can_update_incrementally(self):
+        """
+        Whether the posterior can be updated incrementally when data is
+        appended or removed (exact Gaussian inference on fixed inputs).
+        """
+        inf = self.inference_method
+        return (isinstance(inf, exact_gaussian_inference.ExactGaussianInference)
+                and not isinstance(inf, expectation_propagation.EPBase)
+                and isinstance(self.likelihood, likelihoods.Gaussian)
+                and self.normalizer is None
+                and self.Y_metadata is None
+                and isinstance(self.X, ObsAr) and self.X not in self.parameters
+                and self.posterior is not None
+                and self.posterior.woodbury_chol.ndim == 2)
+
+    def _update_data_incrementally(self, X, Y, update):
+        """
+        Set the data to X, Y and the inference results to update(X, Y),
+        without recomputing the full inference.
+        """
+        self.X = ObsAr(X)
+        self.Y = ObsAr(Y)
+        self.Y_normalized = self.Y
+        self.num_data = self.X.shape[0]
+        self.posterior, self._log_marginal_likelihood, self.grad_dict = update(self.X, self.Y_normalized)
+        self.likelihood.update_gradients(self.grad_dict['dL_dthetaL'])
+        self.kern.update_gradients_full(self.grad_dict['dL_dK'], self.X)
+        if self.mean_function is not None:
+            self.mean_function.update_gradients(self.grad_dict['dL_dm'], self.X)
+
+    def append_data(self, X_new, Y_new, max_num_data=None):
+        """
+        Append new observations to the model.
+
+        For exact Gaussian inference, the Cholesky factor of the covariance is
+        extended blockwise, so that only the kernel between the old and new
+        inputs has to be computed. This costs O(N^2) per appended point,
+        instead of the O(N^3) refactorisation done by set_XY. For all other
+        models this falls back to set_XY.
+
+        :param X_new: new input observations
+        :type X_new: np.ndarray (Nnew x self.input_dim)
+        :param Y_new: new output observations
+        :type Y_new: np.ndarray (Nnew x self.output_dim)
+        :param int max_num_data: if given, drop the oldest observations
+            afterwards (see remove_oldest_data), such that at most max_num_data
+            observations are kept (sliding window).
+        """
+        assert X_new.ndim == 2 and Y_new.ndim == 2 and X_new.shape[0] == Y_new.shape[0]
+        X = np.vstack((np.asarray(self.X), X_new))
+        Y = np.vstack((np.asarray(self.Y), Y_new))
+        if X_new.shape[0] > 0:
+            if self._can_update_incrementally():
+                posterior = self.posterior
+                self._update_data_incrementally(X, Y,
+                    lambda X, Y: self.inference_method.inference_append(posterior, self.kern, X, self.likelihood, Y, X_new.shape[0], self.mean_function, self.Y_metadata))
+            else:
+                self.set_XY(X, Y)
+        if max_num_data is not None and self.num_data > max_num_data:
+            self.remove_oldest_data(self.num_data - max_num_data)
+
+    def remove_oldest_data(self, num):
+        """
+        Remove the first num observations from the model.
+
+        For exact Gaussian inference the Cholesky factor of the covariance is
+        downdated in O(N^2 num), without any kernel evaluations. For all other
+        models this falls back to set_XY.
+
+        :param int num: number of observations to remove
+        """
+        assert 0 <= num < self.num_data, "can only remove between 0 and num_data-1 observations"
+        if num == 0:
+            return
+        X = np.asarray(self.X)[num:]
+        Y = np.asarray(self.Y)[num:]
+        if self._can_update_incrementally():
+            posterior = self.posterior
+            self._update_data_incrementally(X, Y,
+                lambda X, Y: self.inference_method.inference_remove_leading(posterior, X, self.likelihood, Y, num, self.mean_function, self.Y_metadata))
+        else:
+            self.set_XY(X, Y)
+
+    #: :class:`~GPy.util.profiling.Profiler` recording the model updates, see enable_profiling
+    profiler = None
+
+    def enable_profiling(self):
+        """
+        Record timings of the inference, kernel, kernel gradient, likelihood
+        gradient and Cholesky phases of every model update, and the hit/miss
+        counts of the kernel caches.
+
+        :returns: the :class:`~GPy.util.profiling.Profiler`, also available as self.profiler
+        """
+        if self.profiler is None:
+            self.profiler = profiling.Profiler()
+            self.profiler.instrument_caches(self)
+        return self.profiler
+
+    def disable_profiling(self):
+        """
+        Stop recording. Returns the profiler with the timings recorded so far.
+        """
+        profiler, self.profiler = self.profiler, None
+        if profiler is not None:
+            profiler.uninstrument_caches()
+        return profiler
+
     def parameters_changed(self):
         """
         Method that is called upon any changes to :class:`~GPy.core.parameterization.param.Param` variables within the model.
@@ -190,11 +299,23 @@ class GP(Model):
             This method is not designed to be called manually, the framework is set up to automatically call this method upon changes to parameters, if you call
             this method yourself, there may be unexpected consequences.
         """
-        self.posterior, self._log_marginal_likelihood, self.grad_dict = self.inference_method.inference(self.kern, self.X, self.likelihood, self.Y_normalized, self.mean_function, self.Y_metadata)
-        self.likelihood.update_gradients(self.grad_dict['dL_dthetaL'])
+        with profiling.activate(self.profiler):
+            with profiling.phase('inference'):
+                self.posterior, self._log_marginal_likelihood, self.grad_dict = self.inference_method.inference(self.kern, self.X, self.likelihood, self.Y_normalized, self.mean_function, self.Y_metadata)
+            with profiling.phase('likelihood_gradient'):
+                self.likelihood.update_gradients(self.grad_dict['dL_dthetaL'])
+            self._update_kern_gradients()
+            if self.mean_function is not None:
+                self.mean_function.update_gradients(self.grad_dict['dL_dm'], self.X)
+        if self.profiler is not None:
+            self.profiler.instrument_caches(self)
+
+    def _update_kern_gradients(self):
+        """
+        Set the gradients of the kernel parameters from the gradients in
+        self.grad_dict, which the inference method returned.
+        """
         self.kern.update_gradients_full(self.grad_dict['dL_dK'], self.X)
-        if self.mean_function is not None:
-            self.mean_function.update_gradients(self.grad_dict['dL_dm'], self.X)
 
     def log_likelihood(self):
         """
@@ -220,7 +341,71 @@ class GP(Model):
             mu += self.mean_function.f(Xnew)
         return mu, var
 
-    def predict(self, Xnew, full_cov=False, Y_metadata=None, kern=None, likelihood=None, include_likelihood=True):
+    def _predict_in_batches(self, predict, Xnew, Y_metadata, kern=None, batch_size=None, out=None, n_jobs=1):
+        """
+        Evaluate predict(Xnew[s], Y_metadata[s], kern) for consecutive row
+        blocks s of Xnew with at most batch_size rows, and write the results
+        into out.
+
+        predict has to return a sequence of arrays with one row per input.
+        Entries of Y_metadata with one row per input are sliced alongside Xnew.
+        If out is None, the output arrays are allocated from the first block.
+
+        If n_jobs > 1, the blocks are distributed over a pool of n_jobs
+        threads (numpy and LAPACK release the GIL). Each thread works on its
+        own copy of the kernel, as kernels keep state while slicing inputs and
+        caching. Every block is written to its own rows of out, so the result
+        does not depend on the scheduling of the threads.
+        """
+        if kern is None:
+            kern = self.kern
+        if isinstance(Xnew, VariationalPosterior):
+            # uncertain inputs cannot be sliced by rows
+            return predict(Xnew, Y_metadata, kern)
+        Xnew = np.asarray(Xnew)
+        N = Xnew.shape[0]
+        n_jobs = max(1, min(n_jobs, N))
+        if batch_size is None:
+            batch_size = max(int(np.ceil(N / float(n_jobs))), 1)
+        slices = [slice(start, min(start + batch_size, N)) for start in range(0, N, batch_size)]
+
+        def predict_block(s, kern):
+            if Y_metadata is not None:
+                Y_metadata_s = dict((k, v[s] if isinstance(v, np.ndarray) and v.ndim > 0 and v.shape[0] == N else v) for k, v in Y_metadata.items())
+            else:
+                Y_metadata_s = None
+            return predict(Xnew[s], Y_metadata_s, kern)
+
+        def write_block(s, res):
+            for o, r in zip(out, res):
+                o[s] = r
+
+        if out is None and len(slices) > 0:
+            # allocate from the first block:
+            s = slices.pop(0) if n_jobs == 1 else slice(0, 1)
+            res = predict_block(s, kern)
+            out = [np.empty((N,) + r.shape[1:]) for r in res]
+            write_block(s, res)
+
+        if n_jobs > 1 and len(slices) > 1:
+            from multiprocessing.pool import ThreadPool
+            def predict_blocks(job_slices):
+                job_kern = kern.copy()
+                for s in job_slices:
+                    write_block(s, predict_block(s, job_kern))
+            jobs = [slices[i::n_jobs] for i in range(n_jobs)]
+            pool = ThreadPool(n_jobs)
+            try:
+                pool.map(predict_blocks, jobs)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for s in slices:
+                write_block(s, predict_block(s, kern))
+        return out
+
+    def predict(self, Xnew, full_cov=False, Y_metadata=None, kern=None, likelihood=None, include_likelihood=True, batch_size=None, out=None, n_jobs=1):
         """
         Predict the function(s) at the new point(s) Xnew. This includes the likelihood
         variance added to the predicted underlying function (usually referred to as f).
@@ -237,6 +422,13 @@ class GP(Model):
         :param kern: The kernel to use for prediction (defaults to the model
                      kern). this is useful for examining e.g. subprocesses.
         :param bool include_likelihood: Whether or not to add likelihood noise to the predicted underlying latent function f.
+        :param int batch_size: if given, predict in blocks of at most
+            batch_size rows of Xnew, so that the memory for the N x batch_size
+            kernel between the data and Xnew is bounded (only for full_cov=False).
+        :param out: preallocated (mean, var) arrays (e.g. np.memmap) of shape
+            Nnew x self.output_dim to write the (batched) predictions into.
+        :param int n_jobs: number of threads to predict blocks of rows of Xnew
+            in parallel (only for full_cov=False).
 
         :returns: (mean, var):
             mean: posterior mean, a Numpy array, Nnew x self.input_dim
@@ -247,6 +439,12 @@ class GP(Model):
 
         Note: If you want the predictive quantiles (e.g. 95% confidence interval) use :py:func:"~GPy.core.gp.GP.predict_quantiles".
         """
+        if batch_size is not None or out is not None or n_jobs > 1:
+            assert not full_cov, "batched prediction is only possible for full_cov=False"
+            return tuple(self._predict_in_batches(
+                lambda X, Y_metadata, kern: GP.predict(self, X, False, Y_metadata, kern, likelihood, include_likelihood),
+                Xnew, Y_metadata, kern, batch_size, out, n_jobs))
+
         #predict the latent function values
         mu, var = self._raw_predict(Xnew, full_cov=full_cov, kern=kern)
 
@@ -261,7 +459,7 @@ class GP(Model):
 
         return mu, var
 
-    def predict_noiseless(self,  Xnew, full_cov=False, Y_metadata=None, kern=None):
+    def predict_noiseless(self,  Xnew, full_cov=False, Y_metadata=None, kern=None, batch_size=None, out=None, n_jobs=1):
         """
         Convenience function to predict the underlying function of the GP (often
         referred to as f) without adding the likelihood variance on the
@@ -277,6 +475,9 @@ class GP(Model):
         :param Y_metadata: metadata about the predicting point to pass to the likelihood
         :param kern: The kernel to use for prediction (defaults to the model
                      kern). this is useful for examining e.g. subprocesses.
+        :param int batch_size: if given, predict in blocks of at most batch_size rows of Xnew (see predict).
+        :param out: preallocated (mean, var) arrays to write the predictions into (see predict).
+        :param int n_jobs: number of threads to predict with (see predict).
 
         :returns: (mean, var):
             mean: posterior mean, a Numpy array, Nnew x self.input_dim
@@ -287,9 +488,9 @@ class GP(Model):
 
         Note: If you want the predictive quantiles (e.g. 95% confidence interval) use :py:func:"~GPy.core.gp.GP.predict_quantiles".
         """
-        return self.predict(Xnew, full_cov, Y_metadata, kern, None, False)
+        return self.predict(Xnew, full_cov, Y_metadata, kern, None, False, batch_size=batch_size, out=out, n_jobs=n_jobs)
 
-    def predict_quantiles(self, X, quantiles=(2.5, 97.5), Y_metadata=None, kern=None, likelihood=None):
+    def predict_quantiles(self, X, quantiles=(2.5, 97.5), Y_metadata=None, kern=None, likelihood=None, batch_size=None, n_jobs=1):
         """
         Get the predictive quantiles around the prediction at X
 
@@ -299,9 +500,16 @@ class GP(Model):
         :type quantiles: tuple
         :param kern: optional kernel to use for prediction
         :type predict_kw: dict
+        :param int batch_size: if given, predict in blocks of at most batch_size rows of X (see predict).
+        :param int n_jobs: number of threads to predict with (see predict).
         :returns: list of quantiles for each X and predictive quantiles for interval combination
         :rtype: [np.ndarray (Xnew x self.output_dim), np.ndarray (Xnew x self.output_dim)]
         """
+        if batch_size is not None or n_jobs > 1:
+            return self._predict_in_batches(
+                lambda X, Y_metadata, kern: GP.predict_quantiles(self, X, quantiles, Y_metadata, kern, likelihood),
+                X, Y_metadata, kern, batch_size, n_jobs=n_jobs)
+
         m, v = self._raw_predict(X,  full_cov=False, kern=kern)
         if likelihood is None:
             likelihood = self.likelihood
@@ -468,7 +676,7 @@ class GP(Model):
                 mag[n] = np.sqrt(np.linalg.det(G[n, :, :]))
         return mag
 
-    def posterior_samples_f(self,X, size=10, full_cov=True, **predict_kwargs):
+    def posterior_samples_f(self,X, size=10, full_cov=True, n_jobs=1, **predict_kwargs):
         """
         Samples the posterior GP at the points X.
 
@@ -478,10 +686,16 @@ class GP(Model):
         :type size: int.
         :param full_cov: whether to return the full covariance matrix, or just the diagonal.
         :type full_cov: bool.
+        :param int n_jobs: number of threads to predict with (only for full_cov=False, see predict).
         :returns: fsim: set of simulations
         :rtype: np.ndarray (D x N x samples) (if D==1 we flatten out the first dimension)
         """
-        m, v = self._raw_predict(X,  full_cov=full_cov, **predict_kwargs)
+        if n_jobs > 1 and not full_cov:
+            m, v = self._predict_in_batches(
+                lambda X, Y_metadata, kern: self._raw_predict(X, full_cov=False, kern=kern),
+                X, None, predict_kwargs.get('kern', None), n_jobs=n_jobs)
+        else:
+            m, v = self._raw_predict(X,  full_cov=full_cov, **predict_kwargs)
         if self.normalizer is not None:
             m, v = self.normalizer.inverse_mean(m), self.normalizer.inverse_variance(v)
 
@@ -494,7 +708,7 @@ class GP(Model):
         if self.output_dim == 1:
             return sim_one_dim(m, v)
         else:
-            fsim = np.empty((self.output_dim, self.num_data, size))
+            fsim = np.empty((self.output_dim, X.shape[0], size))
             for d in range(self.output_dim):
                 if full_cov and v.ndim == 3:
                     fsim[d] = sim_one_dim(m[:, d], v[:, :, d])
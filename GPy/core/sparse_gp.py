@@ -4,8 +4,9 @@
 import numpy as np
 from .gp import GP
 from .parameterization.param import Param
-from ..inference.latent_function_inference import var_dtc
+from ..inference.latent_function_inference import var_dtc, laplace
 from .. import likelihoods
+from ..util import profiling
 from GPy.core.parameterization.variational import VariationalPosterior
 
 import logging
@@ -46,8 +47,7 @@ class SparseGP(GP):
             if isinstance(likelihood, likelihoods.Gaussian):
                 inference_method = var_dtc.VarDTC(limit=3)
             else:
-                #inference_method = ??
-                raise NotImplementedError("what to do what to do?")
+                inference_method = laplace.LaplaceDTC()
             print(("defaulting to ", inference_method, "for latent function inference"))
 
         self.Z = Param('inducing inputs', Z)
@@ -74,11 +74,16 @@ class SparseGP(GP):
         if trigger_update: self.update_model(True)
 
     def parameters_changed(self):
-        self.posterior, self._log_marginal_likelihood, self.grad_dict = self.inference_method.inference(self.kern, self.X, self.Z, self.likelihood, self.Y, self.Y_metadata)
-        self._update_gradients()
+        with profiling.activate(self.profiler):
+            with profiling.phase('inference'):
+                self.posterior, self._log_marginal_likelihood, self.grad_dict = self.inference_method.inference(self.kern, self.X, self.Z, self.likelihood, self.Y, self.Y_metadata)
+            self._update_gradients()
+        if self.profiler is not None:
+            self.profiler.instrument_caches(self)
 
     def _update_gradients(self):
-        self.likelihood.update_gradients(self.grad_dict['dL_dthetaL'])
+        with profiling.phase('likelihood_gradient'):
+            self.likelihood.update_gradients(self.grad_dict['dL_dthetaL'])
 
         if isinstance(self.X, VariationalPosterior):
             #gradients wrt kernel
@@ -2,14 +2,16 @@
 # Licensed under the BSD 3-clause license (see LICENSE.txt)
 
 import numpy as np
-from ..util import choleskies
+from ..util import choleskies, linalg
 from .sparse_gp import SparseGP
 from .parameterization.param import Param
 from ..inference.latent_function_inference.svgp import SVGP as svgp_inf
+from ..inference.optimization.stochastics import Adam
+from ..util.minibatch import ArrayBatches, Prefetcher
 
 
 class SVGP(SparseGP):
-    def __init__(self, X, Y, Z, kernel, likelihood, mean_function=None, name='SVGP', Y_metadata=None, batchsize=None, num_latent_functions=None):
+    def __init__(self, X, Y, Z, kernel, likelihood, mean_function=None, name='SVGP', Y_metadata=None, batchsize=None, num_latent_functions=None, batches=None, num_data=None, prefetch=0):
         """
         Stochastic Variational GP.
 
@@ -17,22 +19,39 @@ class SVGP(SparseGP):
 
         Gaussian Processes for Big data, Hensman, Fusi and Lawrence, UAI 2013,
 
-        But without natural gradients. We'll use the lower-triangluar
-        representation of the covariance matrix to ensure
-        positive-definiteness.
+        We'll use the lower-triangluar representation of the covariance
+        matrix to ensure positive-definiteness. Natural gradient steps for
+        q(u) are available through natural_gradient_step and
+        optimize_stochastic.
 
         For Non Gaussian Likelihoods, this implements
 
         Hensman, Matthews and Ghahramani, Scalable Variational GP Classification, ArXiv 1411.2005
+
+        :param batchsize: draw minibatches of this size from X and Y
+        :param batches: minibatch source instead of X and Y (which can be None),
+            an iterator of (X_batch, Y_batch), see :mod:`GPy.util.minibatch`.
+            Use this for data which does not fit into memory.
+        :param num_data: total number of data, needed for batches without a
+            num_data attribute
+        :param prefetch: number of minibatches to load ahead in a background
+            thread, which stops when the model is collected (or on
+            model.batches.close())
         """
         self.batchsize = batchsize
         self.X_all, self.Y_all = X, Y
-        if batchsize is None:
+        if batches is None and batchsize is not None:
+            batches = ArrayBatches(X, Y, batchsize)
+        if batches is None:
             X_batch, Y_batch = X, Y
+            self.total_num_data = X.shape[0]
+            self.batches = None
         else:
-            import climin.util
-            #Make a climin slicer to make drawing minibatches much quicker
-            self.slicer = climin.util.draw_mini_slices(self.X_all.shape[0], self.batchsize)
+            if num_data is None:
+                assert hasattr(batches, 'num_data'), "need the total number of data (num_data) to scale the minibatches"
+                num_data = batches.num_data
+            self.total_num_data = num_data
+            self.batches = Prefetcher(batches, prefetch) if prefetch else batches
             X_batch, Y_batch = self.new_batch()
 
         #create the SVI inference method
@@ -43,7 +62,7 @@ class SVGP(SparseGP):
 
         #assume the number of latent functions is one per col of Y unless specified
         if num_latent_functions is None:
-            num_latent_functions = Y.shape[1]
+            num_latent_functions = Y_batch.shape[1]
 
         self.m = Param('q_u_mean', np.zeros((self.num_inducing, num_latent_functions)))
         chol = choleskies.triang_to_flat(np.tile(np.eye(self.num_inducing)[None,:,:], (num_latent_functions, 1,1)))
@@ -52,7 +71,7 @@ class SVGP(SparseGP):
         self.link_parameter(self.m)
 
     def parameters_changed(self):
-        self.posterior, self._log_marginal_likelihood, self.grad_dict = self.inference_method.inference(self.q_u_mean, self.q_u_chol, self.kern, self.X, self.Z, self.likelihood, self.Y, self.mean_function, self.Y_metadata, KL_scale=1.0, batch_scale=float(self.X_all.shape[0])/float(self.X.shape[0]))
+        self.posterior, self._log_marginal_likelihood, self.grad_dict = self.inference_method.inference(self.q_u_mean, self.q_u_chol, self.kern, self.X, self.Z, self.likelihood, self.Y, self.mean_function, self.Y_metadata, KL_scale=1.0, batch_scale=float(self.total_num_data)/float(self.X.shape[0]))
 
         #update the kernel gradients
         self.kern.update_gradients_full(self.grad_dict['dL_dKmm'], self.Z)
@@ -87,15 +106,96 @@ class SVGP(SparseGP):
 
     def new_batch(self):
         """
-        Return a new batch of X and Y by taking a chunk of data from the complete X and Y
+        Return the next minibatch of X and Y from the minibatch source
+        (all data if there is none)
         """
-        i = next(self.slicer)
-        return self.X_all[i], self.Y_all[i]
+        if self.batches is None:
+            return self.X_all, self.Y_all
+        return next(self.batches)
 
     def stochastic_grad(self, parameters):
         self.set_data(*self.new_batch())
         return self._grads(parameters)
 
+    def optimize_stochastic(self, max_iters=1000, step_rate=1e-2, natgrad_step_rate=None, callback=None, **adam_kwargs):
+        """
+        Optimize the model with Adam, using a new minibatch for every gradient.
+        Does not need climin.
+
+        :param max_iters: number of minibatches/steps
+        :param step_rate: Adam step rate
+        :param natgrad_step_rate: if given, q(u) is updated by natural gradient
+            steps of this size (see natural_gradient_step) and Adam only
+            optimizes the hyperparameters
+        :param callback: called as callback(model, iteration) after every step,
+            return True to stop the optimization
+        """
+        opt = Adam(step_rate, **adam_kwargs)
+        x = self.optimizer_array.copy()
+        if natgrad_step_rate is not None:
+            index_m, index_chol = self._optimizer_index(self.m), self._optimizer_index(self.chol)
+        for it in range(max_iters):
+            g = self.stochastic_grad(x)
+            if natgrad_step_rate is None:
+                x = opt.step(x, g)
+            else:
+                # Adam only moves the hyperparameters, q(u) takes a natural gradient step
+                g[index_m] = 0.
+                g[index_chol] = 0.
+                x = opt.step(x, g)
+                mean, chol = self._natural_gradient(natgrad_step_rate)
+                x[index_m], x[index_chol] = mean.ravel(), chol.ravel()
+            if callback is not None and callback(self, it):
+                break
+        self.optimizer_array = x
+
+    def _optimizer_index(self, param):
+        """
+        Indices of the (untransformed) param in the optimizer array
+        """
+        assert not param.is_fixed, "{} is fixed".format(param.name)
+        index = np.zeros(self.size, dtype=bool)
+        index[self._raveled_index_for(param)] = True
+        if self._has_fixes():
+            index = index[self._fixes_]
+        return np.nonzero(index)[0]
+
+    def _natural_gradient(self, step_rate):
+        """
+        The variational parameters after a natural gradient step on q(u) of
+        size step_rate, using the gradients of the current batch.
+
+        The step is taken in the natural parameters (S^-1 m, -S^-1/2) of
+        q(u) = N(m, S), where the natural gradient is the gradient with respect
+        to the expectation parameters (m, S + m m^T). With a Gaussian
+        likelihood and all data in the batch a step of size 1 gives the
+        optimal q(u).
+        """
+        dL_dm, dL_dS = self.grad_dict['dL_dm'], self.grad_dict['dL_dS']
+        m = self.m.values
+        L = choleskies.flat_to_triang(self.chol.values)
+        mean, chol = np.empty_like(m), np.empty_like(L)
+        for i in range(L.shape[0]):
+            Si, _ = linalg.dpotri(L[i])
+            theta1 = Si.dot(m[:,i]) + step_rate*(dL_dm[:,i] - 2.*dL_dS[i].dot(m[:,i]))
+            Lprec = linalg.jitchol(Si - 2.*step_rate*dL_dS[i])
+            S, _ = linalg.dpotri(Lprec)
+            mean[:,i] = S.dot(theta1)
+            chol[i] = linalg.jitchol(S)
+        return mean, choleskies.triang_to_flat(chol)
+
+    def natural_gradient_step(self, step_rate=1.):
+        """
+        Update q(u) by a natural gradient step of size step_rate, using the
+        gradients of the current batch. See optimize_stochastic for combining
+        these steps with Adam on the hyperparameters.
+        """
+        mean, chol = self._natural_gradient(step_rate)
+        self.update_model(False)
+        self.m[:] = mean
+        self.chol[:] = chol
+        self.update_model(True)
+
     def optimizeWithFreezingZ(self):
         self.Z.fix()
         self.kern.fix()
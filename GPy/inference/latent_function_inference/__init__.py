@@ -62,7 +62,8 @@ class InferenceMethodList(LatentFunctionInference, list):
             self.append(inf)
 
 from .exact_gaussian_inference import ExactGaussianInference
-from .laplace import Laplace,LaplaceBlock
+from .kronecker_gaussian_inference import KroneckerGaussianInference
+from .laplace import Laplace,LaplaceBlock,LaplaceDTC
 from GPy.inference.latent_function_inference.var_dtc import VarDTC
 from .expectation_propagation import EP, EPDTC
 from .dtc import DTC
@@ -2,7 +2,7 @@
 # Licensed under the BSD 3-clause license (see LICENSE.txt)
 
 from .posterior import PosteriorExact as Posterior
-from ...util.linalg import pdinv, dpotrs, tdot
+from ...util.linalg import pdinv, dpotrs, dpotri, tdot, chol_append, chol_remove_leading
 from ...util import diag
 import numpy as np
 from . import LatentFunctionInference
@@ -44,6 +44,15 @@ class ExactGaussianInference(LatentFunctionInference):
 
         Wi, LW, LWi, W_logdet = pdinv(Ky)
 
+        return self._inference_from_chol(K, LW, Wi, likelihood, Y, YYT_factor, Y_metadata, Z_tilde)
+
+    def _inference_from_chol(self, K, LW, Wi, likelihood, Y, YYT_factor, Y_metadata=None, Z_tilde=None):
+        """
+        Compute the posterior, log marginal and gradients from the Cholesky
+        factor LW and inverse Wi of Ky = K + Sigma.
+        """
+        W_logdet = 2.*np.sum(np.log(np.diag(LW)))
+
         alpha, _ = dpotrs(LW, YYT_factor, lower=1)
 
         log_marginal =  0.5*(-Y.size * log_2_pi - Y.shape[1] * W_logdet - np.sum(alpha * YYT_factor))
@@ -58,7 +67,81 @@ class ExactGaussianInference(LatentFunctionInference):
 
         dL_dthetaL = likelihood.exact_inference_gradients(np.diag(dL_dK), Y_metadata)
 
-        return Posterior(woodbury_chol=LW, woodbury_vector=alpha, K=K), log_marginal, {'dL_dK':dL_dK, 'dL_dthetaL':dL_dthetaL, 'dL_dm':alpha}
+        return Posterior(woodbury_chol=LW, woodbury_vector=alpha, K=K, woodbury_inv=Wi), log_marginal, {'dL_dK':dL_dK, 'dL_dthetaL':dL_dthetaL, 'dL_dm':alpha}
+
+    def inference_append(self, posterior, kern, X, likelihood, Y, num_new, mean_function=None, Y_metadata=None):
+        """
+        Returns the posterior for X, Y, given the posterior of all but the
+        last num_new rows of X and Y.
+
+        Instead of refactorising Ky, the Cholesky factor and inverse of the
+        given posterior are extended blockwise, so only the new kernel rows
+        kern.K(X_old, X_new) and kern.K(X_new) have to be computed. This costs
+        O(N^2 num_new) instead of O(N^3).
+        """
+        X_old, X_new = X[:-num_new], X[-num_new:]
+        K_old, LW_old, Wi_old = posterior._K, posterior.woodbury_chol, posterior.woodbury_inv
+
+        if mean_function is None:
+            m = 0
+        else:
+            m = mean_function.f(X)
+
+        precision = likelihood.gaussian_variance(Y_metadata)
+        if np.size(precision) > 1:
+            precision = precision[-num_new:]
+
+        K_on = kern.K(X_old, X_new)
+        K_nn = kern.K(X_new)
+        K = np.empty((X.shape[0], X.shape[0]))
+        K[:-num_new, :-num_new] = K_old
+        K[:-num_new, -num_new:] = K_on
+        K[-num_new:, :-num_new] = K_on.T
+        K[-num_new:, -num_new:] = K_nn
+
+        Ky_nn = K_nn.copy()
+        diag.add(Ky_nn, precision+1e-8)
+
+        LW = chol_append(LW_old, K_on, Ky_nn)
+
+        # block inverse with the Schur complement S = L22 L22^T:
+        # [[Wi + G S^-1 G^T, -G S^-1], [-S^-1 G^T, S^-1]],  G = Wi K_on
+        Si, _ = dpotri(np.asfortranarray(LW[-num_new:, -num_new:]), lower=1)
+        G = np.dot(Wi_old, K_on)
+        GSi = np.dot(G, Si)
+        Wi = np.empty_like(K)
+        Wi[:-num_new, :-num_new] = Wi_old + np.dot(GSi, G.T)
+        Wi[:-num_new, -num_new:] = -GSi
+        Wi[-num_new:, :-num_new] = -GSi.T
+        Wi[-num_new:, -num_new:] = Si
+
+        return self._inference_from_chol(K, LW, Wi, likelihood, Y, Y-m, Y_metadata)
+
+    def inference_remove_leading(self, posterior, X, likelihood, Y, num_removed, mean_function=None, Y_metadata=None):
+        """
+        Returns the posterior for X, Y, given the posterior of X and Y with
+        num_removed additional rows in front (e.g. the oldest observations of
+        a sliding window).
+
+        The Cholesky factor and inverse of the given posterior are downdated
+        in O(N^2 num_removed), no kernel evaluations are needed.
+        """
+        K_old, LW_old, Wi_old = posterior._K, posterior.woodbury_chol, posterior.woodbury_inv
+
+        if mean_function is None:
+            m = 0
+        else:
+            m = mean_function.f(X)
+
+        K = K_old[num_removed:, num_removed:].copy()
+        LW = chol_remove_leading(LW_old, num_removed)
+
+        # inverse of the trailing block: Wi22 - Wi21 Wi11^-1 Wi12
+        Wi11i, _, _, _ = pdinv(Wi_old[:num_removed, :num_removed])
+        Wi21 = Wi_old[num_removed:, :num_removed]
+        Wi = Wi_old[num_removed:, num_removed:] - np.dot(np.dot(Wi21, Wi11i), Wi21.T)
+
+        return self._inference_from_chol(K, LW, Wi, likelihood, Y, Y-m, Y_metadata)
 
     def LOO(self, kern, X, Y, likelihood, posterior, Y_metadata=None, K=None):
         """
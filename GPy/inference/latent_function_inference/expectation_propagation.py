@@ -9,7 +9,7 @@ from ...util import diag
 log_2_pi = np.log(2*np.pi)
 
 class EPBase(object):
-    def __init__(self, epsilon=1e-6, eta=1., delta=1., always_reset=False):
+    def __init__(self, epsilon=1e-6, eta=1., delta=1., always_reset=False, parallel_updates=False):
         """
         The expectation-propagation algorithm.
         For nomenclature see Rasmussen & Williams 2006.
@@ -22,11 +22,18 @@ class EPBase(object):
         :type delta: float64
         :param always_reset: setting to always reset the approximation at the beginning of every inference call.
         :type always_reest: boolean
+        :param parallel_updates: update all sites at once in every sweep
+            (vectorized moment matching, one Cholesky refresh per sweep),
+            instead of one site after another. Consider damping (delta < 1)
+            for this mode. Both modes iterate until convergence and reach the
+            same approximation, up to epsilon.
+        :type parallel_updates: boolean
 
         """
         super(EPBase, self).__init__()
         self.always_reset = always_reset
         self.epsilon, self.eta, self.delta = epsilon, eta, delta
+        self.parallel_updates = parallel_updates
         self.reset()
 
     def reset(self):
@@ -42,11 +49,12 @@ class EPBase(object):
 
     def __setstate__(self, state):
         super(EPBase, self).__setstate__(state[0])
-        self.epsilon, self.eta, self.delta = state[1]
+        self.epsilon, self.eta, self.delta = state[1][:3]
+        self.parallel_updates = state[1][3] if len(state[1]) > 3 else False
         self.reset()
 
     def __getstate__(self):
-        return [super(EPBase, self).__getstate__() , [self.epsilon, self.eta, self.delta]]
+        return [super(EPBase, self).__getstate__() , [self.epsilon, self.eta, self.delta, self.parallel_updates]]
 
 class EP(EPBase, ExactGaussianInference):
     def inference(self, kern, X, likelihood, Y, mean_function=None, Y_metadata=None, precision=None, K=None):
@@ -105,29 +113,40 @@ class EP(EPBase, ExactGaussianInference):
         v_tilde_old = np.nan
         iterations = 0
         while (tau_diff > self.epsilon) or (v_diff > self.epsilon):
-            update_order = np.random.permutation(num_data)
-            for i in update_order:
+            if self.parallel_updates:
                 #Cavity distribution parameters
-                tau_cav[i] = 1./Sigma[i,i] - self.eta*tau_tilde[i]
-                v_cav[i] = mu[i]/Sigma[i,i] - self.eta*v_tilde[i]
-                if Y_metadata is not None:
-                    # Pick out the relavent metadata for Yi
-                    Y_metadata_i = {}
-                    for key in Y_metadata.keys():
-                        Y_metadata_i[key] = Y_metadata[key][i, :]
-                else:
-                    Y_metadata_i = None
+                Sigma_diag = np.diag(Sigma)
+                tau_cav = 1./Sigma_diag - self.eta*tau_tilde
+                v_cav = mu/Sigma_diag - self.eta*v_tilde
                 #Marginal moments
-                Z_hat[i], mu_hat[i], sigma2_hat[i] = likelihood.moments_match_ep(Y[i], tau_cav[i], v_cav[i], Y_metadata_i=Y_metadata_i)
+                Z_hat, mu_hat, sigma2_hat = likelihood.moments_match_ep_vectorized(Y, tau_cav, v_cav, Y_metadata=Y_metadata)
                 #Site parameters update
-                delta_tau = self.delta/self.eta*(1./sigma2_hat[i] - 1./Sigma[i,i])
-                delta_v = self.delta/self.eta*(mu_hat[i]/sigma2_hat[i] - mu[i]/Sigma[i,i])
-                tau_tilde[i] += delta_tau
-                v_tilde[i] += delta_v
-                #Posterior distribution parameters update
-                ci = delta_tau/(1.+ delta_tau*Sigma[i,i])
-                DSYR(Sigma, Sigma[:,i].copy(), -ci)
-                mu = np.dot(Sigma, v_tilde)
+                tau_tilde += self.delta/self.eta*(1./sigma2_hat - 1./Sigma_diag)
+                v_tilde += self.delta/self.eta*(mu_hat/sigma2_hat - mu/Sigma_diag)
+            else:
+                update_order = np.random.permutation(num_data)
+                for i in update_order:
+                    #Cavity distribution parameters
+                    tau_cav[i] = 1./Sigma[i,i] - self.eta*tau_tilde[i]
+                    v_cav[i] = mu[i]/Sigma[i,i] - self.eta*v_tilde[i]
+                    if Y_metadata is not None:
+                        # Pick out the relavent metadata for Yi
+                        Y_metadata_i = {}
+                        for key in Y_metadata.keys():
+                            Y_metadata_i[key] = Y_metadata[key][i, :]
+                    else:
+                        Y_metadata_i = None
+                    #Marginal moments
+                    Z_hat[i], mu_hat[i], sigma2_hat[i] = likelihood.moments_match_ep(Y[i], tau_cav[i], v_cav[i], Y_metadata_i=Y_metadata_i)
+                    #Site parameters update
+                    delta_tau = self.delta/self.eta*(1./sigma2_hat[i] - 1./Sigma[i,i])
+                    delta_v = self.delta/self.eta*(mu_hat[i]/sigma2_hat[i] - mu[i]/Sigma[i,i])
+                    tau_tilde[i] += delta_tau
+                    v_tilde[i] += delta_v
+                    #Posterior distribution parameters update
+                    ci = delta_tau/(1.+ delta_tau*Sigma[i,i])
+                    DSYR(Sigma, Sigma[:,i].copy(), -ci)
+                    mu = np.dot(Sigma, v_tilde)
 
             #(re) compute Sigma and mu using full Cholesky decompy
             tau_tilde_root = np.sqrt(tau_tilde)
@@ -222,54 +241,58 @@ class EPDTC(EPBase, VarDTC):
         update_order = np.random.permutation(num_data)
 
         while (tau_diff > self.epsilon) or (v_diff > self.epsilon):
-            for i in update_order:
+            if self.parallel_updates:
                 #Cavity distribution parameters
-                tau_cav[i] = 1./Sigma_diag[i] - self.eta*tau_tilde[i]
-                v_cav[i] = mu[i]/Sigma_diag[i] - self.eta*v_tilde[i]
+                tau_cav = 1./Sigma_diag - self.eta*tau_tilde
+                v_cav = mu/Sigma_diag - self.eta*v_tilde
                 #Marginal moments
-                Z_hat[i], mu_hat[i], sigma2_hat[i] = likelihood.moments_match_ep(Y[i], tau_cav[i], v_cav[i])#, Y_metadata=None)#=(None if Y_metadata is None else Y_metadata[i]))
+                Z_hat, mu_hat, sigma2_hat = likelihood.moments_match_ep_vectorized(Y, tau_cav, v_cav, Y_metadata=Y_metadata)
                 #Site parameters update
-                delta_tau = self.delta/self.eta*(1./sigma2_hat[i] - 1./Sigma_diag[i])
-                delta_v = self.delta/self.eta*(mu_hat[i]/sigma2_hat[i] - mu[i]/Sigma_diag[i])
-                tau_tilde[i] += delta_tau
-                v_tilde[i] += delta_v
-                #Posterior distribution parameters update
-
-                #DSYR(Sigma, Sigma[:,i].copy(), -delta_tau/(1.+ delta_tau*Sigma[i,i]))
-                DSYR(LLT,Kmn[:,i].copy(),delta_tau)
-                L = jitchol(LLT+np.eye(LLT.shape[0])*1e-7)
-
-                V,info = dtrtrs(L,Kmn,lower=1)
-                Sigma_diag = np.sum(V*V,-2)
-                si = np.sum(V.T*V[:,i],-1)
-                mu += (delta_v-delta_tau*mu[i])*si
-                #mu = np.dot(Sigma, v_tilde)
+                tau_tilde += self.delta/self.eta*(1./sigma2_hat - 1./Sigma_diag)
+                v_tilde += self.delta/self.eta*(mu_hat/sigma2_hat - mu/Sigma_diag)
+            else:
+                for i in update_order:
+                    #Cavity distribution parameters
+                    tau_cav[i] = 1./Sigma_diag[i] - self.eta*tau_tilde[i]
+                    v_cav[i] = mu[i]/Sigma_diag[i] - self.eta*v_tilde[i]
+                    #Marginal moments
+                    Z_hat[i], mu_hat[i], sigma2_hat[i] = likelihood.moments_match_ep(Y[i], tau_cav[i], v_cav[i])#, Y_metadata=None)#=(None if Y_metadata is None else Y_metadata[i]))
+                    #Site parameters update
+                    delta_tau = self.delta/self.eta*(1./sigma2_hat[i] - 1./Sigma_diag[i])
+                    delta_v = self.delta/self.eta*(mu_hat[i]/sigma2_hat[i] - mu[i]/Sigma_diag[i])
+                    tau_tilde[i] += delta_tau
+                    v_tilde[i] += delta_v
+                    #Posterior distribution parameters update
+
+                    #DSYR(Sigma, Sigma[:,i].copy(), -delta_tau/(1.+ delta_tau*Sigma[i,i]))
+                    DSYR(LLT,Kmn[:,i].copy(),delta_tau)
+                    L = jitchol(LLT+np.eye(LLT.shape[0])*1e-7)
+
+                    V,info = dtrtrs(L,Kmn,lower=1)
+                    Sigma_diag = np.sum(V*V,-2)
+                    si = np.sum(V.T*V[:,i],-1)
+                    mu += (delta_v-delta_tau*mu[i])*si
+                    #mu = np.dot(Sigma, v_tilde)
 
             #(re) compute Sigma and mu using full Cholesky decompy
             LLT = LLT0 + np.dot(Kmn*tau_tilde[None,:],Kmn.T)
             #diag.add(LLT, 1e-8)
             L = jitchol(LLT)
             V, _ = dtrtrs(L,Kmn,lower=1)
-            V2, _ = dtrtrs(L.T,V,lower=0)
-            #Sigma_diag = np.sum(V*V,-2)
-            #Knmv_tilde = np.dot(Kmn,v_tilde)
-            #mu = np.dot(V2.T,Knmv_tilde)
-            Sigma = np.dot(V2.T,V2)
-            mu = np.dot(Sigma,v_tilde)
+            # Sigma = V^T V, only its diagonal is needed for the next sweep
+            Sigma_diag = np.sum(V*V,-2)
+            mu = np.dot(V.T, np.dot(V, v_tilde))
 
             #monitor convergence
-            #if iterations>0:
             tau_diff = np.mean(np.square(tau_tilde-tau_tilde_old))
             v_diff = np.mean(np.square(v_tilde-v_tilde_old))
 
             tau_tilde_old = tau_tilde.copy()
             v_tilde_old = v_tilde.copy()
-
-            # Only to while loop once:?
-            tau_diff = 0
-            v_diff = 0
             iterations += 1
 
+        Sigma = np.dot(V.T,V)
+
         mu_tilde = v_tilde/tau_tilde
         mu_cav = v_cav/tau_cav
         sigma2_sigma2tilde = 1./tau_cav + 1./tau_tilde
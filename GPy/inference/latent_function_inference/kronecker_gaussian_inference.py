@@ -0,0 +1,134 @@
+# Copyright (c) 2016, GPy authors (see AUTHORS.txt).
+# Licensed under the BSD 3-clause license (see LICENSE.txt)
+
+import numpy as np
+from .posterior import PosteriorKronecker
+from .exact_gaussian_inference import ExactGaussianInference
+log_2_pi = np.log(2*np.pi)
+
+def icm_parts(kern):
+    """
+    Split an intrinsic coregionalization kernel k(x, x') B (see
+    GPy.util.multioutput.ICM) into its parts.
+
+    :returns: (k, coregionalize part), or None if kern is not a product of
+        one kernel on the inputs and one Coregionalize kernel on the output index
+    """
+    from ...kern import Prod, Coregionalize
+    if not isinstance(kern, Prod) or len(kern.parts) != 2:
+        return None
+    kx, coreg = kern.parts
+    if isinstance(kx, Coregionalize):
+        kx, coreg = coreg, kx
+    if not isinstance(coreg, Coregionalize) or isinstance(kx, Coregionalize):
+        return None
+    if np.intersect1d(kx._all_dims_active, coreg._all_dims_active).size > 0:
+        return None
+    return kx, coreg
+
+def kronecker_rows(kern, X):
+    """
+    Find the Kronecker structure of the data of an ICM model: all outputs
+    observed at the same inputs.
+
+    :returns: rows (num_outputs x N) such that X[rows[p]] are the data of
+        output p, sorted by input so that X[rows[p]] and X[rows[q]] have the
+        same inputs, or None if the outputs do not share their inputs
+    """
+    parts = icm_parts(kern)
+    if parts is None:
+        return None
+    kx, coreg = parts
+    X = np.asarray(X)
+    index = X[:, coreg._all_dims_active[0]].astype(int)
+    counts = np.bincount(index, minlength=coreg.output_dim)
+    if counts.size != coreg.output_dim or np.any(counts != counts[0]):
+        return None
+    Xx = X[:, kx._all_dims_active]
+    rows = np.lexsort(tuple(Xx.T[::-1]) + (index,)).reshape(coreg.output_dim, counts[0])
+    Xx = Xx[rows]
+    if not np.all(Xx == Xx[:1]):
+        return None
+    return rows
+
+class KroneckerGaussianInference(ExactGaussianInference):
+    """
+    Exact inference for intrinsic coregionalization models
+    (GPy.util.multioutput.ICM), where all outputs are observed at the same N
+    inputs with Gaussian noise of one variance sigma2_p per output.
+
+    The covariance of the stacked data is then B kron K + diag(sigma2) kron I,
+    which is whitened to Bt kron K + I, Bt = diag(sigma2)^-1/2 B diag(sigma2)^-1/2.
+    With the eigendecompositions of the P x P matrix Bt and the N x N matrix K
+    the log marginal likelihood and its gradients cost O(N^3 + P^3), instead of
+    O(N^3 P^3) for the dense Cholesky of ExactGaussianInference; see Stegle et
+    al. (2011) and GPy.models.GPKroneckerGaussianRegression.
+
+    Data without this structure (or with other kernels) fall back to
+    ExactGaussianInference. As the kernel gradients are returned per factor
+    (dL_dKx, dL_dB), models using this inference method update their kernel
+    gradients with update_kern_gradients.
+    """
+    def inference(self, kern, X, likelihood, Y, mean_function=None, Y_metadata=None, K=None, precision=None, Z_tilde=None):
+        rows = None
+        if K is None and Z_tilde is None and Y.shape[1] == 1:
+            rows = kronecker_rows(kern, X)
+        if rows is not None:
+            if precision is None:
+                precision = likelihood.gaussian_variance(Y_metadata)
+            precision = (np.zeros(X.shape[0]) + np.asarray(precision).flatten())[rows]
+            if np.any(precision != precision[:, :1]):
+                rows = None
+        if rows is None:
+            return super(KroneckerGaussianInference, self).inference(kern, X, likelihood, Y, mean_function, Y_metadata, K, precision, Z_tilde)
+
+        kx, coreg = icm_parts(kern)
+        X_shared, X_outputs = X[rows[0]], X[rows[:, 0]]
+        (P, N) = rows.shape
+
+        if mean_function is None:
+            m = 0
+        else:
+            m = mean_function.f(X)
+        Ymat = (Y - m)[rows, 0].T
+
+        Kx = kx.K(X_shared)
+        B = coreg.K(X_outputs)
+        sd = np.sqrt(precision[:, 0] + 1e-8)
+
+        # eigendecompositions of both factors, Ky = D (U_B kron U_K) diag(W) (U_B kron U_K)^T D
+        S_K, U_K = np.linalg.eigh(Kx)
+        S_B, U_B = np.linalg.eigh(B/sd[:, None]/sd[None, :])
+        S_K, S_B = np.clip(S_K, 0, np.inf), np.clip(S_B, 0, np.inf)
+        Wi = 1./(S_K[:, None]*S_B[None, :] + 1.)
+
+        Y_ = U_K.T.dot(Ymat/sd).dot(U_B)
+        Ytilde = Y_*Wi
+        alpha = U_K.dot(Ytilde).dot(U_B.T)/sd
+
+        log_marginal = -0.5*(N*P*log_2_pi - np.sum(np.log(Wi)) + 2.*N*np.sum(np.log(sd)) + np.sum(Y_*Ytilde))
+
+        # gradients of 0.5*tr((alpha alpha^T - Ky^-1) dK) per factor
+        dL_dKx = 0.5*alpha.dot(B).dot(alpha.T) - 0.5*(U_K*Wi.dot(S_B)).dot(U_K.T)
+        dL_dB = 0.5*alpha.T.dot(Kx).dot(alpha) - 0.5*(U_B*S_K.dot(Wi)).dot(U_B.T)/sd[:, None]/sd[None, :]
+        dL_dKdiag = np.empty(X.shape[0])
+        dL_dKdiag[rows.T] = 0.5*np.square(alpha) - 0.5*np.square(U_K).dot(Wi).dot(np.square(U_B).T)/np.square(sd)
+        dL_dthetaL = likelihood.exact_inference_gradients(dL_dKdiag, Y_metadata)
+
+        woodbury_vector = np.empty((X.shape[0], 1))
+        woodbury_vector[rows.T, 0] = alpha
+        posterior = PosteriorKronecker(alpha, S_K, S_B, U_K, U_B, sd, rows, X_shared, X_outputs, woodbury_vector)
+        return posterior, log_marginal, {'dL_dKx':dL_dKx, 'dL_dB':dL_dB, 'dL_dthetaL':dL_dthetaL, 'dL_dm':woodbury_vector}
+
+def update_kern_gradients(kern, X, posterior, grad_dict):
+    """
+    Kernel gradient update for the gradients returned by
+    KroneckerGaussianInference, per factor or (when it fell back to exact
+    inference) for the full covariance.
+    """
+    if 'dL_dK' in grad_dict:
+        kern.update_gradients_full(grad_dict['dL_dK'], X)
+    else:
+        kx, coreg = icm_parts(kern)
+        kx.update_gradients_full(grad_dict['dL_dKx'], posterior.X_shared)
+        coreg.update_gradients_full(grad_dict['dL_dB'], posterior.X_outputs)
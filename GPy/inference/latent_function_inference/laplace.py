@@ -11,13 +11,14 @@
 #http://gaussianprocess.org/gpml/code.
 
 import numpy as np
-from ...util.linalg import mdot, jitchol, dpotrs, dtrtrs, dpotri, symmetrify, pdinv
+from ...util.linalg import mdot, jitchol, dpotrs, dtrtrs, dpotri, symmetrify, pdinv, backsub_both_sides
 from .posterior import Posterior
 import warnings
 def warning_on_one_line(message, category, filename, lineno, file=None, line=None):
     return ' %s:%s: %s:%s\n' % (filename, lineno, category.__name__, message)
 warnings.formatwarning = warning_on_one_line
 from scipy import optimize
+from scipy.linalg import lu_factor, lu_solve
 from . import LatentFunctionInference
 from scipy.integrate import quad
 
@@ -39,6 +40,9 @@ class Laplace(LatentFunctionInference):
         #to calculate things or reuse old variables
         self.first_run = True
         self._previous_Ki_fhat = None
+        #Number of Newton iterations and whether the mode finding was warm
+        #started from the previous mode, for the last call of rasm_mode
+        self.mode_finding_stats = None
 
     def LOO(self, kern, X, Y, likelihood, posterior, Y_metadata=None, K=None, f_hat=None, W=None, Ki_W_i=None):
         """
@@ -128,15 +132,14 @@ class Laplace(LatentFunctionInference):
         # Compute K
         K = kern.K(X)
 
-        #Find mode
-        if self.bad_fhat or self.first_run:
+        #Find mode, starting from the previous one (rasm_mode falls back to
+        #zero if that is worse)
+        if self.bad_fhat or self.first_run or self._previous_Ki_fhat is None or self._previous_Ki_fhat.shape != Y.shape:
             Ki_f_init = np.zeros_like(Y)
             self.first_run = False
         else:
             Ki_f_init = self._previous_Ki_fhat
 
-        Ki_f_init = np.zeros_like(Y)# FIXME: take this out
-
         f_hat, Ki_fhat = self.rasm_mode(K, Y, likelihood, Ki_f_init, Y_metadata=Y_metadata)
 
         #Compute hessian and other variables at mode
@@ -157,7 +160,7 @@ class Laplace(LatentFunctionInference):
         :type Y: np.ndarray
         :param likelihood: the likelihood of the latent function value for the given data
         :type likelihood: a GPy.likelihood object
-        :param Ki_f_init: the initial guess at the mode
+        :param Ki_f_init: the initial guess at the mode (as K^-1 f), e.g. the mode for the previous hyperparameters. If its objective is worse than at zero, the search starts from zero.
         :type Ki_f_init: np.ndarray
         :param Y_metadata: information about the data, e.g. which likelihood to take from a multi-likelihood object
         :type Y_metadata: np.ndarray | None
@@ -165,25 +168,33 @@ class Laplace(LatentFunctionInference):
         :rtype: np.ndarray
         """
 
-        Ki_f = Ki_f_init.copy()
-        f = np.dot(K, Ki_f)
-
         #define the objective function (to be maximised)
         def obj(Ki_f, f):
             ll = -0.5*np.sum(np.dot(Ki_f.T, f)) + np.sum(likelihood.logpdf(f, Y, Y_metadata=Y_metadata))
             if np.isnan(ll):
-                import ipdb; ipdb.set_trace()  # XXX BREAKPOINT
                 return -np.inf
             else:
                 return ll
 
+        Ki_f = Ki_f_init.copy()
+        warm_start = bool(np.any(Ki_f != 0))
+        if warm_start:
+            f = self._K_dot(K, Ki_f)
+            old_obj = obj(Ki_f, f)
+            #fall back to the default start if the warm start is worse
+            if old_obj < obj(np.zeros_like(Ki_f), np.zeros_like(f)):
+                warm_start = False
+        if not warm_start:
+            Ki_f = np.zeros_like(Ki_f_init)
+            f = np.zeros_like(Ki_f)
+            old_obj = obj(Ki_f, f)
 
         difference = np.inf
         iteration = 0
         while difference > self._mode_finding_tolerance and iteration < self._mode_finding_max_iter:
-            W = -likelihood.d2logpdf_df2(f, Y, Y_metadata=Y_metadata)
-            if np.any(np.isnan(W)):
-                raise ValueError('One or more element(s) of W is NaN')
+            #the same (clipped) W as in the products with (K + W^-1)^-1, else
+            #the fixed point of the Newton steps is not the mode
+            W = self._clip_W(-likelihood.d2logpdf_df2(f, Y, Y_metadata=Y_metadata), likelihood.log_concave)
             grad = likelihood.dlogpdf_df(f, Y, Y_metadata=Y_metadata)
             if np.any(np.isnan(grad)):
                 raise ValueError('One or more element(s) of grad is NaN')
@@ -191,25 +202,22 @@ class Laplace(LatentFunctionInference):
             W_f = W*f
 
             b = W_f + grad # R+W p46 line 6.
-            W12BiW12, _, _, _ = self._compute_B_statistics(K, W, likelihood.log_concave, *args, **kwargs)
-            W12BiW12Kb = np.dot(W12BiW12, np.dot(K, b))
+            W12BiW12Kb = self._K_Wi_i_dot(K, W, self._K_dot(K, b), likelihood.log_concave, *args, **kwargs)
 
             #Work out the DIRECTION that we want to move in, but don't choose the stepsize yet
             full_step_Ki_f = b - W12BiW12Kb # full_step_Ki_f = a in R&W p46 line 6.
             dKi_f = full_step_Ki_f - Ki_f
+            #f is linear in the step size, so every trial of the line search is O(N)
+            df = self._K_dot(K, dKi_f)
 
             #define an objective for the line search (minimize this one)
             def inner_obj(step_size):
-                Ki_f_trial = Ki_f + step_size*dKi_f
-                f_trial = np.dot(K, Ki_f_trial)
-                return -obj(Ki_f_trial, f_trial)
+                return -obj(Ki_f + step_size*dKi_f, f + step_size*df)
 
             #use scipy for the line search, the compute new values of f, Ki_f
-            step = optimize.brent(inner_obj, tol=1e-4, maxiter=12)
+            step = self._line_search(inner_obj)
             Ki_f_new = Ki_f + step*dKi_f
-            f_new = np.dot(K, Ki_f_new)
-            #print "new {} vs old {}".format(obj(Ki_f_new, f_new), obj(Ki_f, f))
-            old_obj = obj(Ki_f, f)
+            f_new = f + step*df
             new_obj = obj(Ki_f_new, f_new)
             if new_obj < old_obj:
                 raise ValueError("Shouldn't happen, brent optimization failing")
@@ -217,7 +225,9 @@ class Laplace(LatentFunctionInference):
             # difference = np.abs(np.sum(f_new - f)) + np.abs(np.sum(Ki_f_new - Ki_f))
             Ki_f = Ki_f_new
             f = f_new
+            old_obj = new_obj
             iteration += 1
+        self.mode_finding_stats = {'iterations':iteration, 'warm_start':warm_start}
 
         #Warn of bad fits
         if difference > self._mode_finding_tolerance:
@@ -230,6 +240,36 @@ class Laplace(LatentFunctionInference):
 
         return f, Ki_f
 
+    def _clip_W(self, W, log_concave):
+        """W, clipped as in _compute_B_statistics if the likelihood is not log-concave"""
+        if not log_concave:
+            W = np.clip(W, 1e-6, 1e+30)
+        if np.any(np.isnan(W)):
+            raise ValueError('One or more element(s) of W is NaN')
+        return W
+
+    def _line_search(self, inner_obj):
+        """
+        Step size along the Newton direction, minimizing inner_obj.
+
+        At the mode (e.g. when warm started from it) inner_obj is flat to
+        machine precision and brent finds no bracket; then the full step is
+        taken if it is no worse, and no step otherwise.
+        """
+        try:
+            return optimize.brent(inner_obj, tol=1e-4, maxiter=12)
+        except RuntimeError: # BracketError
+            return 1. if inner_obj(1.) <= inner_obj(0.) else 0.
+
+    def _K_dot(self, K, x):
+        """Product of the prior covariance with x"""
+        return np.dot(K, x)
+
+    def _K_Wi_i_dot(self, K, W, x, log_concave, *args, **kwargs):
+        """Product of (K + W^-1)^-1 with x"""
+        W12BiW12, _, _, _ = self._compute_B_statistics(K, W, log_concave, *args, **kwargs)
+        return np.dot(W12BiW12, x)
+
     def mode_computations(self, f_hat, Ki_f, K, Y, likelihood, kern, Y_metadata):
         """
         At the mode, compute the hessian and effective covariance matrix.
@@ -241,8 +281,8 @@ class Laplace(LatentFunctionInference):
         """
         #At this point get the hessian matrix (or vector as W is diagonal)
         W = -likelihood.d2logpdf_df2(f_hat, Y, Y_metadata=Y_metadata)
-        if np.any(np.isnan(W)):
-            raise ValueError('One or more element(s) of W is NaN')
+        #where W is clipped, log|B| does not change with W
+        clipped = self._clip_W(W, likelihood.log_concave) != W
 
         K_Wi_i, logdet_I_KW, I_KW_i, Ki_W_i = self._compute_B_statistics(K, W, likelihood.log_concave)
 
@@ -253,11 +293,16 @@ class Laplace(LatentFunctionInference):
         dW_df = -likelihood.d3logpdf_df3(f_hat, Y, Y_metadata=Y_metadata) # -d3lik_d3fhat
         if np.any(np.isnan(dW_df)):
             raise ValueError('One or more element(s) of dW_df is NaN')
+        dW_df[clipped] = 0.
 
         dL_dfhat = -0.5*(np.diag(Ki_W_i)[:, None]*dW_df) # s2 in R&W p126 line 9.
         #BiK, _ = dpotrs(L, K, lower=1)
         #dL_dfhat = 0.5*np.diag(BiK)[:, None]*dW_df
-        I_KW_i = np.eye(Y.shape[0]) - np.dot(K, K_Wi_i)
+        #the implicit derivatives of f_hat need (I + K W)^-1 at the mode itself, not the clipped W
+        if np.any(clipped):
+            I_KW_i = np.linalg.inv(np.eye(Y.shape[0]) + K*W.T)
+        else:
+            I_KW_i = np.eye(Y.shape[0]) - np.dot(K, K_Wi_i)
 
         ####################
         #  compute dL_dK   #
@@ -278,6 +323,7 @@ class Laplace(LatentFunctionInference):
         ####################
         if likelihood.size > 0 and not likelihood.is_fixed:
             dlik_dthetaL, dlik_grad_dthetaL, dlik_hess_dthetaL = likelihood._laplace_gradients(f_hat, Y, Y_metadata=Y_metadata)
+            dlik_hess_dthetaL = np.where(clipped, 0., dlik_hess_dthetaL)
 
             num_params = likelihood.size
             # make space for one derivative for each likelihood parameter
@@ -384,23 +430,23 @@ class LaplaceBlock(Laplace):
             #a = (I - (K+Wi)i*K)*b
             full_step_Ki_f = np.dot(I - np.dot(K_Wi_i, K), b)
             dKi_f = full_step_Ki_f - Ki_f
+            df = np.dot(K, dKi_f)
 
             #define an objective for the line search (minimize this one)
             def inner_obj(step_size):
-                Ki_f_trial = Ki_f + step_size*dKi_f
-                f_trial = np.dot(K, Ki_f_trial)
-                return -obj(Ki_f_trial, f_trial)
+                return -obj(Ki_f + step_size*dKi_f, f + step_size*df)
 
             #use scipy for the line search, the compute new values of f, Ki_f
-            step = optimize.brent(inner_obj, tol=1e-4, maxiter=12)
+            step = self._line_search(inner_obj)
 
             Ki_f_new = Ki_f + step*dKi_f
-            f_new = np.dot(K, Ki_f_new)
+            f_new = f + step*df
 
             difference = np.abs(np.sum(f_new - f)) + np.abs(np.sum(Ki_f_new - Ki_f))
             Ki_f = Ki_f_new
             f = f_new
             iteration += 1
+        self.mode_finding_stats = {'iterations':iteration, 'warm_start':bool(np.any(Ki_f_init != 0))}
 
         #Warn of bad fits
         if difference > self._mode_finding_tolerance:
@@ -500,3 +546,135 @@ class LaplaceBlock(Laplace):
 
         sign, logdetB = np.linalg.slogdet(B)
         return K_Wi_i, sign*logdetB, Bi, Ki_W_i
+
+
+class LaplaceDTC(Laplace):
+    """
+    Laplace approximation with the low rank (DTC) prior covariance
+
+      Q = Knm Kmm^-1 Kmn = V V^T,    V = Knm Lm^-T
+
+    of M inducing inputs Z, for SparseGP models with non-Gaussian likelihoods.
+    The mode finding of Laplace runs on Q, with the products with
+    (Q + W^-1)^-1 computed by the Woodbury identity through the M x M matrix
+    A = I + V^T W V, so every Newton step costs O(N M^2) instead of O(N^3).
+    """
+    const_jitter = 1e-6
+
+    def inference(self, kern, X, Z, likelihood, Y, Y_metadata=None, mean_function=None):
+        assert mean_function is None, "inference with a mean function not implemented"
+        assert Y.shape[1] == 1, "laplace dtc in 1D only (for now!)"
+
+        Kmm = kern.K(Z).copy()
+        Kmm[np.diag_indices_from(Kmm)] += self.const_jitter
+        Kmn = kern.K(Z, X)
+        Lm = jitchol(Kmm)
+        V = dtrtrs(Lm, Kmn, lower=1)[0].T
+
+        #Find mode, starting from the previous one
+        if self.bad_fhat or self.first_run or self._previous_Ki_fhat is None or self._previous_Ki_fhat.shape != Y.shape:
+            Ki_f_init = np.zeros_like(Y)
+            self.first_run = False
+        else:
+            Ki_f_init = self._previous_Ki_fhat
+
+        f_hat, Ki_fhat = self.rasm_mode(V, Y, likelihood, Ki_f_init, Y_metadata=Y_metadata)
+
+        log_marginal, woodbury_inv, woodbury_vector, grad_dict = self.mode_computations(f_hat, Ki_fhat, V, Lm, Y, likelihood, Y_metadata)
+
+        self._previous_Ki_fhat = Ki_fhat.copy()
+        return Posterior(woodbury_vector=woodbury_vector, woodbury_inv=woodbury_inv, K=Kmm, K_chol=Lm), log_marginal, grad_dict
+
+    def _K_dot(self, V, x):
+        return np.dot(V, np.dot(V.T, x))
+
+    def _K_Wi_i_dot(self, V, W, x, log_concave, *args, **kwargs):
+        # (V V^T + W^-1)^-1 = W - W V A^-1 V^T W
+        W = self._clip_W(W, log_concave)
+        WV = W*V
+        LA = jitchol(np.eye(V.shape[1]) + np.dot(V.T, WV))
+        return W*x - np.dot(WV, dpotrs(LA, np.dot(WV.T, x), lower=1)[0])
+
+    def mode_computations(self, f_hat, Ki_f, V, Lm, Y, likelihood, Y_metadata):
+        """
+        At the mode, compute the approximate log marginal, the posterior of
+        the inducing outputs and the gradients w.r.t. Kmm, Knm and the
+        likelihood parameters, all in O(N M^2).
+        """
+        W_hat = -likelihood.d2logpdf_df2(f_hat, Y, Y_metadata=Y_metadata)
+        W = self._clip_W(W_hat, likelihood.log_concave)
+        #where W is clipped, log|A| does not change with W_hat
+        clipped = W != W_hat
+        WV = W*V
+        LA = jitchol(np.eye(V.shape[1]) + np.dot(V.T, WV))
+        R_dot = lambda x: W*x - np.dot(WV, dpotrs(LA, np.dot(WV.T, x), lower=1)[0])
+
+        #the implicit derivatives of f_hat, (I + W_hat Q)^-1 x and (I + Q W_hat)^-1 x,
+        #need the hessian at the mode itself, not the clipped one
+        if np.any(clipped):
+            LU = lu_factor(np.eye(V.shape[1]) + np.dot(V.T, W_hat*V))
+            IWQi_dot = lambda x: x - W_hat*np.dot(V, lu_solve(LU, np.dot(V.T, x)))
+            IQWi_dot = lambda x: x - np.dot(V, lu_solve(LU, np.dot(V.T, W_hat*x)))
+        else:
+            IWQi_dot = lambda x: x - R_dot(self._K_dot(V, x))
+            IQWi_dot = lambda x: x - self._K_dot(V, R_dot(x))
+
+        #compute the log marginal, log|I + W^1/2 Q W^1/2| = log|A|
+        log_marginal = -0.5*np.sum(np.dot(Ki_f.T, f_hat)) + np.sum(likelihood.logpdf(f_hat, Y, Y_metadata=Y_metadata)) - np.sum(np.log(np.diag(LA)))
+
+        # diagonal of the posterior covariance (Q^-1 + W)^-1 = V A^-1 V^T
+        LAiVT = dtrtrs(LA, V.T, lower=1)[0]
+        Ki_W_i_diag = np.sum(np.square(LAiVT), 0)[:, None]
+
+        dW_df = -likelihood.d3logpdf_df3(f_hat, Y, Y_metadata=Y_metadata) # -d3lik_d3fhat
+        if np.any(np.isnan(dW_df)):
+            raise ValueError('One or more element(s) of dW_df is NaN')
+        dW_df[clipped] = 0.
+        dL_dfhat = -0.5*Ki_W_i_diag*dW_df # s2 in R&W p126 line 9.
+
+        ####################
+        #  compute dL_dQ   #
+        ####################
+        # dL_dQ = 0.5*(a a^T - R) + a c^T, R = (Q + W^-1)^-1, c = (I + W_hat Q)^-1 dL_dfhat,
+        # propagated to Kmm and Knm through Q = P Kmm P^T with P = Knm Kmm^-1
+        c = IWQi_dot(dL_dfhat)
+        P = dtrtrs(Lm, V.T, lower=1, trans=1)[0].T
+        aP, cP, WVP = np.dot(Ki_f.T, P), np.dot(c.T, P), np.dot(WV.T, P)
+        RP = W*P - np.dot(WV, dpotrs(LA, WVP, lower=1)[0])
+        GP = 0.5*np.dot(Ki_f, aP) - 0.5*RP + 0.5*(np.dot(Ki_f, cP) + np.dot(c, aP))
+        dL_dKnm = 2.*GP
+        dL_dKmm = -np.dot(P.T, GP)
+
+        ####################
+        #compute dL_dthetaL#
+        ####################
+        if likelihood.size > 0 and not likelihood.is_fixed:
+            dlik_dthetaL, dlik_grad_dthetaL, dlik_hess_dthetaL = likelihood._laplace_gradients(f_hat, Y, Y_metadata=Y_metadata)
+            dlik_hess_dthetaL = np.where(clipped, 0., dlik_hess_dthetaL)
+
+            num_params = likelihood.size
+            dL_dthetaL = np.zeros(num_params)
+            for thetaL_i in range(num_params):
+                #Explicit
+                dL_dthetaL_exp = ( np.sum(dlik_dthetaL[thetaL_i,:, :])
+                                  + 0.5*np.sum(Ki_W_i_diag*dlik_hess_dthetaL[thetaL_i, :, :])
+                                )
+
+                #Implicit, dfhat_dthetaL = (I + Q W_hat)^-1 Q dlik_grad_dthetaL
+                dfhat_dthetaL = IQWi_dot(self._K_dot(V, dlik_grad_dthetaL[thetaL_i, :, :]))
+                dL_dthetaL_imp = np.dot(dL_dfhat.T, dfhat_dthetaL)
+                dL_dthetaL[thetaL_i] = np.sum(dL_dthetaL_exp + dL_dthetaL_imp)
+        else:
+            dL_dthetaL = np.zeros(likelihood.size)
+
+        # posterior of the inducing outputs, in terms of Kmm:
+        # mean Kmm^-1 Kmn a, woodbury_inv = Kmm^-1 - (Kmm + Kmn W Knm)^-1
+        woodbury_vector = dtrtrs(Lm, np.dot(V.T, Ki_f), lower=1, trans=1)[0]
+        Ai, _ = dpotri(LA, lower=1)
+        symmetrify(Ai)
+        woodbury_inv = backsub_both_sides(Lm, np.eye(V.shape[1]) - Ai, transpose='left')
+
+        self.W = W
+        self.f_hat = f_hat
+        grad_dict = {'dL_dKmm':dL_dKmm, 'dL_dKnm':dL_dKnm, 'dL_dKdiag':np.zeros(Y.shape[0]), 'dL_dthetaL':dL_dthetaL}
+        return log_marginal, woodbury_inv, woodbury_vector, grad_dict
@@ -270,3 +270,95 @@ class PosteriorExact(Posterior):
                     var[:, i] = (Kxx - np.square(tmp).sum(0))
             var = var
         return mu, var
+
+class PosteriorKronecker(Posterior):
+    """
+    Posterior of an intrinsic coregionalization model with shared inputs
+    (see KroneckerGaussianInference), stored in terms of the eigendecompositions
+    of the input covariance K = U_K S_K U_K^T and the whitened coregionalization
+    matrix Bt = U_B S_B U_B^T, so that
+
+      (B kron K + diag(sigma2) kron I)^-1 = D^-1 (U_B kron U_K) diag(Wi) (U_B kron U_K)^T D^-1
+
+    with D = diag(sd) kron I. Predictions do not form anything of size
+    (N P) x (N P); the dense woodbury_inv, woodbury_chol, mean, covariance
+    and K_chol are built from the factors when they are asked for.
+
+    :param alpha: (K_y)^-1 Y as an N x P matrix
+    :param S_K: the eigenvalues of K, N
+    :param S_B: the eigenvalues of Bt, P
+    :param sd: the noise standard deviations of the outputs, P
+    :param rows: the rows of X of the data of each output, P x N
+    :param X_shared: the inputs of the first output (N rows of X)
+    :param X_outputs: one row of X for every output (P rows)
+    """
+    def __init__(self, alpha, S_K, S_B, U_K, U_B, sd, rows, X_shared, X_outputs, woodbury_vector):
+        self._alpha, self._S_K, self._S_B, self._U_K, self._U_B, self._sd = alpha, S_K, S_B, U_K, U_B, sd
+        self._S = S_K[:, None]*S_B[None, :]
+        self._Wi = 1./(self._S + 1.)
+        self._rows = rows
+        self.X_shared, self.X_outputs = X_shared, X_outputs
+        self._K = self._K_chol = self._woodbury_chol = self._woodbury_inv = None
+        self._mean = self._covariance = self._precision = None
+        self._woodbury_vector = woodbury_vector
+        self._prior_mean = 0
+
+    def _dense(self, eigenvalues, scale):
+        """
+        D^scale (U_B kron U_K) diag(eigenvalues) (U_B kron U_K)^T D^scale
+        (eigenvalues N x P), with rows and columns in the order of X.
+        """
+        Q = np.kron(self._U_B*(self._sd[:, None]**scale), self._U_K)
+        M = (Q*eigenvalues.T.flatten()).dot(Q.T)
+        index = self._rows.flatten()
+        dense = np.empty_like(M)
+        dense[np.ix_(index, index)] = M
+        return dense
+
+    @property
+    def woodbury_inv(self):
+        if self._woodbury_inv is None:
+            self._woodbury_inv = self._dense(self._Wi, -1)
+        return self._woodbury_inv
+
+    @property
+    def woodbury_chol(self):
+        if self._woodbury_chol is None:
+            self._woodbury_chol = jitchol(self._dense(self._S + 1., 1))
+        return self._woodbury_chol
+
+    @property
+    def mean(self):
+        if self._mean is None:
+            mean = self._U_K.dot(self._S*self._U_K.T.dot(self._alpha*self._sd).dot(self._U_B)).dot(self._U_B.T)*self._sd
+            self._mean = np.empty((self._rows.size, 1))
+            self._mean[self._rows.T, 0] = mean
+        return self._mean
+
+    @property
+    def covariance(self):
+        if self._covariance is None:
+            self._covariance = self._dense(self._S*self._Wi, 1)
+        return self._covariance
+
+    @property
+    def K_chol(self):
+        if self._K_chol is None:
+            self._K_chol = jitchol(self._dense(self._S, 1))
+        return self._K_chol
+
+    def _raw_predict(self, kern, Xnew, pred_var, full_cov=False):
+        from .kronecker_gaussian_inference import icm_parts
+        kx, coreg = icm_parts(kern)
+        Kx = kx.K(self.X_shared, Xnew)
+        Bx = coreg.K(self.X_outputs, Xnew)
+        mu = np.sum(self._alpha.dot(Bx)*Kx, 0)[:, None]
+        A = self._U_K.T.dot(Kx)
+        C = self._U_B.T.dot(Bx/self._sd[:, None])
+        if full_cov:
+            var = kern.K(Xnew).copy()
+            for p in range(C.shape[0]):
+                var -= C[p][:, None]*C[p][None, :]*(A.T*self._Wi[:, p]).dot(A)
+        else:
+            var = (kern.Kdiag(Xnew) - np.sum(self._Wi.dot(np.square(C))*np.square(A), 0))[:, None]
+        return mu, var
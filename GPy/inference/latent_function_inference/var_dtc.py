@@ -84,9 +84,9 @@ class VarDTC(LatentFunctionInference):
         trYYT = self.get_trYYT(Y)
 
         # kernel computations, using BGPLVM notation
+        Kmm = kern.K(Z).copy()
+        diag.add(Kmm, self.const_jitter)
         if Lm is None:
-            Kmm = kern.K(Z).copy()
-            diag.add(Kmm, self.const_jitter)
             Lm = jitchol(Kmm)
 
         # The rather complex computations of A, and the psi stats
@@ -1,2 +1,3 @@
 from .hmc import HMC
+from .chains import run_chains, rhat, effective_sample_size
 from .samplers import *
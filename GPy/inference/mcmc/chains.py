@@ -0,0 +1,88 @@
+# Copyright (c) 2016, GPy authors (see AUTHORS.txt).
+# Licensed under the BSD 3-clause license (see LICENSE.txt)
+
+import numpy as np
+
+
+def run_chains(sampler, num_chains=4, parallel=True, num_processes=None, **kwargs):
+    """
+    Run independent chains of an MCMC sampler (HMC or Metropolis_Hastings),
+    each on a copy of the sampler and its model, and compute convergence
+    diagnostics. The sampler and its model are not changed.
+
+    :param sampler: the sampler; sampler._copy() returns an independent copy and
+        sampler._sample_chain(**kwargs) samples one chain, returning the samples
+        and a dict of per chain statistics
+    :param num_chains: the number of chains
+    :param parallel: whether to run each chain as a separate process. It relies on the multiprocessing module.
+    :param num_processes: number of workers in the multiprocessing pool (the number of processors by default)
+    :param kwargs: the arguments of the sampler's sample method
+    :returns: (chains, diagnostics), with chains of size num_chains x num_samples x P and
+        diagnostics a dict with the per parameter 'rhat' and 'ess' and the per chain
+        statistics of the sampler
+    """
+    seeds = np.random.randint(2**31-1, size=num_chains)
+    if parallel: #pragma: no cover
+        import multiprocessing as mp
+        pool = mp.Pool(processes=num_processes)
+        try:
+            jobs = [pool.apply_async(_run_chain, args=(sampler, seed, kwargs)) for seed in seeds]
+            pool.close()
+            results = [job.get() for job in jobs]
+        except KeyboardInterrupt:
+            print("Ctrl+c received, terminating and joining pool.")
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    else:
+        results = [_run_chain(sampler._copy(), seed, kwargs) for seed in seeds]
+    chains = np.array([r[0] for r in results])
+    diagnostics = {'rhat':rhat(chains), 'ess':effective_sample_size(chains)}
+    for key in results[0][1]:
+        diagnostics[key] = np.array([r[1][key] for r in results])
+    return chains, diagnostics
+
+def _run_chain(sampler, seed, kwargs):
+    np.random.seed(seed)
+    return sampler._sample_chain(**kwargs)
+
+def rhat(chains):
+    """
+    The split potential scale reduction factor R-hat (Gelman et al., BDA3) of
+    each parameter; values close to 1 indicate that the chains have mixed.
+
+    :param chains: samples of size num_chains x num_samples x P
+    """
+    chains = np.asarray(chains)
+    n = chains.shape[1]//2
+    split = np.concatenate([chains[:, :n], chains[:, chains.shape[1]-n:]], 0)
+    W = split.var(1, ddof=1).mean(0)
+    var_plus = (n-1.)/n*W + split.mean(1).var(0, ddof=1)
+    return np.sqrt(var_plus/W)
+
+def effective_sample_size(chains):
+    """
+    The effective sample size of each parameter over all chains, from the
+    autocorrelations truncated by Geyer's initial monotone sequence (Gelman et al., BDA3).
+
+    :param chains: samples of size num_chains x num_samples x P
+    """
+    chains = np.asarray(chains)
+    C, N, P = chains.shape
+    x = chains - chains.mean(1)[:, None, :]
+    f = np.fft.rfft(x, n=2*N, axis=1)
+    acov = np.fft.irfft(f*np.conj(f), n=2*N, axis=1)[:, :N]/N
+    W = chains.var(1, ddof=1).mean(0)
+    var_plus = (N-1.)/N*W
+    if C > 1:
+        var_plus += chains.mean(1).var(0, ddof=1)
+    rho = 1. - (W - acov.mean(0))/var_plus
+    rho[0] = 1.
+    pairs = rho[:2*(N//2)].reshape(N//2, 2, P).sum(1)
+    ess = np.empty(P)
+    for j in range(P):
+        k = np.argmax(pairs[:, j] <= 0) if np.any(pairs[:, j] <= 0) else N//2
+        tau = -1. + 2.*np.sum(np.minimum.accumulate(pairs[:k, j]))
+        ess[j] = C*N/max(tau, 1./np.log10(C*N))
+    return ess
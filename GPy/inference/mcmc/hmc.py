@@ -2,6 +2,7 @@
 # Licensed under the BSD 3-clause license (see LICENSE.txt)
 
 import numpy as np
+from .chains import run_chains
 
 
 class HMC:
@@ -22,50 +23,140 @@ class HMC:
         self.stepsize = stepsize
         self.p = np.empty_like(model.optimizer_array.copy())
         if M is None:
-            self.M = np.eye(self.p.size)
-        else:
-            self.M = M
+            M = np.eye(self.p.size)
+        self._set_mass(M)
+        self.acceptance_rate = None
+
+    def _set_mass(self, M):
+        self.M = M
         self.Minv = np.linalg.inv(self.M)
+        self._LM = np.linalg.cholesky(self.M)
+        self._logdetM = 2.*np.sum(np.log(np.diag(self._LM)))
 
-    def sample(self, num_samples=1000, hmc_iters=20):
+    def sample(self, num_samples=1000, hmc_iters=20, num_warmup=0, target_accept=0.65, adapt_mass=True):
         """
         Sample the (unfixed) model parameters.
+
+        During the warmup iterations the step size is tuned by dual averaging
+        (Hoffman and Gelman, 2014) towards the target acceptance rate and, if
+        adapt_mass, the mass matrix is set to the inverse of the (diagonal)
+        variance of the warmup samples halfway through. Warmup samples are
+        not returned.
         
         :param num_samples: the number of samples to draw (1000 by default)
         :type num_samples: int
         :param hmc_iters: the number of leap-frog iterations (20 by default)
         :type hmc_iters: int
+        :param num_warmup: the number of adaptation iterations before sampling (0 by default)
+        :type num_warmup: int
+        :param target_accept: the acceptance rate targeted by the step size adaptation
+        :type target_accept: float
+        :param adapt_mass: whether to adapt a diagonal mass matrix during warmup
+        :type adapt_mass: bool
         :return: the list of parameters samples with the size N x P (N - the number of samples, P - the number of parameters to sample) 
         :rtype: numpy.ndarray
         """
         params = np.empty((num_samples,self.p.size))
-        for i in range(num_samples):
-            self.p[:] = np.random.multivariate_normal(np.zeros(self.p.size),self.M)
+        grad = self._gradient()
+        adapt = _StepsizeAdaptation(self.stepsize, target_accept)
+        warmup = np.empty((num_warmup, self.p.size))
+        accepted = 0
+        for i in range(num_warmup + num_samples):
+            self.p[:] = np.dot(self._LM, np.random.randn(self.p.size))
             H_old = self._computeH()
             theta_old = self.model.optimizer_array.copy()
-            params[i] = self.model.unfixed_param_array
+            if i >= num_warmup:
+                params[i-num_warmup] = self.model.unfixed_param_array
             #Matropolis
-            self._update(hmc_iters)
+            grad_new = self._update(hmc_iters, grad)
             H_new = self._computeH()
 
-            if H_old>H_new:
-                k = 1.
-            else:
-                k = np.exp(H_old-H_new)
+            k = np.exp(min(H_old-H_new, 0.)) if np.isfinite(H_new) else 0.
             if np.random.rand()<k:
-                params[i] = self.model.unfixed_param_array
+                grad = grad_new
+                if i >= num_warmup:
+                    accepted += 1
+                    params[i-num_warmup] = self.model.unfixed_param_array
             else:
                 self.model.optimizer_array = theta_old
+
+            if i < num_warmup:
+                warmup[i] = self.model.optimizer_array
+                self.stepsize = adapt.update(k)
+                if adapt_mass and i+1 == num_warmup//2 and num_warmup >= 20:
+                    # variance of the second quarter of the warmup, regularized towards the identity
+                    n = num_warmup//2 - num_warmup//4
+                    var = np.var(warmup[num_warmup//4:num_warmup//2], 0)
+                    var = n/(n+5.)*var + 1e-3*5./(n+5.)
+                    self._set_mass(np.diag(1./var))
+                    adapt = _StepsizeAdaptation(self.stepsize, target_accept)
+                if i+1 == num_warmup:
+                    self.stepsize = adapt.final()
+        self.acceptance_rate = accepted/float(max(num_samples, 1))
         return params
 
-    def _update(self, hmc_iters):
+    def sample_chains(self, num_chains=4, parallel=True, num_processes=None, **kwargs):
+        """
+        Run independent chains, each on a copy of the model and from its
+        current state, with the current mass matrix and step size, and compute
+        convergence diagnostics (see GPy.inference.mcmc.run_chains). The
+        model and the sampler are not changed.
+
+        :param num_chains: the number of chains
+        :param parallel: whether to run each chain as a separate process. It relies on the multiprocessing module.
+        :param num_processes: number of workers in the multiprocessing pool (the number of processors by default)
+        :param kwargs: the arguments of sample (500 warmup iterations by default)
+        :returns: (chains, diagnostics), with chains of size num_chains x num_samples x P and
+            diagnostics a dict with the per parameter 'rhat' and 'ess' and the per chain
+            'stepsize' and 'acceptance_rate'
+        """
+        kwargs.setdefault('num_warmup', 500)
+        return run_chains(self, num_chains, parallel, num_processes, **kwargs)
+
+    def _copy(self):
+        return HMC(self.model.copy(), M=self.M.copy(), stepsize=self.stepsize)
+
+    def _sample_chain(self, **kwargs):
+        params = self.sample(**kwargs)
+        return params, {'stepsize':self.stepsize, 'acceptance_rate':self.acceptance_rate}
+
+    def _gradient(self):
+        return self.model._transform_gradients(self.model.objective_function_gradients())
+
+    def _update(self, hmc_iters, grad=None):
+        # the gradient at the end of each leap-frog step is the one at the start of the next
+        if grad is None:
+            grad = self._gradient()
         for i in range(hmc_iters):
-            self.p[:] += -self.stepsize/2.*self.model._transform_gradients(self.model.objective_function_gradients())
+            self.p[:] += -self.stepsize/2.*grad
             self.model.optimizer_array = self.model.optimizer_array + self.stepsize*np.dot(self.Minv, self.p)
-            self.p[:] += -self.stepsize/2.*self.model._transform_gradients(self.model.objective_function_gradients())
+            grad = self._gradient()
+            self.p[:] += -self.stepsize/2.*grad
+        return grad
 
     def _computeH(self,):
-        return self.model.objective_function()+self.p.size*np.log(2*np.pi)/2.+np.log(np.linalg.det(self.M))/2.+np.dot(self.p, np.dot(self.Minv,self.p[:,None]))/2.
+        return self.model.objective_function()+self.p.size*np.log(2*np.pi)/2.+self._logdetM/2.+np.dot(self.p, np.dot(self.Minv,self.p))/2.
+
+class _StepsizeAdaptation(object):
+    """
+    Dual averaging of the log step size, with the constants of Hoffman and Gelman (2014)
+    """
+    def __init__(self, stepsize, target_accept, gamma=0.05, t0=10., kappa=0.75):
+        self.mu = np.log(10.*stepsize)
+        self.target_accept, self.gamma, self.t0, self.kappa = target_accept, gamma, t0, kappa
+        self.m, self.Hbar, self.log_stepsize_bar = 0, 0., 0.
+
+    def update(self, accept_prob):
+        self.m += 1
+        w = 1./(self.m + self.t0)
+        self.Hbar = (1.-w)*self.Hbar + w*(self.target_accept - accept_prob)
+        log_stepsize = self.mu - np.sqrt(self.m)/self.gamma*self.Hbar
+        eta = self.m**-self.kappa
+        self.log_stepsize_bar = eta*log_stepsize + (1.-eta)*self.log_stepsize_bar
+        return np.exp(log_stepsize)
+
+    def final(self):
+        return np.exp(self.log_stepsize_bar)
 
 class HMC_shortcut:
     def __init__(self,model,M=None,stepsize_range=[1e-6, 1e-1],groupsize=5, Hstd_th=[1e-5, 3.]):
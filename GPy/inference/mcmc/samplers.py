@@ -4,6 +4,8 @@ from __future__ import print_function
 
 import numpy as np
 import sys
+from ...util.linalg import jitchol
+from .chains import run_chains
 
 
 try:
@@ -26,23 +28,32 @@ class Metropolis_Hastings(object):
         else:
             self.cov = cov
         self.scale = 2.4/np.sqrt(self.D)
+        self.acceptance_rate = None
         self.new_chain(current)
 
     def new_chain(self, start=None):
-        self.chains.append([])
+        self.chains.append(np.empty((0, self.D)))
         if start is None:
             self.model.randomize()
         else:
             self.model.optimizer_array = start
 
-    def sample(self, Ntotal=10000, Nburn=1000, Nthin=10, tune=True, tune_throughout=False, tune_interval=400):
-        current = self.model.optimizer_array
+    def sample(self, Ntotal=10000, Nburn=1000, Nthin=10, tune=True, tune_throughout=False, tune_interval=400, verbose=True):
+        current = self.model.optimizer_array.copy()
         fcurrent = self.model.log_likelihood() + self.model.log_prior() 
-        accepted = np.zeros(Ntotal,dtype=np.bool)
+        accepted = np.zeros(Ntotal,dtype=bool)
+        trace = np.empty((Ntotal, self.D))
+        kept = np.arange(Ntotal)
+        samples = np.empty((np.sum((kept > Nburn) & ((kept%Nthin)==0)), self.D))
+        num_kept = 0
+        # proposal factor, only recomputed when the proposal is tuned
+        L = jitchol(self.cov)*self.scale
+        report_interval = max(Ntotal//100, 1)
         for it in range(Ntotal):
-            print("sample %d of %d\r"%(it+1,Ntotal),end="")
-            sys.stdout.flush()
-            prop = np.random.multivariate_normal(current, self.cov*self.scale*self.scale)
+            if verbose and ((it+1)%report_interval==0 or it+1==Ntotal):
+                print("sample %d of %d\r"%(it+1,Ntotal),end="")
+                sys.stdout.flush()
+            prop = current + np.dot(L, np.random.randn(self.D))
             self.model.optimizer_array = prop
             fprop = self.model.log_likelihood() + self.model.log_prior() 
 
@@ -58,25 +69,63 @@ class Metropolis_Hastings(object):
                     fcurrent = fprop
 
             #store current value
-            if (it > Nburn) & ((it%Nthin)==0):
-                self.chains[-1].append(current)
+            trace[it] = current
+            if (it > Nburn) and ((it%Nthin)==0):
+                samples[num_kept] = current
+                num_kept += 1
 
             #tuning!
-            if it & ((it%tune_interval)==0) & tune & ((it<Nburn) | (tune_throughout)):
+            if it and ((it%tune_interval)==0) and tune and ((it<Nburn) or tune_throughout):
                 pc = np.mean(accepted[it-tune_interval:it])
-                self.cov = np.cov(np.vstack(self.chains[-1][-tune_interval:]).T)
+                if pc > 0:
+                    self.cov = np.cov(trace[it-tune_interval:it].T).reshape(self.D, self.D)
                 if pc > .25:
                     self.scale *= 1.1
                 if pc < .15:
                     self.scale /= 1.1
+                L = jitchol(self.cov)*self.scale
+        self.model.optimizer_array = current
+        self.chains[-1] = np.vstack((self.chains[-1], samples))
+        self.acceptance_rate = np.mean(accepted)
+
+    def sample_chains(self, num_chains=4, parallel=True, num_processes=None, **kwargs):
+        """
+        Sample num_chains new chains, each from the current state of the model
+        and with the current proposal, append them to self.chains and compute
+        convergence diagnostics (see GPy.inference.mcmc.run_chains). The model
+        is not changed.
+
+        :param num_chains: the number of chains
+        :param parallel: whether to run each chain as a separate process. It relies on the multiprocessing module.
+        :param num_processes: number of workers in the multiprocessing pool (the number of processors by default)
+        :param kwargs: the arguments of sample (progress is not printed by default)
+        :returns: (chains, diagnostics), with the new chains of size num_chains x num_samples x D and
+            diagnostics a dict with the per parameter 'rhat' and 'ess' and the per chain
+            'scale' and 'acceptance_rate'
+        """
+        kwargs.setdefault('verbose', False)
+        chains, diagnostics = run_chains(self, num_chains, parallel, num_processes, **kwargs)
+        self.chains.extend(chains)
+        return chains, diagnostics
+
+    def _copy(self):
+        sampler = Metropolis_Hastings(self.model.copy(), self.cov.copy())
+        sampler.scale = self.scale
+        return sampler
+
+    def _sample_chain(self, **kwargs):
+        self.chains = []
+        self.new_chain(self.model.optimizer_array.copy())
+        self.sample(**kwargs)
+        return self.chains[-1], {'scale':self.scale, 'acceptance_rate':self.acceptance_rate}
 
     def predict(self,function,args):
         """Make a prediction for the function, to which we will pass the additional arguments"""
-        param = self.model.param_array
+        param = self.model.optimizer_array.copy()
         fs = []
-        for p in self.chain:
-            self.model.param_array = p
+        for p in self.chains[-1]:
+            self.model.optimizer_array = p
             fs.append(function(*args))
         # reset model to starting state
-        self.model.param_array = param
+        self.model.optimizer_array = param
         return fs
@@ -54,6 +54,29 @@ class StochasticStorage(object):
         Reset the state of this stochastics generator.
         """
 
+def missing_data_patterns(Y):
+    """
+    Group the output dimensions of Y by their pattern of missing (nan) values,
+    so that all dimensions of a group can be handled in one go.
+
+    :returns: the pattern index of every output dimension (D), and the mask
+        of observed (not nan) rows of every pattern
+    """
+    import numpy as np
+    inan = np.isnan(Y)
+    # one bytestring per output dimension, which identifies its pattern
+    packed = np.ascontiguousarray(np.packbits(inan, axis=0).T)
+    patterns = {}
+    index = np.empty(Y.shape[1], dtype=int)
+    masks = []
+    for d in range(Y.shape[1]):
+        key = packed[d].tobytes()
+        if key not in patterns:
+            patterns[key] = len(masks)
+            masks.append(~inan[:, d])
+        index[d] = patterns[key]
+    return index, masks
+
 class SparseGPMissing(StochasticStorage):
     def __init__(self, model, batchsize=1):
         """
@@ -64,19 +87,8 @@ class SparseGPMissing(StochasticStorage):
         """
         import numpy as np
         self.Y = model.Y_normalized
-        bdict = {}
-        #For N > 1000 array2string default crops
-        opt = np.get_printoptions()
-        np.set_printoptions(threshold=np.inf)
-        for d in range(self.Y.shape[1]):
-            inan = np.isnan(self.Y)[:, d]
-            arr_str = np.array2string(inan, np.inf, 0, True, '', formatter={'bool':lambda x: '1' if x else '0'})
-            try:
-                bdict[arr_str][0].append(d)
-            except:
-                bdict[arr_str] = [[d], ~inan]
-        np.set_printoptions(**opt)
-        self.d = bdict.values()
+        index, masks = missing_data_patterns(self.Y)
+        self.d = [[list(np.nonzero(index == p)[0]), mask] for p, mask in enumerate(masks)]
 
 class SparseGPStochastics(StochasticStorage):
     """
@@ -88,6 +100,8 @@ class SparseGPStochastics(StochasticStorage):
         self.output_dim = model.Y.shape[1]
         self.Y = model.Y_normalized
         self.missing_data = missing_data
+        if self.missing_data:
+            self.pattern_index, self.pattern_masks = missing_data_patterns(self.Y)
         self.reset()
         self.do_stochastics()
 
@@ -95,25 +109,41 @@ class SparseGPStochastics(StochasticStorage):
         import numpy as np
         if self.batchsize == 1:
             self.current_dim = (self.current_dim+1)%self.output_dim
-            self.d = [[[self.current_dim], np.isnan(self.Y[:, self.current_dim]) if self.missing_data else None]]
+            self.d = [[[self.current_dim], self.pattern_masks[self.pattern_index[self.current_dim]] if self.missing_data else None]]
         else:
             self.d = np.random.choice(self.output_dim, size=self.batchsize, replace=False)
-            bdict = {}
             if self.missing_data:
-                opt = np.get_printoptions()
-                np.set_printoptions(threshold=np.inf)
+                bdict = {}
                 for d in self.d:
-                    inan = np.isnan(self.Y[:, d])
-                    arr_str = np.array2string(inan,np.inf, 0,True, '',formatter={'bool':lambda x: '1' if x else '0'})
-                    try:
-                        bdict[arr_str][0].append(d)
-                    except:
-                        bdict[arr_str] = [[d], ~inan]
-                np.set_printoptions(**opt)
-                self.d = bdict.values()
+                    bdict.setdefault(self.pattern_index[d], []).append(d)
+                self.d = [[dims, self.pattern_masks[p]] for p, dims in bdict.items()]
             else:
                 self.d = [[self.d, None]]
 
     def reset(self):
         self.current_dim = -1
         self.d = None
+
+class Adam(object):
+    """
+    The Adam stochastic gradient method (Kingma and Ba, 2015), minimizing.
+    Call step with the current parameters and the stochastic gradient of
+    the objective to get the updated parameters.
+    """
+    def __init__(self, step_rate=1e-2, decay_mom1=0.9, decay_mom2=0.999, offset=1e-8):
+        self.step_rate = step_rate
+        self.decay_mom1, self.decay_mom2 = decay_mom1, decay_mom2
+        self.offset = offset
+        self.reset()
+
+    def reset(self):
+        self.mom1, self.mom2 = 0., 0.
+        self.n_iter = 0
+
+    def step(self, x, gradient):
+        self.n_iter += 1
+        self.mom1 = self.decay_mom1*self.mom1 + (1.-self.decay_mom1)*gradient
+        self.mom2 = self.decay_mom2*self.mom2 + (1.-self.decay_mom2)*gradient**2
+        mom1_hat = self.mom1/(1.-self.decay_mom1**self.n_iter)
+        mom2_hat = self.mom2/(1.-self.decay_mom2**self.n_iter)
+        return x - self.step_rate*mom1_hat/(mom2_hat**.5 + self.offset)
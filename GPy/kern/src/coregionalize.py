@@ -68,12 +68,11 @@ class Coregionalize(Kern):
 
 
     def _K_numpy(self, X, X2=None):
-        index = np.asarray(X, dtype=np.int)
-        if X2 is None:
-            return self.B[index,index.T]
-        else:
-            index2 = np.asarray(X2, dtype=np.int)
-            return self.B[index,index2.T]
+        index = np.asarray(X, dtype=int)[:,0]
+        index2 = index if X2 is None else np.asarray(X2, dtype=int)[:,0]
+        # gather whole rows of B, then the columns: two contiguous takes
+        # instead of one N x N fancy index
+        return np.take(np.take(self.B, index, axis=0), index2, axis=1)
 
     def _K_cython(self, X, X2=None):
         if X2 is None:
@@ -82,14 +81,14 @@ class Coregionalize(Kern):
 
 
     def Kdiag(self, X):
-        return np.diag(self.B)[np.asarray(X, dtype=np.int).flatten()]
+        return np.diag(self.B)[np.asarray(X, dtype=int).flatten()]
 
     def update_gradients_full(self, dL_dK, X, X2=None):
-        index = np.asarray(X, dtype=np.int)
+        index = np.asarray(X, dtype=int)
         if X2 is None:
             index2 = index
         else:
-            index2 = np.asarray(X2, dtype=np.int)
+            index2 = np.asarray(X2, dtype=int)
 
         #attempt to use cython for a nasty double indexing loop: fall back to numpy
         if config.getboolean('cython', 'working'):
@@ -105,13 +104,39 @@ class Coregionalize(Kern):
         self.W.gradient = dW
         self.kappa.gradient = dkappa
 
+    def _output_segments(self, index):
+        """
+        Sort the data by output index: returns the sorting permutation (None
+        if index is sorted already), the start of every run of equal outputs
+        in the sorted order and the output of every run.
+
+        The segments of the last two index vectors (of X and X2) are kept.
+        """
+        return self._cached_by_value('segments', (index,), lambda: self._compute_output_segments(index), limit=2)
+
+    def _compute_output_segments(self, index):
+        order = None
+        if np.any(index[1:] < index[:-1]):
+            order = np.argsort(index, kind='mergesort')
+            index = index[order]
+        starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+        return order, starts, index[starts]
+
     def _gradient_reduce_numpy(self, dL_dK, index, index2):
         index, index2 = index[:,0], index2[:,0]
         dL_dK_small = np.zeros_like(self.B)
-        for i in range(self.output_dim):
-            tmp1 = dL_dK[index==i]
-            for j in range(self.output_dim):
-                dL_dK_small[j,i] = tmp1[:,index2==j].sum()
+        if index.size == 0 or index2.size == 0:
+            return dL_dK_small
+        order, starts, outputs = self._output_segments(index)
+        order2, starts2, outputs2 = self._output_segments(index2)
+        # block sums over contiguous runs of rows, then of columns
+        if order is not None:
+            dL_dK = dL_dK[order]
+        tmp = np.add.reduceat(dL_dK, starts, axis=0)
+        if order2 is not None:
+            tmp = tmp[:, order2]
+        tmp = np.add.reduceat(tmp, starts2, axis=1)
+        dL_dK_small[np.ix_(outputs2, outputs)] = tmp.T
         return dL_dK_small
 
     def _gradient_reduce_cython(self, dL_dK, index, index2):
@@ -120,8 +145,8 @@ class Coregionalize(Kern):
 
 
     def update_gradients_diag(self, dL_dKdiag, X):
-        index = np.asarray(X, dtype=np.int).flatten()
-        dL_dKdiag_small = np.array([dL_dKdiag[index==i].sum() for i in range(self.output_dim)])
+        index = np.asarray(X, dtype=int).flatten()
+        dL_dKdiag_small = np.bincount(index, np.asarray(dL_dKdiag).flatten(), minlength=self.output_dim)
         self.W.gradient = 2.*self.W*dL_dKdiag_small[:, None]
         self.kappa.gradient = dL_dKdiag_small
 
@@ -203,10 +203,9 @@ class EQ_ODE1(Kern):
         if X2 is None:
             if X_flag: #Kuu or Kmm
                 index -= self.output_dim
+                #the gradient is zero outside the blocks of equal latent functions
                 tmp = dL_dK*self._gkuu_lq(X, index)
-                for q in np.unique(index):
-                    ind = np.where(index == q)
-                    self.lengthscale.gradient[q] = tmp[np.ix_(ind[0], ind[0])].sum()
+                self.lengthscale.gradient = np.bincount(index, tmp.sum(1), minlength=self.rank)
             else:
                 raise NotImplementedError
         else: #Kfu or Knm
@@ -228,18 +227,13 @@ class EQ_ODE1(Kern):
                 index = index2
                 index2 = indtemp
             glq, gSdq, gB = self._gkfu(X, index, X2, index2)
-            tmp = dL_dK*glq
-            for q in np.unique(index2):
-                ind = np.where(index2 == q)
-                self.lengthscale.gradient[q] = tmp[:, ind].sum()
-            tmpB = dL_dK*gB
-            tmp = dL_dK*gSdq
-            for d in np.unique(index):
-                ind = np.where(index == d)
-                self.decay.gradient[d] = tmpB[ind, :].sum()
-                for q in np.unique(index2):
-                    ind2 = np.where(index2 == q)
-                    self.W.gradient[d, q] = tmp[np.ix_(ind[0], ind2[0])].sum()
+            #Sums over the blocks of each output (rows) and latent function (columns)
+            self.lengthscale.gradient = np.bincount(index2, (dL_dK*glq).sum(0), minlength=self.rank)
+            self.decay.gradient = np.bincount(index, (dL_dK*gB).sum(1), minlength=self.output_dim)
+            tmp = (dL_dK*gSdq).dot(np.eye(self.rank)[index2])
+            gW = np.zeros(self.W.shape)
+            np.add.at(gW, index, tmp)
+            self.W.gradient = gW
 
     def update_gradients_diag(self, dL_dKdiag, X):
         #index = np.asarray(X, dtype=np.int)
@@ -257,12 +251,10 @@ class EQ_ODE1(Kern):
             dL_dKdiag = np.reshape(dL_dKdiag, (index.size, 1))
         tmp = dL_dKdiag*glq
         self.lengthscale.gradient = tmp.sum(0)
-        tmpB = dL_dKdiag*gB
-        tmp = dL_dKdiag*gS
-        for d in np.unique(index):
-            ind = np.where(index == d)
-            self.decay.gradient[d] = tmpB[ind, :].sum()
-            self.W.gradient[d, :] = tmp[ind].sum(0)
+        self.decay.gradient = np.bincount(index, (dL_dKdiag*gB).sum(1), minlength=self.output_dim)
+        gW = np.zeros(self.W.shape)
+        np.add.at(gW, index, dL_dKdiag*gS)
+        self.W.gradient = gW
 
     def gradients_X(self, dL_dK, X, X2=None):
         #index = np.asarray(X, dtype=np.int)
@@ -343,6 +335,27 @@ class EQ_ODE1(Kern):
             kuu[np.ix_(ind1, ind2)] = np.exp(-r2)
         return kuu
 
+    #Upsilon terms of the cross-covariance Kfu
+    def _upsilon(self, t, index, z, index2):
+        """
+        Upsilon terms of Kfu between the outputs at t (column, output indexes
+        index) and the latent functions at z (row, latent indexes index2).
+
+        The lnDifErf evaluations dominate the cost of Kfu and of its
+        gradients, so the last result is kept for _Kfu, _gkfu and _gkfu_z.
+        """
+        key = (t, index, z, index2, self.decay.values, self.lengthscale.values)
+        return self._cached_by_value('upsilon', key, lambda: self._compute_upsilon(t, index, z, index2))
+
+    def _compute_upsilon(self, t, index, z, index2):
+        B = self.decay.values[index].reshape(index.size, 1)
+        lq = self.lengthscale.values[index2].reshape(1, index2.size)
+        nu = B*(.5*lq)
+        tz = t-z
+        upsi = np.exp(nu*nu - B*tz + lnDifErf(-tz/lq + nu, z/lq + nu))
+        upsi[t[:, 0] == 0., :] = 0.
+        return upsi
+
     #Evaluation of cross-covariance function
     def _Kfu(self, X, index, X2, index2):
         #terms that move along t
@@ -364,19 +377,11 @@ class EQ_ODE1(Kern):
 
         #DxQ terms
         c0 = S*((.5*np.sqrt(np.pi))*lq)
-        nu = B*(.5*lq)
-        nu2 = nu**2
-        #1xM terms
-        z_lq = z/lq[0, index2]
-        #NxM terms
-        tz = t-z
-        tz_lq = tz/lq[0, index2]
 
         # Upsilon Calculations
         fullind = np.ix_(index, index2)
+        upsi = self._upsilon(t, d[index], z, index2)
 
-        upsi = np.exp(nu2[fullind] - B[index]*tz + lnDifErf( -tz_lq + nu[fullind], z_lq+nu[fullind]))
-        upsi[t[:, 0] == 0, :] = 0.
         #Covariance calculation
         kfu = c0[fullind]*upsi
 
@@ -550,8 +555,7 @@ class EQ_ODE1(Kern):
         
         # Upsilon calculations
         fullind = np.ix_(index, index2)
-        upsi = np.exp(nu2[fullind] - B[index]*tz + lnDifErf( -tz_lq + nu[fullind], z_lq+nu[fullind] ) )
-        upsi[t[:, 0] == 0., :] = 0.
+        upsi = self._upsilon(t, d[index], z, index2)
 
         #Gradient wrt S
         #DxQ term
@@ -604,8 +608,6 @@ class EQ_ODE1(Kern):
         #DxQ terms
         #Slq = S*lq
         c0 = S_pi*lq #lq*Sdq*sqrt(pi)
-        nu = (.5*lq)*B
-        nu2 = nu*nu
 
         #1xM terms
         z_lq = z/lq[0, index2]
@@ -618,10 +620,7 @@ class EQ_ODE1(Kern):
 
         # Upsilon calculations
         fullind = np.ix_(index, index2)
-        z2 = z_lq + nu[fullind]
-        z1 = z2 - t_lq[:, index2]
-        upsi = np.exp(nu2[fullind] - B[index]*(t-z) + lnDifErf(z1,z2) )
-        upsi[t[:, 0] == 0., :] = 0.
+        upsi = self._upsilon(t, d[index], z, index2)
 
         #Gradient wrt z
         za1 = c0*B
@@ -635,13 +634,13 @@ def lnDifErf(z1,z2):
     logdiferf = np.zeros(z1.shape)        
     ind = np.where(z1>0.)
     ind2 = np.where(z1<=0.)
-    if ind[0].shape > 0:
+    if ind[0].size > 0:
         z1i = z1[ind]
         z12 = z1i*z1i
         z2i = z2[ind]
         logdiferf[ind] = -z12 + np.log(erfcx(z1i) - erfcx(z2i)*np.exp(z12-z2i**2))
     
-    if ind2[0].shape > 0:
+    if ind2[0].size > 0:
         z1i = z1[ind2]
         z2i = z2[ind2]
         logdiferf[ind2] = np.log(erf(z2i) - erf(z1i))
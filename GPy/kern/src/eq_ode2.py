@@ -200,9 +200,9 @@ class EQ_ODE2(Kern):
             indv1 = np.where(z1.real >= 0.)
             indv2 = np.where(z1.real < 0.)
             upv = -np.exp(lwnu[ind] + gamt)
-            if indv1[0].shape > 0:
+            if indv1[0].size > 0:
                 upv[indv1] += np.exp(t2_lq2[indv1] + np.log(wofz(1j*z1[indv1])))
-            if indv2[0].shape > 0:
+            if indv2[0].size > 0:
                 upv[indv2] += np.exp(nu2[ind[indv2[0]], indv2[1]] + gamt[indv2[0], 0] + np.log(2.))\
                              - np.exp(t2_lq2[indv2] + np.log(wofz(-1j*z1[indv2])))
             upv[t1[:, 0] == 0, :] = 0.
@@ -260,9 +260,9 @@ class EQ_ODE2(Kern):
             indv1 = np.where(z1 >= 0.)
             indv2 = np.where(z1 < 0.)
             upv = -np.exp(lwnu[ind] + gamt)
-            if indv1[0].shape > 0:
+            if indv1[0].size > 0:
                 upv[indv1] += np.exp(t2_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
+            if indv2[0].size > 0:
                 upv[indv2] += np.exp(nu2[ind[indv2[0]], indv2[1]] + gamt[indv2[0], 0] + np.log(2.))\
                               - np.exp(t2_lq2[indv2] + np.log(wofz(-1j*z1[indv2]).real))
             upv[t1[:, 0] == 0, :] = 0.
@@ -278,9 +278,9 @@ class EQ_ODE2(Kern):
             indv1 = np.where(z1 >= 0.)
             indv2 = np.where(z1 < 0.)
             upvc = - np.exp(lwnuc[ind] + gamct)
-            if indv1[0].shape > 0:
+            if indv1[0].size > 0:
                 upvc[indv1] += np.exp(t2_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
+            if indv2[0].size > 0:
                 upvc[indv2] += np.exp(nuc2[ind[indv2[0]], indv2[1]] + gamct[indv2[0], 0] + np.log(2.))\
                                - np.exp(t2_lq2[indv2] + np.log(wofz(-1j*z1[indv2]).real))
             upvc[t1[:, 0] == 0, :] = 0.
@@ -304,10 +304,9 @@ class EQ_ODE2(Kern):
         if X2 is None:
             if X_flag: #Kuu or Kmm
                 index -= self.output_dim
+                #the gradient is zero outside the blocks of equal latent functions
                 tmp = dL_dK*self._gkuu_lq(X, index)
-                for q in np.unique(index):
-                    ind = np.where(index == q)
-                    self.lengthscale.gradient[q] = tmp[np.ix_(ind[0], ind[0])].sum()
+                self.lengthscale.gradient = np.bincount(index, tmp.sum(1), minlength=self.rank)
             else:
                 raise NotImplementedError
         else: #Kfu or Knm
@@ -329,20 +328,14 @@ class EQ_ODE2(Kern):
                 index = index2
                 index2 = indtemp
             glq, gSdq, gB, gC = self._gkfu(X, index, X2, index2)
-            tmp = dL_dK*glq
-            for q in np.unique(index2):
-                ind = np.where(index2 == q)
-                self.lengthscale.gradient[q] = tmp[:, ind].sum()
-            tmpB = dL_dK*gB
-            tmpC = dL_dK*gC
-            tmp = dL_dK*gSdq
-            for d in np.unique(index):
-                ind = np.where(index == d)
-                self.B.gradient[d] = tmpB[ind, :].sum()
-                self.C.gradient[d] = tmpC[ind, :].sum()
-                for q in np.unique(index2):
-                    ind2 = np.where(index2 == q)
-                    self.W.gradient[d, q] = tmp[np.ix_(ind[0], ind2[0])].sum()
+            #Sums over the blocks of each output (rows) and latent function (columns)
+            self.lengthscale.gradient = np.bincount(index2, (dL_dK*glq).sum(0), minlength=self.rank)
+            self.B.gradient = np.bincount(index, (dL_dK*gB).sum(1), minlength=self.output_dim)
+            self.C.gradient = np.bincount(index, (dL_dK*gC).sum(1), minlength=self.output_dim)
+            tmp = (dL_dK*gSdq).dot(np.eye(self.rank)[index2])
+            gW = np.zeros(self.W.shape)
+            np.add.at(gW, index, tmp)
+            self.W.gradient = gW
 
     def update_gradients_diag(self, dL_dKdiag, X):
         #index = np.asarray(X, dtype=np.int)
@@ -361,14 +354,11 @@ class EQ_ODE2(Kern):
             dL_dKdiag = np.reshape(dL_dKdiag, (index.size, 1))
         tmp = dL_dKdiag*glq
         self.lengthscale.gradient = tmp.sum(0)
-        tmpB = dL_dKdiag*gB
-        tmpC = dL_dKdiag*gC
-        tmp = dL_dKdiag*gS
-        for d in np.unique(index):
-            ind = np.where(index == d)
-            self.B.gradient[d] = tmpB[ind, :].sum()
-            self.C.gradient[d] = tmpC[ind, :].sum()
-            self.W.gradient[d, :] = tmp[ind].sum(0)
+        self.B.gradient = np.bincount(index, (dL_dKdiag*gB).sum(1), minlength=self.output_dim)
+        self.C.gradient = np.bincount(index, (dL_dKdiag*gC).sum(1), minlength=self.output_dim)
+        gW = np.zeros(self.W.shape)
+        np.add.at(gW, index, dL_dKdiag*gS)
+        self.W.gradient = gW
 
     def gradients_X(self, dL_dK, X, X2=None):
         #index = np.asarray(X, dtype=np.int)
@@ -449,10 +439,79 @@ class EQ_ODE2(Kern):
             kuu[np.ix_(ind1, ind2)] = np.exp(-r2)
         return kuu
 
+    #Upsilon terms of the cross-covariance Kfu
+    def _upsilon(self, t, index, z, index2):
+        """
+        Upsilon terms of Kfu between the outputs at t (column, output indexes
+        index) and the latent functions at z (row, latent indexes index2):
+        upsi for the rows where w_d is real (complex valued), and upsi1 (gamc)
+        and upsi2 (gam) for the rows where w_d is complex, both in the order
+        of the rows.
+
+        The wofz evaluations dominate the cost of Kfu and of its gradients, so
+        the last result is kept for _Kfu, _gkfu and _gkfu_z.
+        """
+        key = (t, index, z, index2, self.B.values, self.C.values, self.lengthscale.values)
+        return self._cached_by_value('upsilon', key, lambda: self._compute_upsilon(t, index, z, index2))
+
+    def _compute_upsilon(self, t, index, z, index2):
+        B = self.B.values[index].reshape(index.size, 1)
+        C = self.C.values[index].reshape(index.size, 1)
+        alpha = .5*C
+        C2 = C*C
+        wbool = (C2 >= 4.*B)[:, 0]
+        #1xM terms
+        lq = self.lengthscale.values[index2].reshape(1, index2.size)
+        z_lq = z/lq
+        z_lq2 = -z_lq*z_lq
+
+        def upsilon(nu, gam, t1, zt_lq2, z1, take_real):
+            #Upsilon for the rows t1, nu = gam*lq/2 and z1 = zt_lq + nu
+            if take_real:
+                w = lambda u: wofz(u).real
+                pos = z1 >= 0.
+            else:
+                w = wofz
+                pos = z1.real >= 0.
+            upsi = - np.exp(z_lq2 - gam*t1 + np.log(w(1j*(z_lq + nu))))
+            neg = np.logical_not(pos)
+            upsi[pos] += np.exp(zt_lq2[pos] + np.log(w(1j*z1[pos])))
+            upsi[neg] += np.exp((nu*nu)[neg] - (gam*(t1-z))[neg] + np.log(2.))\
+                         - np.exp(zt_lq2[neg] + np.log(w(-1j*z1[neg])))
+            upsi[t1[:, 0] == 0., :] = 0.
+            return upsi
+
+        upsi = upsi1 = upsi2 = None
+        #(1) when wd is real
+        ind = np.logical_not(wbool)
+        if np.any(ind):
+            t1 = t[ind]
+            w = .5*np.sqrt(4.*B[ind] - C2[ind])
+            gam = alpha[ind] - 1j*w
+            nu = gam*(.5*lq)
+            zt_lq = z_lq - t1/lq
+            upsi = upsilon(nu, gam, t1, -zt_lq*zt_lq, zt_lq + nu, False)
+        #(2) when wd is complex
+        if np.any(wbool):
+            t1 = t[wbool]
+            w = .5*np.sqrt(C2[wbool] - 4.*B[wbool])
+            gam = alpha[wbool] - w
+            gamc = alpha[wbool] + w
+            nu = gam*(.5*lq)
+            nuc = gamc*(.5*lq)
+            zt_lq = z_lq - t1/lq
+            zt_lq2 = -zt_lq*zt_lq
+            upsi1 = upsilon(nuc, gamc, t1, zt_lq2, zt_lq + nuc, True)
+            upsi2 = upsilon(nu, gam, t1, zt_lq2, zt_lq + nu, True)
+
+        return upsi, upsi1, upsi2
+
     #Evaluation of cross-covariance function
     def _Kfu(self, X, index, X2, index2):
         #terms that move along t
         t = X[:, 0].reshape(X.shape[0], 1)
+        z = X2[:, 0].reshape(1, X2.shape[0])
+        upsi, upsi1, upsi2 = self._upsilon(t, index, z, index2)
         d = np.unique(index) #Output Indexes
         B = self.B.values[d]
         C = self.C.values[d]
@@ -468,10 +527,7 @@ class EQ_ODE2(Kern):
         B = B.reshape(B.size, 1)
         C2 = C*C
         #Input related variables must be row-wise
-        z = X2[:, 0].reshape(1, X2.shape[0])
         lq = self.lengthscale.values.reshape((1, self.rank))
-        #print np.max(z), np.max(z/lq[0, index2])
-        alpha = .5*C
 
         wbool2 = wbool[index]
         ind2t = np.where(wbool2)
@@ -482,8 +538,6 @@ class EQ_ODE2(Kern):
         indD = np.arange(B.size)
         #(1) when wd is real
         if np.any(np.logical_not(wbool)):
-            #Indexes of index and t related to (2)
-            t1 = t[ind3t]
             ind = index[ind3t]
             #Index transformation
             d = np.asarray(np.where(np.logical_not(wbool))[0])
@@ -492,47 +546,14 @@ class EQ_ODE2(Kern):
             ind = indd[ind]
             #Dx1 terms
             w = .5*np.sqrt(4.*B[d] - C2[d])
-            alphad = alpha[d]
-            gam = alphad - 1j*w
-
             #DxQ terms
             Slq = (S[d]/w)*(.5*lq)
             c0 = Slq*np.sqrt(np.pi)
-            nu = gam*(.5*lq)
-            #1xM terms
-            z_lq = z/lq[0, index2]
-            #NxQ terms
-            t_lq = t1/lq
-            #NxM terms
-            zt_lq = z_lq - t_lq[:, index2]
-
-            # Upsilon Calculations
-            #Using wofz
-            tz = t1-z
-            fullind = np.ix_(ind, index2)
-            zt_lq2 = -zt_lq*zt_lq
-            z_lq2 = -z_lq*z_lq
-            gamt = -gam[ind]*t1
-
-            upsi = - np.exp(z_lq2 + gamt + np.log(wofz(1j*(z_lq + nu[fullind]))))
-            z1 = zt_lq + nu[fullind]
-            indv1 = np.where(z1.real >= 0.)
-            indv2 = np.where(z1.real < 0.)
-            if indv1[0].shape > 0:
-                upsi[indv1] += np.exp(zt_lq2[indv1] + np.log(wofz(1j*z1[indv1])))
-            if indv2[0].shape > 0:
-                nua2 = nu[ind[indv2[0]], index2[indv2[1]]]**2
-                upsi[indv2] += np.exp(nua2 - gam[ind[indv2[0]], 0]*tz[indv2] + np.log(2.))\
-                               - np.exp(zt_lq2[indv2] + np.log(wofz(-1j*z1[indv2])))
-            upsi[t1[:, 0] == 0., :] = 0.
-
             #Covariance calculation
-            kfu[ind3t] = c0[fullind]*upsi.imag
+            kfu[ind3t] = c0[np.ix_(ind, index2)]*upsi.imag
 
         #(2) when wd is complex
         if np.any(wbool):
-            #Indexes of index and t related to (2)
-            t1 = t[ind2t]
             ind = index[ind2t]
             #Index transformation
             d = np.asarray(np.where(wbool)[0])
@@ -541,52 +562,10 @@ class EQ_ODE2(Kern):
             ind = indd[ind]
             #Dx1 terms
             w = .5*np.sqrt(C2[d] - 4.*B[d])
-            alphad = alpha[d]
-            gam = alphad - w
-            gamc = alphad + w
             #DxQ terms
             Slq = S[d]*(lq*.25)
             c0 = -Slq*(np.sqrt(np.pi)/w)
-            nu = gam*(lq*.5)
-            nuc = gamc*(lq*.5)
-            #1xM terms
-            z_lq = z/lq[0, index2]
-            #NxQ terms
-            t_lq = t1/lq[0, index2]
-            #NxM terms
-            zt_lq = z_lq - t_lq
-
-            # Upsilon Calculations
-            tz = t1-z
-            z_lq2 = -z_lq*z_lq
-            zt_lq2 = -zt_lq*zt_lq
-            gamt = -gam[ind]*t1
-            gamct = -gamc[ind]*t1
-            fullind = np.ix_(ind, index2)
-            upsi = np.exp(z_lq2 + gamt + np.log(wofz(1j*(z_lq + nu[fullind])).real))\
-                   - np.exp(z_lq2 + gamct + np.log(wofz(1j*(z_lq + nuc[fullind])).real))
-
-            z1 = zt_lq + nu[fullind]
-            indv1 = np.where(z1 >= 0.)
-            indv2 = np.where(z1 < 0.)
-            if indv1[0].shape > 0:
-                upsi[indv1] -= np.exp(zt_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
-                nua2 = nu[ind[indv2[0]], index2[indv2[1]]]**2
-                upsi[indv2] -= np.exp(nua2 - gam[ind[indv2[0]], 0]*tz[indv2] + np.log(2.))\
-                               - np.exp(zt_lq2[indv2] + np.log(wofz(-1j*z1[indv2]).real))
-            z1 = zt_lq + nuc[fullind]
-            indv1 = np.where(z1 >= 0.)
-            indv2 = np.where(z1 < 0.)
-            if indv1[0].shape > 0:
-                upsi[indv1] += np.exp(zt_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
-                nuac2 = nuc[ind[indv2[0]], index2[indv2[1]]]**2
-                upsi[indv2] += np.exp(nuac2 - gamc[ind[indv2[0]], 0]*tz[indv2] + np.log(2.))\
-                               - np.exp(zt_lq2[indv2] + np.log(wofz(-1j*z1[indv2]).real))
-            upsi[t1[:, 0] == 0., :] = 0.
-
-            kfu[ind2t] = c0[np.ix_(ind, index2)]*upsi
+            kfu[ind2t] = c0[np.ix_(ind, index2)]*(upsi1 - upsi2)
         return kfu
 
     #Gradient of Kuu wrt lengthscale
@@ -733,9 +712,9 @@ class EQ_ODE2(Kern):
             indv1 = np.where(z1.real >= 0.)
             indv2 = np.where(z1.real < 0.)
             upv = -np.exp(lwnu[ind] + gamt)
-            if indv1[0].shape > 0:
+            if indv1[0].size > 0:
                 upv[indv1] += np.exp(t2_lq2[indv1] + np.log(wofz(1j*z1[indv1])))
-            if indv2[0].shape > 0:
+            if indv2[0].size > 0:
                 upv[indv2] += np.exp(nu2[ind[indv2[0]], indv2[1]] + gamt[indv2[0], 0] + np.log(2.))\
                              - np.exp(t2_lq2[indv2] + np.log(wofz(-1j*z1[indv2])))
             upv[t1[:, 0] == 0, :] = 0.
@@ -850,9 +829,9 @@ class EQ_ODE2(Kern):
             indv1 = np.where(z1 >= 0.)
             indv2 = np.where(z1 < 0.)
             upv = -np.exp(lwnu[ind] + gamt)
-            if indv1[0].shape > 0:
+            if indv1[0].size > 0:
                 upv[indv1] += np.exp(t2_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
+            if indv2[0].size > 0:
                 upv[indv2] += np.exp(nu2[ind[indv2[0]], indv2[1]] + gamt[indv2[0], 0] + np.log(2.)) - np.exp(t2_lq2[indv2]\
                     + np.log(wofz(-1j*z1[indv2]).real))
             upv[t1[:, 0] == 0, :] = 0.
@@ -867,9 +846,9 @@ class EQ_ODE2(Kern):
             indv1 = np.where(z1 >= 0.)
             indv2 = np.where(z1 < 0.)
             upvc = -np.exp(lwnuc[ind] + gamct)
-            if indv1[0].shape > 0:
+            if indv1[0].size > 0:
                 upvc[indv1] += np.exp(t2_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
+            if indv2[0].size > 0:
                 upvc[indv2] += np.exp(nuc2[ind[indv2[0]], indv2[1]] + gamct[indv2[0], 0] + np.log(2.)) - np.exp(t2_lq2[indv2]\
                     + np.log(wofz(-1j*z1[indv2]).real))
             upvc[t1[:, 0] == 0, :] = 0.
@@ -984,6 +963,7 @@ class EQ_ODE2(Kern):
         index2 = index2.reshape(index2.size,)
         lq = self.lengthscale.values.reshape((1, self.rank))
         lq2 = lq*lq
+        upsi, upsi1, upsi2 = self._upsilon(t, d[index], z, index2)
 
         alpha = .5*C
 
@@ -1018,7 +998,6 @@ class EQ_ODE2(Kern):
             c0 = S_wpi*lq #lq*Sdq*sqrt(pi)/(2w)
             nu = gam*lq
             nu2 = 1.+.5*(nu*nu)
-            nu *= .5
 
             #1xM terms
             z_lq = z/lq[0, index2]
@@ -1033,21 +1012,6 @@ class EQ_ODE2(Kern):
             ezt_lq2 = -np.exp(zt_lq2)
             ezgamt = np.exp(z_lq2 + gamt)
 
-            # Upsilon calculations
-            fullind = np.ix_(ind, index2)
-            upsi = - np.exp(z_lq2 + gamt + np.log(wofz(1j*(z_lq + nu[fullind]))))
-            tz = t1-z
-            z1 = zt_lq + nu[fullind]
-            indv1 = np.where(z1.real >= 0.)
-            indv2 = np.where(z1.real < 0.)
-            if indv1[0].shape > 0:
-                upsi[indv1] += np.exp(zt_lq2[indv1] + np.log(wofz(1j*z1[indv1])))
-            if indv2[0].shape > 0:
-                nua2 = nu[ind[indv2[0]], index2[indv2[1]]]**2
-                upsi[indv2] += np.exp(nua2 - gam[ind[indv2[0]], 0]*tz[indv2] + np.log(2.))\
-                               - np.exp(zt_lq2[indv2] + np.log(wofz(-1j*z1[indv2])))
-            upsi[t1[:, 0] == 0., :] = 0.
-
             #Gradient wrt S
             #DxQ term
             Sa1 = lq*(.5*np.sqrt(np.pi))/w
@@ -1115,8 +1079,6 @@ class EQ_ODE2(Kern):
             nuc = gamc*lq
             nu2 = 1.+.5*(nu*nu)
             nuc2 = 1.+.5*(nuc*nuc)
-            nu *= .5
-            nuc *= .5
             #1xM terms
             z_lq = z/lq[0, index2]
             z_lq2 = -z_lq*z_lq
@@ -1132,33 +1094,6 @@ class EQ_ODE2(Kern):
             ezgamt = np.exp(z_lq2 + gamt)
             ezgamct = np.exp(z_lq2 + gamct)
 
-            # Upsilon calculations
-            fullind = np.ix_(ind, index2)
-            upsi1 = - np.exp(z_lq2 + gamct + np.log(wofz(1j*(z_lq + nuc[fullind])).real))
-            tz = t1-z
-            z1 = zt_lq + nuc[fullind]
-            indv1 = np.where(z1 >= 0.)
-            indv2 = np.where(z1 < 0.)
-            if indv1[0].shape > 0:
-                upsi1[indv1] += np.exp(zt_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
-                nuac2 = nuc[ind[indv2[0]], index2[indv2[1]]]**2
-                upsi1[indv2] += np.exp(nuac2 - gamc[ind[indv2[0]], 0]*tz[indv2] + np.log(2.))\
-                               - np.exp(zt_lq2[indv2] + np.log(wofz(-1j*z1[indv2]).real))
-            upsi1[t1[:, 0] == 0., :] = 0.
-
-            upsi2 = - np.exp(z_lq2 + gamt + np.log(wofz(1j*(z_lq + nu[fullind])).real))
-            z1 = zt_lq + nu[fullind]
-            indv1 = np.where(z1 >= 0.)
-            indv2 = np.where(z1 < 0.)
-            if indv1[0].shape > 0:
-                upsi2[indv1] += np.exp(zt_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
-                nua2 = nu[ind[indv2[0]], index2[indv2[1]]]**2
-                upsi2[indv2] += np.exp(nua2 - gam[ind[indv2[0]], 0]*tz[indv2] + np.log(2.))\
-                               - np.exp(zt_lq2[indv2] + np.log(wofz(-1j*z1[indv2]).real))
-            upsi2[t1[:, 0] == 0., :] = 0.
-
             #Gradient wrt lq
             la1 = S_wpi*nu2
             la1c = S_wpi*nuc2
@@ -1240,6 +1175,7 @@ class EQ_ODE2(Kern):
         z = Z[:, 0].reshape(1, Z.shape[0])
         index2 = index2.reshape(index2.size,)
         lq = self.lengthscale.values.reshape((1, self.rank))
+        upsi, upsi1, upsi2 = self._upsilon(t, d[index], z, index2)
 
         #kfu = np.empty((t.size, z.size))
         gz = np.empty((t.size, z.size))
@@ -1263,36 +1199,15 @@ class EQ_ODE2(Kern):
             S_wpi =S_w*(.5*np.sqrt(np.pi))
             #DxQ terms
             c0 = S_wpi*lq #lq*Sdq*sqrt(pi)/(2w)
-            nu = (.5*gam)*lq
 
             #1xM terms
             z_lq = z/lq[0, index2]
             z_lq2 = -z_lq*z_lq
-            #NxQ terms
-            t_lq = t1/lq
             #DxM terms
             gamt = -gam[ind]*t1
             #NxM terms
-            zt_lq = z_lq - t_lq[:, index2]
-            zt_lq2 = -zt_lq*zt_lq
-            #ezt_lq2 = -np.exp(zt_lq2)
             ezgamt = np.exp(z_lq2 + gamt)
 
-            # Upsilon calculations
-            fullind = np.ix_(ind, index2)
-            upsi = - np.exp(z_lq2 + gamt + np.log(wofz(1j*(z_lq + nu[fullind]))))
-            tz = t1-z
-            z1 = zt_lq + nu[fullind]
-            indv1 = np.where(z1.real >= 0.)
-            indv2 = np.where(z1.real < 0.)
-            if indv1[0].shape > 0:
-                upsi[indv1] += np.exp(zt_lq2[indv1] + np.log(wofz(1j*z1[indv1])))
-            if indv2[0].shape > 0:
-                nua2 = nu[ind[indv2[0]], index2[indv2[1]]]**2
-                upsi[indv2] += np.exp(nua2 - gam[ind[indv2[0]], 0]*tz[indv2] + np.log(2.))\
-                               - np.exp(zt_lq2[indv2] + np.log(wofz(-1j*z1[indv2])))
-            upsi[t1[:, 0] == 0., :] = 0.
-
             #Gradient wrt z
             za1 = c0*gam
             #za2 = S_w
@@ -1317,8 +1232,6 @@ class EQ_ODE2(Kern):
             S_w = -S[d]/w #minus is given by j*j
             S_wpi = S_w*(.25*np.sqrt(np.pi))
             c0 = S_wpi*lq
-            nu = .5*gam*lq
-            nuc = .5*gamc*lq
 
             #1xM terms
             z_lq = z/lq[0, index2]
@@ -1326,41 +1239,10 @@ class EQ_ODE2(Kern):
             #Nx1
             gamt = -gam[ind]*t1
             gamct = -gamc[ind]*t1
-            #NxQ terms
-            t_lq = t1/lq
             #NxM terms
-            zt_lq = z_lq - t_lq[:, index2]
             ezgamt = np.exp(z_lq2 + gamt)
             ezgamct = np.exp(z_lq2 + gamct)
 
-            # Upsilon calculations
-            zt_lq2 = -zt_lq*zt_lq
-            fullind = np.ix_(ind, index2)
-            upsi1 = - np.exp(z_lq2 + gamct + np.log(wofz(1j*(z_lq + nuc[fullind])).real))
-            tz = t1-z
-            z1 = zt_lq + nuc[fullind]
-            indv1 = np.where(z1 >= 0.)
-            indv2 = np.where(z1 < 0.)
-            if indv1[0].shape > 0:
-                upsi1[indv1] += np.exp(zt_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
-                nuac2 = nuc[ind[indv2[0]], index2[indv2[1]]]**2
-                upsi1[indv2] += np.exp(nuac2 - gamc[ind[indv2[0]], 0]*tz[indv2] + np.log(2.))\
-                               - np.exp(zt_lq2[indv2] + np.log(wofz(-1j*z1[indv2]).real))
-            upsi1[t1[:, 0] == 0., :] = 0.
-
-            upsi2 = - np.exp(z_lq2 + gamt + np.log(wofz(1j*(z_lq + nu[fullind])).real))
-            z1 = zt_lq + nu[fullind]
-            indv1 = np.where(z1 >= 0.)
-            indv2 = np.where(z1 < 0.)
-            if indv1[0].shape > 0:
-                upsi2[indv1] += np.exp(zt_lq2[indv1] + np.log(wofz(1j*z1[indv1]).real))
-            if indv2[0].shape > 0:
-                nua2 = nu[ind[indv2[0]], index2[indv2[1]]]**2
-                upsi2[indv2] += np.exp(nua2 - gam[ind[indv2[0]], 0]*tz[indv2] + np.log(2.))\
-                               - np.exp(zt_lq2[indv2] + np.log(wofz(-1j*z1[indv2]).real))
-            upsi2[t1[:, 0] == 0., :] = 0.
-
             #Gradient wrt z
             za1 = c0*gam
             za1c = c0*gamc
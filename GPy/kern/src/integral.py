@@ -2,6 +2,7 @@
 
 from __future__ import division
 import numpy as np
+from scipy.special import erf
 from .kern import Kern
 from ...core.parameterization import Param
 from paramz.transformations import Logexp
@@ -25,19 +26,32 @@ class Integral(Kern): #todo do I need to inherit from Stationary
         self.link_parameters(self.variances, self.lengthscale) #this just takes a list of parameters we need to optimise.
 
     def h(self, z):
-        return 0.5 * z * np.sqrt(math.pi) * math.erf(z) + np.exp(-(z**2))        
+        return 0.5 * z * np.sqrt(math.pi) * erf(z) + np.exp(-(z**2))        
 
     def dk_dl(self, t, tprime, l): #derivative of the kernel wrt lengthscale
         return l * ( self.h(t/l) - self.h((t - tprime)/l) + self.h(tprime/l) - 1)
 
+    def g_h(self, z):
+        """g(z) and h(z) together, sharing the erf and exp evaluations"""
+        z_erf = z * np.sqrt(math.pi) * erf(z)
+        e = np.exp(-(z**2))
+        return z_erf + e, 0.5 * z_erf + e
+
+    def _k_xx_dk_dl_X(self, X):
+        """k_xx and dk_dl between all rows of X, shared by K and update_gradients_full."""
+        def compute():
+            l = self.lengthscale[0]
+            g_t, h_t = self.g_h(X[:,0]/l)
+            g_tt, h_tt = self.g_h((X[:,0:1] - X[None,:,0])/l)
+            k_xx = 0.5 * (l**2) * (g_t[:,None] - g_tt + g_t[None,:] - 1)
+            dk_dl = l * (h_t[:,None] - h_tt + h_t[None,:] - 1)
+            return k_xx, dk_dl
+        return self._cached_by_value('k_xx', (X, self.lengthscale.values), compute)
+
     def update_gradients_full(self, dL_dK, X, X2=None):
         if X2 is None:  #we're finding dK_xx/dTheta
-            dK_dl = np.zeros([X.shape[0],X.shape[0]])
-            dK_dv = np.zeros([X.shape[0],X.shape[0]])
-            for i,x in enumerate(X):
-                for j,x2 in enumerate(X):
-                    dK_dl[i,j] = self.variances[0]*self.dk_dl(x[0],x2[0],self.lengthscale[0]) #TODO Multiple length scales
-                    dK_dv[i,j] = self.k_xx(x[0],x2[0],self.lengthscale[0])  #the gradient wrt the variance is k_xx.
+            dK_dv, dK_dl = self._k_xx_dk_dl_X(X)  #the gradient wrt the variance is k_xx.
+            dK_dl = self.variances[0]*dK_dl #TODO Multiple length scales
             self.lengthscale.gradient = np.sum(dK_dl * dL_dK)
             self.variances.gradient = np.sum(dK_dv * dL_dK)
         else:     #we're finding dK_xf/Dtheta
@@ -45,7 +59,7 @@ class Integral(Kern): #todo do I need to inherit from Stationary
 
     #useful little function to help calculate the covariances.
     def g(self,z):
-        return 1.0 * z * np.sqrt(math.pi) * math.erf(z) + np.exp(-(z**2))
+        return 1.0 * z * np.sqrt(math.pi) * erf(z) + np.exp(-(z**2))
 
     #covariance between gradients (it's the gradients that we want out... maybe we should have a way of getting K_ff too? Currently you get the diag of K_ff from Kdiag)
     def k_xx(self,t,tprime,l):
@@ -56,27 +70,19 @@ class Integral(Kern): #todo do I need to inherit from Stationary
 
     #covariance between the gradient and the actual value
     def k_xf(self,t,tprime,l):
-        return 0.5 * np.sqrt(math.pi) * l * (math.erf((t-tprime)/l) + math.erf(tprime/l))
+        return 0.5 * np.sqrt(math.pi) * l * (erf((t-tprime)/l) + erf(tprime/l))
 
     def K(self, X, X2=None):
         if X2 is None:
-            K_xx = np.zeros([X.shape[0],X.shape[0]])
-            for i,x in enumerate(X):
-                for j,x2 in enumerate(X):
-                    K_xx[i,j] = self.k_xx(x[0],x2[0],self.lengthscale[0])
+            K_xx, _ = self._k_xx_dk_dl_X(X)
             return K_xx * self.variances[0]
         else:
-            K_xf = np.zeros([X.shape[0],X2.shape[0]])
-            for i,x in enumerate(X):
-                for j,x2 in enumerate(X2):
-                    K_xf[i,j] = self.k_xf(x[0],x2[0],self.lengthscale[0])
+            K_xf = self.k_xf(X[:,0:1],X2[None,:,0],self.lengthscale[0])
             return K_xf * self.variances[0]
 
     def Kdiag(self, X):
         """I've used the fact that we call this method for K_ff when finding the covariance as a hack so
         I know if I should return K_ff or K_xx. In this case we're returning K_ff!!
         $K_{ff}^{post} = K_{ff} - K_{fx} K_{xx}^{-1} K_{xf}$"""
-        K_ff = np.zeros(X.shape[0])
-        for i,x in enumerate(X):
-            K_ff[i] = self.k_ff(x[0],x[0],self.lengthscale[0])
+        K_ff = self.k_ff(X[:,0],X[:,0],self.lengthscale[0])
         return K_ff * self.variances[0]
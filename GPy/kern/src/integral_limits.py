@@ -3,6 +3,7 @@
 from __future__ import division
 import math
 import numpy as np
+from scipy.special import erf
 from .kern import Kern
 from ...core.parameterization import Param
 from paramz.transformations import Logexp
@@ -30,19 +31,38 @@ class Integral_Limits(Kern):
         self.link_parameters(self.variances, self.lengthscale) #this just takes a list of parameters we need to optimise.
 
     def h(self, z):
-        return 0.5 * z * np.sqrt(math.pi) * math.erf(z) + np.exp(-(z**2))
+        return 0.5 * z * np.sqrt(math.pi) * erf(z) + np.exp(-(z**2))
 
     def dk_dl(self, t, tprime, s, sprime, l): #derivative of the kernel wrt lengthscale
         return l * ( self.h((t-sprime)/l) - self.h((t - tprime)/l) + self.h((tprime-s)/l) - self.h((s-sprime)/l))
 
+    def g_h(self, z):
+        """g(z) and h(z) together, sharing the erf and exp evaluations"""
+        z_erf = z * np.sqrt(math.pi) * erf(z)
+        e = np.exp(-(z**2))
+        return z_erf + e, 0.5 * z_erf + e
+
+    def k_xx_dk_dl(self, t, s, l):
+        """k_xx and dk_dl between all pairs of the integrals between s and t (vectors).
+
+        The (tprime-s) terms are the transposes of the (t-sprime) terms, so only
+        three of the four differences need the erf and exp evaluations."""
+        g_ts, h_ts = self.g_h((t[:,None] - s[None,:])/l)
+        g_tt, h_tt = self.g_h((t[:,None] - t[None,:])/l)
+        g_ss, h_ss = self.g_h((s[:,None] - s[None,:])/l)
+        k_xx = 0.5 * (l**2) * (g_ts + g_ts.T - g_tt - g_ss)
+        dk_dl = l * (h_ts + h_ts.T - h_tt - h_ss)
+        return k_xx, dk_dl
+
+    def _k_xx_dk_dl_X(self, X):
+        """k_xx and dk_dl between all rows of X, shared by K and update_gradients_full."""
+        return self._cached_by_value('k_xx', (X, self.lengthscale.values),
+                                     lambda: self.k_xx_dk_dl(X[:,0],X[:,1],self.lengthscale[0]))
+
     def update_gradients_full(self, dL_dK, X, X2=None):
         if X2 is None:  #we're finding dK_xx/dTheta
-            dK_dl = np.zeros([X.shape[0],X.shape[0]])
-            dK_dv = np.zeros([X.shape[0],X.shape[0]])
-            for i,x in enumerate(X):
-                for j,x2 in enumerate(X):
-                    dK_dl[i,j] = self.variances[0]*self.dk_dl(x[0],x2[0],x[1],x2[1],self.lengthscale[0])
-                    dK_dv[i,j] = self.k_xx(x[0],x2[0],x[1],x2[1],self.lengthscale[0])  #the gradient wrt the variance is k_xx.
+            dK_dv, dK_dl = self._k_xx_dk_dl_X(X)  #the gradient wrt the variance is k_xx.
+            dK_dl = self.variances[0]*dK_dl
             self.lengthscale.gradient = np.sum(dK_dl * dL_dK)
             self.variances.gradient = np.sum(dK_dv * dL_dK)
         else:     #we're finding dK_xf/Dtheta
@@ -50,7 +70,7 @@ class Integral_Limits(Kern):
 
     #useful little function to help calculate the covariances.
     def g(self,z):
-        return 1.0 * z * np.sqrt(math.pi) * math.erf(z) + np.exp(-(z**2))
+        return 1.0 * z * np.sqrt(math.pi) * erf(z) + np.exp(-(z**2))
 
     def k_xx(self,t,tprime,s,sprime,l):
         """Covariance between observed values.
@@ -72,7 +92,7 @@ class Integral_Limits(Kern):
 
         Note that sprime isn't actually used in this expression, presumably because the 'primes' are the gradient (latent) values which don't
         involve an integration, and thus there is no domain over which they're integrated, just a single value that we want."""
-        return 0.5 * np.sqrt(math.pi) * l * (math.erf((t-tprime)/l) + math.erf((tprime-s)/l))
+        return 0.5 * np.sqrt(math.pi) * l * (erf((t-tprime)/l) + erf((tprime-s)/l))
 
     def K(self, X, X2=None):
         """Note: We have a latent function and an output function. We want to be able to find:
@@ -92,16 +112,10 @@ class Integral_Limits(Kern):
         So the covariance between LATENT FUNCTIONS is available from Kdiag.        
         """
         if X2 is None:
-            K_xx = np.zeros([X.shape[0],X.shape[0]])
-            for i,x in enumerate(X):
-                for j,x2 in enumerate(X):
-                    K_xx[i,j] = self.k_xx(x[0],x2[0],x[1],x2[1],self.lengthscale[0])
+            K_xx, _ = self._k_xx_dk_dl_X(X)
             return K_xx * self.variances[0]
         else:
-            K_xf = np.zeros([X.shape[0],X2.shape[0]])
-            for i,x in enumerate(X):
-                for j,x2 in enumerate(X2):
-                    K_xf[i,j] = self.k_xf(x[0],x2[0],x[1],self.lengthscale[0]) #x2[1] unused, see k_xf docstring for explanation.
+            K_xf = self.k_xf(X[:,0:1],X2[None,:,0],X[:,1:2],self.lengthscale[0]) #X2[:,1] unused, see k_xf docstring for explanation.
             return K_xf * self.variances[0]
 
     def Kdiag(self, X):
@@ -109,7 +123,5 @@ class Integral_Limits(Kern):
         do prediction we want to know the covariance between LATENT FUNCTIONS (K_ff) (as that's probably
         what the user wants).
         $K_{ff}^{post} = K_{ff} - K_{fx} K_{xx}^{-1} K_{xf}$"""
-        K_ff = np.zeros(X.shape[0])
-        for i,x in enumerate(X):
-            K_ff[i] = self.k_ff(x[0],x[0],self.lengthscale[0])
+        K_ff = self.k_ff(X[:,0],X[:,0],self.lengthscale[0])
         return K_ff * self.variances[0]
@@ -57,19 +57,48 @@ class Kern(Parameterized):
 
         self._sliced_X = 0
         self.useGPU = self._support_GPU and useGPU
+        self._value_cache = {}
 
         from .psi_comp import PSICOMP_GH
         self.psicomp = PSICOMP_GH()
 
+    def __getstate__(self):
+        state = super(Kern, self).__getstate__()
+        state.pop('_value_cache', None)
+        return state
+
     def __setstate__(self, state):
         self._all_dims_active = np.arange(0, max(state['active_dims']) + 1)
         super(Kern, self).__setstate__(state)
+        self._value_cache = {}
+
+    def _cached_by_value(self, name, key, compute, limit=1):
+        """
+        Return compute(), remembering the last limit results under name.
+
+        The results are looked up by the values of the arrays in key (inputs
+        and parameter values). Cache_this compares its arguments by identity,
+        which misses here: the kernel gets new (sliced) input arrays in every
+        call.
+
+        :param str name: the name of the cache
+        :param tuple key: the arrays the result depends on
+        :param callable compute: computes the result (no arguments)
+        :param int limit: the number of results to remember
+        """
+        entries = self._value_cache.get(name, [])
+        for entry_key, result in entries:
+            if all(np.array_equal(a, b) for a, b in zip(entry_key, key)):
+                return result
+        result = compute()
+        self._value_cache[name] = [(tuple(np.array(a) for a in key), result)] + entries[:limit-1]
+        return result
 
     @property
     def _effective_input_dim(self):
         return np.size(self._all_dims_active)
 
-    @Cache_this(limit=3)
+    @Cache_this(limit=3, ignore_args=(0,))
     def _slice_X(self, X):
         try:
             return X[:, self._all_dims_active].astype('float')
@@ -10,31 +10,32 @@ gets calls. The `_all_dims_active` of a kernel decide which dimensions the kerne
 import numpy as np
 from functools import wraps
 from paramz.parameterized import ParametersChangedMeta
+from ...util.profiling import profiled
 
-def put_clean(dct, name, func):
+def put_clean(dct, name, func, phase):
     if name in dct:
         dct['_clean_{}'.format(name)] = dct[name]
-        dct[name] = func(dct[name])
+        dct[name] = profiled(phase)(func(dct[name]))
 
 class KernCallsViaSlicerMeta(ParametersChangedMeta):
     def __new__(cls, name, bases, dct):
-        put_clean(dct, 'K', _slice_K)
-        put_clean(dct, 'Kdiag', _slice_Kdiag)
-        put_clean(dct, 'update_gradients_full', _slice_update_gradients_full)
-        put_clean(dct, 'update_gradients_diag', _slice_update_gradients_diag)
-        put_clean(dct, 'gradients_X', _slice_gradients_X)
-        put_clean(dct, 'gradients_X_X2', _slice_gradients_X)
-        put_clean(dct, 'gradients_XX', _slice_gradients_XX)
-        put_clean(dct, 'gradients_XX_diag', _slice_gradients_XX_diag)
-        put_clean(dct, 'gradients_X_diag', _slice_gradients_X_diag)
-
-        put_clean(dct, 'psi0', _slice_psi)
-        put_clean(dct, 'psi1', _slice_psi)
-        put_clean(dct, 'psi2', _slice_psi)
-        put_clean(dct, 'psi2n', _slice_psi)
-        put_clean(dct, 'update_gradients_expectations', _slice_update_gradients_expectations)
-        put_clean(dct, 'gradients_Z_expectations', _slice_gradients_Z_expectations)
-        put_clean(dct, 'gradients_qX_expectations', _slice_gradients_qX_expectations)
+        put_clean(dct, 'K', _slice_K, 'kernel')
+        put_clean(dct, 'Kdiag', _slice_Kdiag, 'kernel')
+        put_clean(dct, 'update_gradients_full', _slice_update_gradients_full, 'kernel_gradient')
+        put_clean(dct, 'update_gradients_diag', _slice_update_gradients_diag, 'kernel_gradient')
+        put_clean(dct, 'gradients_X', _slice_gradients_X, 'kernel_gradient')
+        put_clean(dct, 'gradients_X_X2', _slice_gradients_X, 'kernel_gradient')
+        put_clean(dct, 'gradients_XX', _slice_gradients_XX, 'kernel_gradient')
+        put_clean(dct, 'gradients_XX_diag', _slice_gradients_XX_diag, 'kernel_gradient')
+        put_clean(dct, 'gradients_X_diag', _slice_gradients_X_diag, 'kernel_gradient')
+
+        put_clean(dct, 'psi0', _slice_psi, 'kernel')
+        put_clean(dct, 'psi1', _slice_psi, 'kernel')
+        put_clean(dct, 'psi2', _slice_psi, 'kernel')
+        put_clean(dct, 'psi2n', _slice_psi, 'kernel')
+        put_clean(dct, 'update_gradients_expectations', _slice_update_gradients_expectations, 'kernel_gradient')
+        put_clean(dct, 'gradients_Z_expectations', _slice_gradients_Z_expectations, 'kernel_gradient')
+        put_clean(dct, 'gradients_qX_expectations', _slice_gradients_qX_expectations, 'kernel_gradient')
         return super(KernCallsViaSlicerMeta, cls).__new__(cls, name, bases, dct)
 
 class _Slice_wrap(object):
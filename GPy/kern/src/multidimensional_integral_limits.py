@@ -2,6 +2,7 @@
 
 from __future__ import division
 import numpy as np
+from scipy.special import erf
 from .kern import Kern
 from ...core.parameterization import Param
 from paramz.transformations import Logexp
@@ -29,23 +30,44 @@ class Multidimensional_Integral_Limits(Kern): #todo do I need to inherit from St
         self.link_parameters(self.variances, self.lengthscale) #this just takes a list of parameters we need to optimise.
 
     def h(self, z):
-        return 0.5 * z * np.sqrt(math.pi) * math.erf(z) + np.exp(-(z**2))
+        return 0.5 * z * np.sqrt(math.pi) * erf(z) + np.exp(-(z**2))
 
     def dk_dl(self, t, tprime, s, sprime, l): #derivative of the kernel wrt lengthscale
         return l * ( self.h((t-sprime)/l) - self.h((t - tprime)/l) + self.h((tprime-s)/l) - self.h((s-sprime)/l))
 
+    def g_h(self, z):
+        """g(z) and h(z) together, sharing the erf and exp evaluations"""
+        z_erf = z * np.sqrt(math.pi) * erf(z)
+        e = np.exp(-(z**2))
+        return z_erf + e, 0.5 * z_erf + e
+
+    def k_xx_dk_dl(self, t, s, l):
+        """k_xx and dk_dl between all pairs of the integrals between s and t (vectors).
+
+        The (tprime-s) terms are the transposes of the (t-sprime) terms, so only
+        three of the four differences need the erf and exp evaluations."""
+        g_ts, h_ts = self.g_h((t[:,None] - s[None,:])/l)
+        g_tt, h_tt = self.g_h((t[:,None] - t[None,:])/l)
+        g_ss, h_ss = self.g_h((s[:,None] - s[None,:])/l)
+        k_xx = 0.5 * (l**2) * (g_ts + g_ts.T - g_tt - g_ss)
+        dk_dl = l * (h_ts + h_ts.T - h_tt - h_ss)
+        return k_xx, dk_dl
+
+    def _k_terms(self, X):
+        """k_xx and dk_dl between all rows of X for every dimension (last axis),
+        shared by K and update_gradients_full."""
+        def compute():
+            k_term = np.empty([X.shape[0],X.shape[0],self.lengthscale.shape[0]])
+            dK_dl_term = np.empty([X.shape[0],X.shape[0],self.lengthscale.shape[0]])
+            for il,l in enumerate(self.lengthscale):
+                idx = il*2 #each pair of input dimensions describe the limits on one actual dimension in the data
+                k_term[:,:,il], dK_dl_term[:,:,il] = self.k_xx_dk_dl(X[:,idx],X[:,idx+1],l)
+            return k_term, dK_dl_term
+        return self._cached_by_value('k_terms', (X, self.lengthscale.values), compute)
+
     def update_gradients_full(self, dL_dK, X, X2=None):
         if X2 is None:  #we're finding dK_xx/dTheta
-            dK_dl_term = np.zeros([X.shape[0],X.shape[0],self.lengthscale.shape[0]])
-            k_term = np.zeros([X.shape[0],X.shape[0],self.lengthscale.shape[0]])
-            dK_dl = np.zeros([X.shape[0],X.shape[0],self.lengthscale.shape[0]])
-            dK_dv = np.zeros([X.shape[0],X.shape[0]])
-            for il,l in enumerate(self.lengthscale):
-                idx = il*2
-                for i,x in enumerate(X):
-                    for j,x2 in enumerate(X):
-                        dK_dl_term[i,j,il] = self.dk_dl(x[idx],x2[idx],x[idx+1],x2[idx+1],l)
-                        k_term[i,j,il] = self.k_xx(x[idx],x2[idx],x[idx+1],x2[idx+1],l)
+            k_term, dK_dl_term = self._k_terms(X)
             for il,l in enumerate(self.lengthscale):
                 dK_dl = self.variances[0] * dK_dl_term[:,:,il]
                 for jl, l in enumerate(self.lengthscale):
@@ -61,7 +83,7 @@ class Multidimensional_Integral_Limits(Kern): #todo do I need to inherit from St
 
     #useful little function to help calculate the covariances.
     def g(self,z):
-        return 1.0 * z * np.sqrt(math.pi) * math.erf(z) + np.exp(-(z**2))
+        return 1.0 * z * np.sqrt(math.pi) * erf(z) + np.exp(-(z**2))
 
     def k_xx(self,t,tprime,s,sprime,l):
         """Covariance between observed values.
@@ -83,17 +105,11 @@ class Multidimensional_Integral_Limits(Kern): #todo do I need to inherit from St
 
         Note that sprime isn't actually used in this expression, presumably because the 'primes' are the gradient (latent) values which don't
         involve an integration, and thus there is no domain over which they're integrated, just a single value that we want."""
-        return 0.5 * np.sqrt(math.pi) * l * (math.erf((t-tprime)/l) + math.erf((tprime-s)/l))
+        return 0.5 * np.sqrt(math.pi) * l * (erf((t-tprime)/l) + erf((tprime-s)/l))
 
     def calc_K_xx_wo_variance(self,X):
         """Calculates K_xx without the variance term"""
-        K_xx = np.ones([X.shape[0],X.shape[0]]) #ones now as a product occurs over each dimension
-        for i,x in enumerate(X):
-            for j,x2 in enumerate(X):
-                for il,l in enumerate(self.lengthscale):
-                    idx = il*2 #each pair of input dimensions describe the limits on one actual dimension in the data
-                    K_xx[i,j] *= self.k_xx(x[idx],x2[idx],x[idx+1],x2[idx+1],l)
-        return K_xx
+        return np.prod(self._k_terms(X)[0], axis=2)
 
     def K(self, X, X2=None):
         if X2 is None: #X vs X
@@ -101,11 +117,9 @@ class Multidimensional_Integral_Limits(Kern): #todo do I need to inherit from St
             return K_xx * self.variances[0]
         else: #X vs X2
             K_xf = np.ones([X.shape[0],X2.shape[0]])
-            for i,x in enumerate(X):
-                for j,x2 in enumerate(X2):
-                    for il,l in enumerate(self.lengthscale):
-                        idx = il*2
-                        K_xf[i,j] *= self.k_xf(x[idx],x2[idx],x[idx+1],l)
+            for il,l in enumerate(self.lengthscale):
+                idx = il*2
+                K_xf *= self.k_xf(X[:,idx:idx+1],X2[None,:,idx],X[:,idx+1:idx+2],l)
             return K_xf * self.variances[0]
 
     def Kdiag(self, X):
@@ -113,8 +127,7 @@ class Multidimensional_Integral_Limits(Kern): #todo do I need to inherit from St
         I know if I should return K_ff or K_xx. In this case we're returning K_ff!!
         $K_{ff}^{post} = K_{ff} - K_{fx} K_{xx}^{-1} K_{xf}$"""
         K_ff = np.ones(X.shape[0])
-        for i,x in enumerate(X):
-            for il,l in enumerate(self.lengthscale):
-                idx = il*2
-                K_ff[i] *= self.k_ff(x[idx],x[idx],l)
+        for il,l in enumerate(self.lengthscale):
+            idx = il*2
+            K_ff *= self.k_ff(X[:,idx],X[:,idx],l)
         return K_ff * self.variances[0]
@@ -10,6 +10,7 @@ from ...util.linalg import tdot
 from ... import util
 from ...util.config import config # for assesing whether to use cython
 from paramz.caching import Cache_this
+from paramz.core.observable import Observable
 from paramz.transformations import Logexp
 
 try:
@@ -55,7 +56,15 @@ class Stationary(Kern):
     In Stationary, a covariance function is defined in GPy as stationary when it depends only on the l2-norm |x_1 - x_2 |. 
     However this is the typical definition of isotropy, while stationarity is usually a bit more relaxed. 
     The more common version of stationarity is that the covariance is a function of x_1 - x_2 (See e.g. R&W first paragraph of section 4.1).
+
+    The unscaled distances between the inputs do not depend on the parameters
+    of the kernel and are cached per (X, X2) until the inputs change. For ARD
+    kernels the squared distances per input dimension are cached instead, as
+    long as they have at most max_cached_dim_sq_dists elements.
     """
+    #: maximum number of elements N*M*input_dim of the cached per dimension
+    #: squared distances for ARD kernels (default 128 MB in float64)
+    max_cached_dim_sq_dists = 2**24
 
     def __init__(self, input_dim, variance, lengthscale, ARD, active_dims, name, useGPU=False):
         super(Stationary, self).__init__(input_dim, active_dims, name,useGPU=useGPU)
@@ -119,10 +128,14 @@ class Stationary(Kern):
         #a convenience function, so we can cache dK_dr
         return self.dK2_drdr(self._scaled_dist(X, X2))
 
+    @Cache_this(limit=3, ignore_args=(0,))
     def _unscaled_dist(self, X, X2=None):
         """
         Compute the Euclidean distance between each row of X and X2, or between
         each pair of rows of X if X2 is None.
+
+        The result only depends on X and X2 and is therefore cached across
+        parameter changes of this kernel.
         """
         #X, = self._slice_X(X)
         if X2 is None:
@@ -139,6 +152,24 @@ class Stationary(Kern):
             r2 = np.clip(r2, 0, np.inf)
             return np.sqrt(r2)
 
+    @Cache_this(limit=3, ignore_args=(0,))
+    def _unscaled_dim_sq_dists(self, X, X2=None):
+        """
+        Compute the squared differences (x_q - x'_q)^2 for each pair of rows of X
+        and X2 (or X if X2 is None) and each input dimension q, as an NxMxQ array.
+
+        Returns None if X or X2 cannot be cached (so that recomputing would
+        not pay off), or if the result has more than
+        max_cached_dim_sq_dists elements.
+        """
+        if not (isinstance(X, Observable) and (X2 is None or isinstance(X2, Observable))):
+            return None
+        if X2 is None:
+            X2 = X
+        if X.shape[0] * X2.shape[0] * X.shape[1] > self.max_cached_dim_sq_dists:
+            return None
+        return np.square(X[:, None, :] - X2[None, :, :])
+
     @Cache_this(limit=3, ignore_args=())
     def _scaled_dist(self, X, X2=None):
         """
@@ -153,6 +184,10 @@ class Stationary(Kern):
 
         """
         if self.ARD:
+            dim_sq_dists = self._unscaled_dim_sq_dists(X, X2)
+            if dim_sq_dists is not None:
+                r2 = np.dot(dim_sq_dists, 1./np.square(self.lengthscale.values))
+                return np.sqrt(r2)
             if X2 is not None:
                 X2 = X2 / self.lengthscale
             return self._unscaled_dist(X/self.lengthscale, X2)
@@ -188,8 +223,11 @@ class Stationary(Kern):
         if self.ARD:
 
             tmp = dL_dr*self._inv_dist(X, X2)
+            dim_sq_dists = self._unscaled_dim_sq_dists(X, X2)
             if X2 is None: X2 = X
-            if config.getboolean('cython', 'working'):
+            if dim_sq_dists is not None:
+                self.lengthscale.gradient = -np.dot(tmp.ravel(), dim_sq_dists.reshape(-1, self.input_dim))/self.lengthscale**3
+            elif config.getboolean('cython', 'working'):
                 self.lengthscale.gradient = self._lengthscale_grads_cython(tmp, X, X2)
             else:
                 self.lengthscale.gradient = self._lengthscale_grads_pure(tmp, X, X2)
@@ -51,12 +51,11 @@ class Bernoulli(Likelihood):
         :param tau_i: precision of the cavity distribution (float)
         :param v_i: mean/variance of the cavity distribution (float)
         """
-        if Y_i == 1:
-            sign = 1.
-        elif Y_i == 0 or Y_i == -1:
-            sign = -1
-        else:
+        # one observation per cavity, so this also works for arrays of sites
+        Y_i = np.asarray(Y_i).reshape(np.shape(tau_i))
+        if np.any((Y_i != 1) & (Y_i != 0) & (Y_i != -1)):
             raise ValueError("bad value for Bernoulli observation (0, 1)")
+        sign = np.where(Y_i == 1, 1., -1.)
         if isinstance(self.gp_link, link_functions.Probit):
             z = sign*v_i/np.sqrt(tau_i**2 + tau_i)
             Z_hat = std_norm_cdf(z)
@@ -68,7 +67,7 @@ class Bernoulli(Likelihood):
 
         elif isinstance(self.gp_link, link_functions.Heaviside):
             a = sign*v_i/np.sqrt(tau_i)
-            Z_hat = np.max(1e-13, std_norm_cdf(z))
+            Z_hat = np.maximum(1e-13, std_norm_cdf(a))
             N = std_norm_pdf(a)
             mu_hat = v_i/tau_i + sign*N/Z_hat/np.sqrt(tau_i)
             sigma2_hat = (1. - a*N/Z_hat - np.square(N/Z_hat))/tau_i
@@ -78,6 +77,11 @@ class Bernoulli(Likelihood):
 
         return Z_hat, mu_hat, sigma2_hat
 
+    def moments_match_ep_vectorized(self, Y, tau, v, Y_metadata=None):
+        if isinstance(self.gp_link, (link_functions.Probit, link_functions.Heaviside)):
+            return self.moments_match_ep(Y, tau, v)
+        return super(Bernoulli, self).moments_match_ep_vectorized(Y, tau, v, Y_metadata=Y_metadata)
+
     def variational_expectations(self, Y, m, v, gh_points=None, Y_metadata=None):
         if isinstance(self.gp_link, link_functions.Probit):
 
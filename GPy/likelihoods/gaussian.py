@@ -81,6 +81,9 @@ class Gaussian(Likelihood):
         Z_hat = 1./np.sqrt(2.*np.pi*sum_var)*np.exp(-.5*(data_i - v_i/tau_i)**2./sum_var)
         return Z_hat, mu_hat, sigma2_hat
 
+    def moments_match_ep_vectorized(self, Y, tau, v, Y_metadata=None):
+        return self.moments_match_ep(np.asarray(Y).flatten(), tau, v)
+
     def predictive_values(self, mu, var, full_cov=False, Y_metadata=None):
         if full_cov:
             if var.ndim == 2:
@@ -33,7 +33,15 @@ class Likelihood(Parameterized):
 
     For exact Gaussian inference, define *JH TODO*
 
+    Integrals over the latent function (predictive moments and density, EP
+    moments) are computed with Gauss-Hermite quadrature of degree gh_degree.
+    Set adaptive_quadrature to True to use the (much slower) adaptive
+    scipy.integrate.quad instead.
+
     """
+    gh_degree = 20
+    adaptive_quadrature = False
+
     def __init__(self, gp_link, name):
         super(Likelihood, self).__init__(name)
         assert isinstance(gp_link,link_functions.GPTransformation), "gp_link is not a valid GPTransformation."
@@ -78,7 +86,7 @@ class Likelihood(Parameterized):
         """
         raise NotImplementedError
 
-    def log_predictive_density(self, y_test, mu_star, var_star, Y_metadata=None):
+    def log_predictive_density(self, y_test, mu_star, var_star, Y_metadata=None, gh_points=None):
         """
         Calculation of the log predictive density
 
@@ -91,11 +99,30 @@ class Likelihood(Parameterized):
         :type mu_star: (Nx1) array
         :param var_star: predictive variance of gaussian p(f_{*}|mu_{*}, var_{*})
         :type var_star: (Nx1) array
+        :param gh_points: Gauss-Hermite points and weights, if None _gh_points is used
+        :type gh_points: tuple of arrays
         """
         assert y_test.shape==mu_star.shape
         assert y_test.shape==var_star.shape
         assert y_test.shape[1] == 1
 
+        if self.adaptive_quadrature:
+            return self._log_predictive_density_quad(y_test, mu_star, var_star, Y_metadata=Y_metadata)
+
+        F, gh_w = self._predictive_grid(mu_star, var_star, gh_points)
+        logp = self.logpdf(F, y_test, Y_metadata=Y_metadata)
+        #work in the log space, scaled by the largest value per test point
+        logp_max = logp.max(1)
+        p_scaled = np.dot(np.exp(logp - logp_max[:,None]), gh_w)
+        #division by sqrt(pi) comes from the change of variables of the quadrature
+        log_p_ystar = np.log(p_scaled) + logp_max - 0.5*np.log(np.pi)
+        return log_p_ystar.reshape(*y_test.shape)
+
+    def _log_predictive_density_quad(self, y_test, mu_star, var_star, Y_metadata=None):
+        """
+        Calculation of the log predictive density using adaptive quadrature,
+        one integral per test point. See log_predictive_density.
+        """
         flat_y_test = y_test.flatten()
         flat_mu_star = mu_star.flatten()
         flat_var_star = var_star.flatten()
@@ -184,6 +211,10 @@ class Likelihood(Parameterized):
         :param tau: cavity distribution 1st natural parameter (precision)
         :param v: cavity distribution 2nd natural paramenter (mu*precision)
         """
+        if not self.adaptive_quadrature:
+            z, mean, variance = self.moments_match_ep_vectorized(np.atleast_1d(obs), np.atleast_1d(tau), np.atleast_1d(v), Y_metadata=Y_metadata_i)
+            return z[0], mean[0], variance[0]
+
         #Compute first integral for zeroth moment.
         #NOTE constant np.sqrt(2*pi/tau) added at the end of the function
         mu = v/tau
@@ -216,10 +247,39 @@ class Likelihood(Parameterized):
 
         return z, mean, variance
 
+    def moments_match_ep_vectorized(self, Y, tau, v, Y_metadata=None):
+        """
+        Moments match of the marginal approximations for all EP sites at once,
+        using Gauss-Hermite quadrature. Likelihoods with closed form moments
+        should override this.
+
+        :param Y: observed outputs (Nx1)
+        :param tau: cavity distributions 1st natural parameters (precisions, N)
+        :param v: cavity distributions 2nd natural parameters (mu*precision, N)
+        :param Y_metadata: Y_metadata with one row per site
+        :returns: Z_hat, mu_hat, sigma2_hat (each of size N)
+        """
+        gh_x, gh_w = self._gh_points()
+        mu = v/tau
+        std = np.sqrt(1./tau)
+        F = mu[:, None] + np.sqrt(2.)*std[:, None]*gh_x[None, :]
+        Y = np.repeat(np.asarray(Y).reshape(-1, 1), gh_x.size, axis=1)
+        logp = self.logpdf(F, Y, Y_metadata=Y_metadata)
+        # scale by the largest log likelihood value per site for stability
+        logp_max = logp.max(1)[:, None]
+        w = np.exp(logp - logp_max)*gh_w[None, :]
+        z_scaled = w.sum(1)
+        mu_hat = np.sum(w*F, 1)/z_scaled
+        sigma2_hat = np.sum(w*np.square(F - mu_hat[:, None]), 1)/z_scaled
+        Z_hat = z_scaled*np.exp(logp_max[:, 0])/np.sqrt(np.pi)
+        return Z_hat, mu_hat, sigma2_hat
+
     #only compute gh points if required
     __gh_points = None
-    def _gh_points(self, T=20):
-        if self.__gh_points is None:
+    def _gh_points(self, T=None):
+        if T is None:
+            T = self.gh_degree
+        if self.__gh_points is None or self.__gh_points[0].size != T:
             self.__gh_points = np.polynomial.hermite.hermgauss(T)
         return self.__gh_points
 
@@ -278,13 +338,37 @@ class Likelihood(Parameterized):
             dF_dtheta = None # Not yet implemented
         return F.reshape(*shape), dF_dm.reshape(*shape), dF_dv.reshape(*shape), dF_dtheta
 
-    def predictive_mean(self, mu, variance, Y_metadata=None):
+    def predictive_mean(self, mu, variance, Y_metadata=None, gh_points=None):
         """
         Quadrature calculation of the predictive mean: E(Y_star|Y) = E( E(Y_star|f_star, Y) )
 
         :param mu: mean of posterior
         :param sigma: standard deviation of posterior
+        :param gh_points: Gauss-Hermite points and weights, if None _gh_points is used
 
+        """
+        if self.adaptive_quadrature:
+            return self._predictive_mean_quad(mu, variance, Y_metadata=Y_metadata)
+        F, gh_w = self._predictive_grid(mu, variance, gh_points)
+        mean = np.dot(self.conditional_mean(F), gh_w)/np.sqrt(np.pi)
+        return mean[:,None]
+
+    def _predictive_grid(self, mu, variance, gh_points=None):
+        """
+        Gauss-Hermite locations of the latent function for every test point
+        (first axis) and quadrature point (second axis), and the weights.
+        """
+        if gh_points is None:
+            gh_x, gh_w = self._gh_points()
+        else:
+            gh_x, gh_w = gh_points
+        mu, variance = np.asarray(mu).flatten(), np.asarray(variance).flatten()
+        return gh_x[None,:]*np.sqrt(2.*variance[:,None]) + mu[:,None], gh_w
+
+    def _predictive_mean_quad(self, mu, variance, Y_metadata=None):
+        """
+        Predictive mean using adaptive quadrature, one integral per test point.
+        See predictive_mean.
         """
         #conditional_mean: the edpected value of y given some f, under this likelihood
         fmin = -np.inf
@@ -305,7 +389,7 @@ class Likelihood(Parameterized):
         mean = np.array(scaled_mean)[:,None] / np.sqrt(2*np.pi*(variance))
         return mean
 
-    def predictive_variance(self, mu,variance, predictive_mean=None, Y_metadata=None):
+    def predictive_variance(self, mu,variance, predictive_mean=None, Y_metadata=None, gh_points=None):
         """
         Approximation to the predictive variance: V(Y_star)
 
@@ -315,13 +399,34 @@ class Likelihood(Parameterized):
         :param mu: mean of posterior
         :param sigma: standard deviation of posterior
         :predictive_mean: output's predictive mean, if None _predictive_mean function will be called.
+        :param gh_points: Gauss-Hermite points and weights, if None _gh_points is used
 
+        """
+        if self.adaptive_quadrature:
+            return self._predictive_variance_quad(mu, variance, predictive_mean, Y_metadata=Y_metadata)
+        if predictive_mean is None:
+            predictive_mean = self.predictive_mean(mu, variance, Y_metadata=Y_metadata)
+        F, gh_w = self._predictive_grid(mu, variance, gh_points)
+
+        # E( V(Y_star|f_star) ), conditional_variance may not depend on f_star
+        cond_var = np.broadcast_to(self.conditional_variance(F), F.shape)
+        exp_var = np.dot(cond_var, gh_w)[:,None]/np.sqrt(np.pi)
+
+        # V( E(Y_star|f_star) ) =  E( E(Y_star|f_star)**2 ) - E( E(Y_star|f_star) )**2
+        exp_exp2 = np.dot(np.square(self.conditional_mean(F)), gh_w)[:,None]/np.sqrt(np.pi)
+        var_exp = exp_exp2 - np.square(predictive_mean)
+        return exp_var + var_exp
+
+    def _predictive_variance_quad(self, mu,variance, predictive_mean=None, Y_metadata=None):
+        """
+        Predictive variance using adaptive quadrature, one integral per test
+        point. See predictive_variance.
         """
         #sigma2 = sigma**2
         normalizer = np.sqrt(2*np.pi*variance)
 
         fmin_v = -np.inf
-        fmin_m = np.inf
+        fmin_m = -np.inf
         fmin = -np.inf
         fmax = np.inf
 
@@ -342,7 +447,7 @@ class Likelihood(Parameterized):
 
         #E( E(Y_star|f_star) )**2
         if predictive_mean is None:
-            predictive_mean = self.predictive_mean(mu,variance)
+            predictive_mean = self._predictive_mean_quad(mu,variance)
         predictive_mean_sq = predictive_mean**2
 
         #E( E(Y_star|f_star)**2 )
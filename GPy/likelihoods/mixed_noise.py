@@ -19,14 +19,33 @@ class MixedNoise(Likelihood):
         self.link_parameters(*likelihoods_list)
         self.likelihoods_list = likelihoods_list
         self.log_concave = False
+        self._all_gaussian = all([isinstance(l, Gaussian) and l.size == 1 for l in likelihoods_list])
+        self._index_cache = None
+
+    def _output_index(self, Y_metadata):
+        """
+        Flat integer output index of Y_metadata, cached per output_index array
+        (which, as everywhere in GPy, is not expected to change in place).
+        """
+        output_index = Y_metadata['output_index']
+        cache = getattr(self, '_index_cache', None)
+        if cache is None or cache[0] is not output_index:
+            cache = (output_index, np.asarray(output_index, dtype=int).flatten())
+            self._index_cache = cache
+        return cache[1]
+
+    def _variances(self):
+        """
+        The variances of all (Gaussian) likelihoods, in the order of likelihoods_list.
+
+        Each Gaussian links exactly one parameter, so these are the parameter
+        array of this likelihood itself.
+        """
+        assert self._all_gaussian
+        return self.param_array
 
     def gaussian_variance(self, Y_metadata):
-        assert all([isinstance(l, Gaussian) for l in self.likelihoods_list])
-        ind = Y_metadata['output_index'].flatten()
-        variance = np.zeros(ind.size)
-        for lik, j in zip(self.likelihoods_list, range(len(self.likelihoods_list))):
-            variance[ind==j] = lik.variance
-        return variance
+        return self._variances()[self._output_index(Y_metadata)]
 
     def betaY(self,Y,Y_metadata):
         #TODO not here.
@@ -36,17 +55,20 @@ class MixedNoise(Likelihood):
         self.gradient = gradients
 
     def exact_inference_gradients(self, dL_dKdiag, Y_metadata):
-        assert all([isinstance(l, Gaussian) for l in self.likelihoods_list])
-        ind = Y_metadata['output_index'].flatten()
-        return np.array([dL_dKdiag[ind==i].sum() for i in range(len(self.likelihoods_list))])
+        assert self._all_gaussian
+        ind = self._output_index(Y_metadata)
+        return np.bincount(ind, weights=dL_dKdiag.flatten(), minlength=len(self.likelihoods_list))
 
     def predictive_values(self, mu, var, full_cov=False, Y_metadata=None):
-        ind = Y_metadata['output_index'].flatten()
-        _variance = np.array([self.likelihoods_list[j].variance for j in ind ])
+        _variance = self.gaussian_variance(Y_metadata)
         if full_cov:
-            var += np.eye(var.shape[0])*_variance
+            diag = np.arange(var.shape[0])
+            if var.ndim == 2:
+                var[diag, diag] += _variance
+            if var.ndim == 3:
+                var[diag, diag] += _variance[:, None]
         else:
-            var += _variance
+            var += _variance.reshape((-1,) + (1,)*(var.ndim-1))
         return mu, var
 
     def predictive_variance(self, mu, sigma, Y_metadata):
@@ -54,7 +76,10 @@ class MixedNoise(Likelihood):
         return _variance + sigma**2
 
     def predictive_quantiles(self, mu, var, quantiles, Y_metadata):
-        ind = Y_metadata['output_index'].flatten()
+        ind = self._output_index(Y_metadata)
+        if self._all_gaussian:
+            _s = self._variances()[ind].reshape((-1,) + (1,)*(var.ndim-1))
+            return [stats.norm.ppf(q/100.)*np.sqrt(var + _s) + mu for q in quantiles]
         outputs = np.unique(ind)
         Q = np.zeros( (mu.size,len(quantiles)) )
         for j in outputs:
@@ -17,13 +17,13 @@ from .gp_coregionalized_regression import GPCoregionalizedRegression
 from .sparse_gp_coregionalized_regression import SparseGPCoregionalizedRegression
 from .gp_heteroscedastic_regression import GPHeteroscedasticRegression
 from .ss_mrd import SSMRD
-from .gp_kronecker_gaussian_regression import GPKroneckerGaussianRegression
+from .gp_kronecker_gaussian_regression import GPKroneckerGaussianRegression, GPKroneckerGaussianRegressionND
 from .gp_var_gauss import GPVariationalGaussianApproximation
 from .one_vs_all_classification import OneVsAllClassification
 from .one_vs_all_sparse_classification import OneVsAllSparseClassification
 from .dpgplvm import DPBayesianGPLVM
 
-from .state_space_model import StateSpace
+from .state_space_model import StateSpace, StateSpaceMultiSeries
 
 from .ibp_lfm import IBPLFM
 
@@ -6,6 +6,7 @@ from ..core import GP
 from .. import likelihoods
 from .. import kern
 from .. import util
+from ..inference.latent_function_inference.kronecker_gaussian_inference import KroneckerGaussianInference, update_kern_gradients
 
 class GPCoregionalizedRegression(GP):
     """
@@ -27,8 +28,12 @@ class GPCoregionalizedRegression(GP):
     :type W_rank: integer
     :param kernel_name: name of the kernel
     :type kernel_name: string
+    :param inference_method: inference method, defaults to exact inference.
+        If all outputs are observed at the same inputs, pass
+        KroneckerGaussianInference() to exploit the Kronecker structure of the
+        ICM covariance: O(N^3 + P^3) instead of O(N^3 P^3) for P outputs.
     """
-    def __init__(self, X_list, Y_list, kernel=None, likelihoods_list=None, name='GPCR',W_rank=1,kernel_name='coreg'):
+    def __init__(self, X_list, Y_list, kernel=None, likelihoods_list=None, name='GPCR',W_rank=1,kernel_name='coreg', inference_method=None):
 
         #Input and Output
         X,Y,self.output_index = util.multioutput.build_XY(X_list,Y_list)
@@ -43,4 +48,10 @@ class GPCoregionalizedRegression(GP):
         #Likelihood
         likelihood = util.multioutput.build_likelihood(Y_list,self.output_index,likelihoods_list)
 
-        super(GPCoregionalizedRegression, self).__init__(X,Y,kernel,likelihood, Y_metadata={'output_index':self.output_index})
+        super(GPCoregionalizedRegression, self).__init__(X,Y,kernel,likelihood, inference_method=inference_method, Y_metadata={'output_index':self.output_index})
+
+    def _update_kern_gradients(self):
+        if isinstance(self.inference_method, KroneckerGaussianInference):
+            update_kern_gradients(self.kern, self.X, self.posterior, self.grad_dict)
+        else:
+            super(GPCoregionalizedRegression, self)._update_kern_gradients()
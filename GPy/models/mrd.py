@@ -55,12 +55,13 @@ class MRD(BayesianGPLVMMiniBatch):
     :param bool|Norm normalizer: How to normalize the data?
     :param bool stochastic: Should this model be using stochastic gradient descent over the dimensions?
     :param bool|[bool] batchsize: either one batchsize for all, or one batchsize per dataset.
+    :param int n_jobs: number of threads for the inference of datasets with missing data
     """
     def __init__(self, Ylist, input_dim, X=None, X_variance=None,
                  initx = 'PCA', initz = 'permute',
                  num_inducing=10, Z=None, kernel=None,
                  inference_method=None, likelihoods=None, name='mrd',
-                 Ynames=None, normalizer=False, stochastic=False, batchsize=10):
+                 Ynames=None, normalizer=False, stochastic=False, batchsize=10, n_jobs=1):
 
         self.logger = logging.getLogger(self.__class__.__name__)
         self.input_dim = input_dim
@@ -143,7 +144,7 @@ class MRD(BayesianGPLVMMiniBatch):
                                           normalizer=normalizer,
                                           missing_data=md,
                                           stochastic=stochastic,
-                                          batchsize=bs)
+                                          batchsize=bs, n_jobs=n_jobs)
             spgp.kl_factr = 1./len(Ynames)
             spgp.unlink_parameter(spgp.Z)
             spgp.unlink_parameter(spgp.X)
@@ -22,11 +22,12 @@ class SparseGPClassification(SparseGP):
     :type normalize_X: False|True
     :param normalize_Y:  whether to normalize the input data before computing (predictions will be in original scales)
     :type normalize_Y: False|True
+    :param inference_method: defaults to EPDTC, LaplaceDTC is the sparse Laplace approximation
     :rtype: model object
 
     """
 
-    def __init__(self, X, Y=None, likelihood=None, kernel=None, Z=None, num_inducing=10, Y_metadata=None):
+    def __init__(self, X, Y=None, likelihood=None, kernel=None, Z=None, num_inducing=10, Y_metadata=None, inference_method=None):
         if kernel is None:
             kernel = kern.RBF(X.shape[1])
 
@@ -38,7 +39,10 @@ class SparseGPClassification(SparseGP):
         else:
             assert Z.shape[1] == X.shape[1]
 
-        SparseGP.__init__(self, X, Y, Z, kernel, likelihood, inference_method=EPDTC(), name='SparseGPClassification',Y_metadata=Y_metadata)
+        if inference_method is None:
+            inference_method = EPDTC()
+
+        SparseGP.__init__(self, X, Y, Z, kernel, likelihood, inference_method=inference_method, name='SparseGPClassification',Y_metadata=Y_metadata)
 
 class SparseGPClassificationUncertainInput(SparseGP):
     """
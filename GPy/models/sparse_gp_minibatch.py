@@ -9,6 +9,8 @@ from ..core.sparse_gp import SparseGP
 from ..core.gp import GP
 from ..inference.latent_function_inference import var_dtc
 from .. import likelihoods
+from ..util import diag
+from ..util.linalg import jitchol
 
 import logging
 from ..inference.latent_function_inference.posterior import Posterior
@@ -35,13 +37,17 @@ class SparseGPMiniBatch(SparseGP):
     :type Z: np.ndarray (num_inducing x input_dim)
     :param num_inducing: Number of inducing points (optional, default 10. Ignored if Z is not None)
     :type num_inducing: int
+    :param int n_jobs: number of threads for the inference of the output
+        groups with missing data (see _outer_loop_for_missing_data)
 
     """
+    n_jobs = 1
 
     def __init__(self, X, Y, Z, kernel, likelihood, inference_method=None,
                  name='sparse gp', Y_metadata=None, normalizer=False,
-                 missing_data=False, stochastic=False, batchsize=1):
+                 missing_data=False, stochastic=False, batchsize=1, n_jobs=1):
         self._update_stochastics = False
+        self.n_jobs = n_jobs
 
         # pick a sensible inference method
         if inference_method is None:
@@ -223,6 +229,11 @@ class SparseGPMiniBatch(SparseGP):
     def _outer_loop_for_missing_data(self):
         Lm = None
         dL_dKmm = None
+        if isinstance(self.inference_method, var_dtc.VarDTC):
+            # Kmm does not depend on the missing data, factorize it once for all output groups
+            Kmm = self.kern.K(self.Z).copy()
+            diag.add(Kmm, self.inference_method.const_jitter)
+            Lm = jitchol(Kmm)
 
         self._log_marginal_likelihood = 0
         self.full_values = self._outer_init_full_values()
@@ -234,41 +245,71 @@ class SparseGPMiniBatch(SparseGP):
             woodbury_inv = self.posterior._woodbury_inv
             woodbury_vector = self.posterior._woodbury_vector
 
-        #if not self.stochastics:
-        #    m_f = lambda i: "Inference with missing_data: {: >7.2%}".format(float(i+1)/self.output_dim)
-        #    message = m_f(-1)
-        #    print(message, end=' ')
-
-        for d, ninan in self.stochastics.d:
-            #if not self.stochastics:
-            #    print(' '*(len(message)) + '\r', end=' ')
-            #    message = m_f(d)
-            #    print(message, end=' ')
-
-            psi0ni = self.psi0[ninan]
-            psi1ni = self.psi1[ninan]
-            if self.has_uncertain_inputs():
-                psi2ni = self.psi2[ninan]
-                value_indices = dict(outputs=d, samples=ninan, dL_dpsi0=ninan, dL_dpsi1=ninan, dL_dpsi2=ninan)
-            else:
-                psi2ni = None
-                value_indices = dict(outputs=d, samples=ninan, dL_dKdiag=ninan, dL_dKnm=ninan)
-
-            posterior, log_marginal_likelihood, grad_dict = self._inner_parameters_changed(
-                                self.kern, self.X[ninan],
-                                self.Z, self.likelihood,
-                                self.Y_normalized[ninan][:, d], self.Y_metadata,
+        groups = list(self.stochastics.d)
+        n_jobs = max(1, min(self.n_jobs, len(groups)))
+        if n_jobs > 1:
+            # Kernels keep state while slicing inputs and caching, so every
+            # thread works on its own copy, and on a plain array of Z, so that
+            # the threads do not register observers on the shared parameter.
+            kerns = [self.kern.copy() for _ in range(n_jobs)]
+            Z = self.Z.values
+        else:
+            kerns = [self.kern]
+            Z = self.Z
+
+        def inference(job):
+            i, Xni, Yni, psi0ni, psi1ni, psi2ni = job
+            return self._inner_parameters_changed(
+                                kerns[i], Xni,
+                                Z, self.likelihood,
+                                Yni, self.Y_metadata,
                                 Lm, dL_dKmm,
                                 psi0=psi0ni, psi1=psi1ni, psi2=psi2ni)
 
-            # Fill out the full values by adding in the apporpriate grad_dict
-            # values
-            self._inner_take_over_or_update(self.full_values, grad_dict, value_indices)
-            self._inner_values_update(grad_dict)  # What is this for? -> MRD
-
-            woodbury_inv[:, :, d] = posterior.woodbury_inv[:,:,None]
-            woodbury_vector[:, d] = posterior.woodbury_vector
-            self._log_marginal_likelihood += log_marginal_likelihood
+        pool = None
+        if n_jobs > 1:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(n_jobs)
+        try:
+            # Run n_jobs groups at a time. The inputs are sliced here in the
+            # main thread, and the results are added up in the order of the
+            # groups, so the result does not depend on the scheduling of the
+            # threads.
+            for start in range(0, len(groups), n_jobs):
+                chunk = groups[start:start + n_jobs]
+                jobs = []
+                for i, (d, ninan) in enumerate(chunk):
+                    psi0ni = self.psi0[ninan]
+                    psi1ni = self.psi1[ninan]
+                    if self.has_uncertain_inputs():
+                        psi2ni = self.psi2[ninan]
+                    else:
+                        psi2ni = None
+                    jobs.append((i, self.X[ninan], np.asarray(self.Y_normalized[:, d][ninan]), psi0ni, psi1ni, psi2ni))
+
+                if pool is not None and len(jobs) > 1:
+                    results = pool.map(inference, jobs)
+                else:
+                    results = [inference(job) for job in jobs]
+
+                for (d, ninan), (posterior, log_marginal_likelihood, grad_dict) in zip(chunk, results):
+                    if self.has_uncertain_inputs():
+                        value_indices = dict(outputs=d, samples=ninan, dL_dpsi0=ninan, dL_dpsi1=ninan, dL_dpsi2=ninan)
+                    else:
+                        value_indices = dict(outputs=d, samples=ninan, dL_dKdiag=ninan, dL_dKnm=ninan)
+
+                    # Fill out the full values by adding in the apporpriate grad_dict
+                    # values
+                    self._inner_take_over_or_update(self.full_values, grad_dict, value_indices)
+                    self._inner_values_update(grad_dict)  # What is this for? -> MRD
+
+                    woodbury_inv[:, :, d] = posterior.woodbury_inv[:,:,None]
+                    woodbury_vector[:, d] = posterior.woodbury_vector
+                    self._log_marginal_likelihood += log_marginal_likelihood
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         #if not self.stochastics:
         #    print('')
@@ -2250,11 +2250,16 @@ class ContDescrStateSpace(DescreteStateSpace):
 
         It has the same interface as AQcompute_batch.
 
-        It computes matrices for only one time step. This object is used when
-        there are many different time steps and storing matrices for each of them
-        would take too much memory.
+        It computes matrices for one block of block_size time steps at a
+        time (all different time steps of a block at once, see
+        lti_sde_to_descrete_batch). This object is used when there are many
+        different time steps and storing matrices for each of them would take
+        too much memory.
         """
 
+        #: number of time steps discretized together
+        block_size = 2**12
+
         def __init__(self, F,L,Qc,dt,compute_derivatives=False, grad_params_no=None, P_inf=None, dP_inf=None, dF = None, dQc=None):
             """
             Constructor. All necessary parameters are passed here and stored
@@ -2302,6 +2307,11 @@ class ContDescrStateSpace(DescreteStateSpace):
             self.v_dAk = None
             self.v_dQk = None
 
+            # matrices of the time steps block_start, ..., block_stop-1
+            self.block_start = self.block_stop = 0
+            self.block_derivatives = False
+            self.block = None
+
             self.square_root_computed = False
             # !!!Print statistics! Which object is created
 
@@ -2327,9 +2337,17 @@ class ContDescrStateSpace(DescreteStateSpace):
                     A, Q, dA dQ on step k
             """
             if (self.last_k != k) or (self.last_k_computed == False):
-                v_Ak,v_Qk, tmp, v_dAk, v_dQk = ContDescrStateSpace.lti_sde_to_descrete(self.F,
-                        self.L,self.Qc,self.dt[k],self.compute_derivatives,
-                        grad_params_no=self.grad_params_no, P_inf=self.P_inf, dP_inf=self.dP_inf, dF=self.dF, dQc=self.dQc)
+                if not (self.block_start <= k < self.block_stop) or (self.compute_derivatives and not self.block_derivatives):
+                    start = (k // self.block_size) * self.block_size
+                    stop = min(start + self.block_size, self.dt.shape[0])
+                    self.block = self.block_matrices(start, stop)
+                    self.block_start, self.block_stop = start, stop
+                    self.block_derivatives = self.compute_derivatives
+                As, Qs, dAs, dQs = self.block
+                i = k - self.block_start
+                v_Ak, v_Qk = As[i], Qs[i]
+                v_dAk = dAs[i].transpose(1,2,0) if self.compute_derivatives else None
+                v_dQk = dQs[i].transpose(1,2,0) if self.compute_derivatives else None
 
                 self.last_k = k
                 self.last_k_computed = True
@@ -2348,6 +2366,21 @@ class ContDescrStateSpace(DescreteStateSpace):
 
             return v_Ak,v_Qk, v_dAk, v_dQk
 
+        def block_matrices(self, start, stop):
+            """
+            A, Q (stop-start, n, n) and, if compute_derivatives, dA, dQ
+            (stop-start, params, n, n) of the time steps start, ..., stop-1.
+            """
+            As, Qs, index, dAs, dQs = ContDescrStateSpace.lti_sde_to_descrete(self.F,
+                    self.L,self.Qc,self.dt[start:stop],self.compute_derivatives,
+                    grad_params_no=self.grad_params_no, P_inf=self.P_inf, dP_inf=self.dP_inf, dF=self.dF, dQc=self.dQc)
+            As = As.transpose(2,0,1)[index]
+            Qs = Qs.transpose(2,0,1)[index]
+            if self.compute_derivatives:
+                dAs = dAs.transpose(3,2,0,1)[index]
+                dQs = dQs.transpose(3,2,0,1)[index]
+            return As, Qs, dAs, dQs
+
         def reset(self, compute_derivatives):
             """
             For reusing this object e.g. in smoother computation. Actually,
@@ -2427,7 +2460,7 @@ class ContDescrStateSpace(DescreteStateSpace):
         Since all the matrices are computed all together, this object can be used
         in smoother without repeating the computations.
         """
-        def __init__(self, F,L,Qc,dt,compute_derivatives=False, grad_params_no=None, P_inf=None, dP_inf=None, dF = None, dQc=None):
+        def __init__(self, F,L,Qc,dt,compute_derivatives=False, grad_params_no=None, P_inf=None, dP_inf=None, dF = None, dQc=None, cache=None):
             """
             Constructor. All necessary parameters are passed here and stored
             in the opject.
@@ -2444,13 +2477,16 @@ class ContDescrStateSpace(DescreteStateSpace):
                 dP_inf, dF, dQc: 3D array
                     Derivatives if they are required
 
+                cache: DiscretizationCache or None
+                    Cache of the discrete matrices
+
             Output:
             -------------------
             Nothing
             """
             As, Qs, reconstruct_indices, dAs, dQs = ContDescrStateSpace.lti_sde_to_descrete(F,
                         L,Qc,dt,compute_derivatives,
-                        grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc)
+                        grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc, cache=cache)
 
             self.As = As
             self.Qs = Qs
@@ -2536,7 +2572,8 @@ class ContDescrStateSpace(DescreteStateSpace):
                                  p_kalman_filter_type='regular',
                                  calc_log_likelihood=False,
                                  calc_grad_log_likelihood=False,
-                                 grad_params_no=0, grad_calc_params=None):
+                                 grad_params_no=0, grad_calc_params=None,
+                                 dt_quantum=None, n_jobs=1, discretization_cache=None):
         """
         This function implements the continuous-discrete Kalman Filter algorithm
         These notations for the State-Space model are assumed:
@@ -2620,11 +2657,13 @@ class ContDescrStateSpace(DescreteStateSpace):
             "multiple time series mode" does not affect it, since it does not
             affect anything related to state variaces.
 
-        p_kalman_filter_type: string, one of ('regular', 'svd')
+        p_kalman_filter_type: string, one of ('regular', 'svd', 'parallel')
             Which Kalman Filter is used. Regular or SVD. SVD is more numerically
             stable, in particular, Covariace matrices are guarantied to be
             positive semi-definite. However, 'svd' works slower, especially for
-            small data due to SVD call overhead.
+            small data due to SVD call overhead. 'parallel' computes the same
+            as 'regular' by an associative scan over time, which is much
+            faster for long time series (see _cont_discr_kalman_filter_parallel).
 
         calc_log_likelihood: boolean
             Whether to calculate marginal likelihood of the state-space model.
@@ -2645,6 +2684,18 @@ class ContDescrStateSpace(DescreteStateSpace):
             is assumed. If there is only one parameter then third dimension is
             automatically added.
 
+        dt_quantum: double or None
+            If given, the time steps are rounded to multiples of dt_quantum
+            before the model is discretized. This bounds the number of
+            different time steps for irregularly sampled data, at the cost
+            of an approximation of the time steps.
+
+        n_jobs: int
+            Number of threads for the 'parallel' Kalman filter.
+
+        discretization_cache: DiscretizationCache or None
+            Cache of the discrete model matrices, e.g. owned by the model.
+
         Output:
         --------------
 
@@ -2700,7 +2751,7 @@ class ContDescrStateSpace(DescreteStateSpace):
             if (len(p_H.shape) == 3) or (len(p_R.shape) == 3):
                 raise ValueError("Parameter index can not be None for time varying matrices (third dimension is present)")
             else: # matrices do not change in time, so form dummy zero indices.
-                index = np.zeros((1,Y.shape[0]))
+                index = np.zeros((1,Y.shape[0]), dtype=int)
         else:
             if len(index.shape) == 1:
                 index.shape = (1,index.shape[0])
@@ -2727,8 +2778,11 @@ class ContDescrStateSpace(DescreteStateSpace):
         if P_init is None:
             P_init = P_inf.copy()
 
-        if p_kalman_filter_type not in ('regular', 'svd'):
-            raise ValueError("Kalman filer type neither 'regular nor 'svd'.")
+        if p_kalman_filter_type not in ('regular', 'svd', 'parallel'):
+            raise ValueError("Kalman filer type neither 'regular', 'svd' nor 'parallel'.")
+
+        if (p_kalman_filter_type == 'parallel') and ((p_H.shape[2] != 1) or (p_R.shape[2] != 1)):
+            raise ValueError("The parallel Kalman filter needs time invariant H and R.")
 
         # Functions to pass to the kalman_filter algorithm:
         # Parameters:
@@ -2771,12 +2825,21 @@ class ContDescrStateSpace(DescreteStateSpace):
 
         dynamic_callables = cls._cont_to_discrete_object(X, F, L, Qc, compute_derivatives=calc_grad_log_likelihood,
                                               grad_params_no=grad_params_no,
-                                              P_inf=P_inf, dP_inf=dP_inf, dF = dF, dQc=dQc)
+                                              P_inf=P_inf, dP_inf=dP_inf, dF = dF, dQc=dQc,
+                                              dt_quantum=dt_quantum, cache=discretization_cache)
 
         if print_verbose:
             print("General: run Continuos-Discrete Kalman Filter")
         # Also for dH, dR and probably for all derivatives
-        (M, P, log_likelihood, grad_log_likelihood, AQcomp) = cls._cont_discr_kalman_filter_raw(state_dim,
+        if p_kalman_filter_type == 'parallel':
+            (M, P, log_likelihood, grad_log_likelihood, AQcomp) = cls._cont_discr_kalman_filter_parallel(state_dim,
+                        dynamic_callables, measurement_callables,
+                        Y, m_init=m_init, P_init=P_init,
+                        calc_log_likelihood=calc_log_likelihood,
+                        calc_grad_log_likelihood=calc_grad_log_likelihood, grad_params_no=grad_params_no,
+                        dm_init=dm_init, dP_init=dP_init, n_jobs=n_jobs)
+        else:
+            (M, P, log_likelihood, grad_log_likelihood, AQcomp) = cls._cont_discr_kalman_filter_raw(state_dim,
                         dynamic_callables, measurement_callables,
                         X, Y, m_init=m_init, P_init=P_init,
                         p_kalman_filter_type=p_kalman_filter_type,
@@ -2996,7 +3059,8 @@ class ContDescrStateSpace(DescreteStateSpace):
 
     @classmethod
     def cont_discr_rts_smoother(cls,state_dim, filter_means, filter_covars,
-                                p_dynamic_callables=None, X=None, F=None,L=None,Qc=None):
+                                p_dynamic_callables=None, X=None, F=None,L=None,Qc=None,
+                                p_kalman_filter_type='regular', n_jobs=1):
         """
 
         Continuos-discrete Rauch–Tung–Striebel(RTS) smoother.
@@ -3026,6 +3090,10 @@ class ContDescrStateSpace(DescreteStateSpace):
          X, F, L, Qc: matrices
              If AQcomp is None, these matrices are used to create this object from scratch.
 
+        p_kalman_filter_type: string
+            If 'parallel', the smoother runs as an associative scan over time
+            (see _cont_discr_rts_smoother_parallel), on n_jobs threads.
+
         Output:
         -------------
 
@@ -3041,6 +3109,10 @@ class ContDescrStateSpace(DescreteStateSpace):
             p_dynamic_callables = cls._cont_to_discrete_object(cls, X, F,L,Qc,f_a,compute_derivatives=False,
                                                   grad_params_no=None, P_inf=None, dP_inf=None, dF = None, dQc=None)
 
+        if p_kalman_filter_type == 'parallel':
+            return cls._cont_discr_rts_smoother_parallel(state_dim, filter_means, filter_covars,
+                                                         p_dynamic_callables, n_jobs=n_jobs)
+
         no_steps = filter_covars.shape[0]-1# number of steps (minus initial covariance)
 
         M = np.empty(filter_means.shape) # smoothed means
@@ -3070,17 +3142,313 @@ class ContDescrStateSpace(DescreteStateSpace):
         # Return values
         return (M, P)
 
+    @classmethod
+    def _cont_discr_kalman_filter_parallel(cls, state_dim, p_dynamic_callables, p_measurement_callables,
+                                           Y, m_init, P_init,
+                                           calc_log_likelihood=False,
+                                           calc_grad_log_likelihood=False, grad_params_no=None,
+                                           dm_init=None, dP_init=None, n_jobs=1, block_size=2**14):
+        """
+        Kalman filter by the associative (parallel) scan of Sarkka and
+        Garcia-Fernandez (2021, Temporal parallelization of Bayesian
+        smoothers). It gives the same results as _cont_discr_kalman_filter_raw,
+        but instead of stepping through time it processes blocks of
+        block_size steps with vectorized operations of depth O(log N). The
+        derivatives of the filter are affine recursions, which are
+        scanned in the same way.
+
+        The measurement model must be time invariant. If n_jobs > 1 the
+        combinations of the scans are distributed over a pool of n_jobs
+        threads.
+
+        Input and output as in _cont_discr_kalman_filter_raw.
+        """
+        steps_no = Y.shape[0] # number of steps in the Kalman Filter
+        measurement_dim = Y.shape[1]
+        time_series_no = Y.shape[2] # multiple time series mode
+
+        H = p_measurement_callables.Hk(0, None, None)
+        R = p_measurement_callables.Rk(0)
+
+        observed = ~np.any(np.isnan(Y), axis=(1,2))
+        if (not np.all(observed)) and (Y.shape[1:] != (1,1)):
+            raise ValueError("Nan measurements are currently not supported for \
+                             multidimensional output and multiple tiem series.")
+        Y = np.where(np.isnan(Y), 0., Y)
+
+        M = np.empty(((steps_no+1),state_dim,time_series_no))
+        M[0,:,:] = m_init
+        P = np.empty(((steps_no+1),state_dim,state_dim))
+        P[0,:,:] = 0.5*( P_init + P_init.T)
+
+        log_likelihood = np.zeros(time_series_no) if calc_log_likelihood else None
+        if calc_grad_log_likelihood:
+            grad_log_likelihood = np.zeros((grad_params_no, time_series_no))
+            dH = p_measurement_callables.dHk(0).transpose(2,0,1)
+            dR = p_measurement_callables.dRk(0).transpose(2,0,1)
+            dm = dm_init.transpose(2,0,1)
+            dP = dP_init.transpose(2,0,1)
+        else:
+            grad_log_likelihood = None
+
+        pool = None
+        if n_jobs > 1:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(n_jobs)
+        try:
+            for start in range(0, steps_no, block_size):
+                stop = min(start + block_size, steps_no)
+                A, Q, dA, dQ = _block_discrete_matrices(p_dynamic_callables, start, stop, calc_grad_log_likelihood)
+                y = Y[start:stop]; obs = observed[start:stop]
+
+                M[start+1:stop+1], P[start+1:stop+1] = _parallel_filter_block(A, Q, H, R, y, obs,
+                                                                M[start], P[start], pool, n_jobs)
+
+                if not (calc_log_likelihood or calc_grad_log_likelihood):
+                    continue
+
+                # Predictions and innovations of all steps of the block
+                m_prev = M[start:stop]; P_prev = P[start:stop]
+                m_pred = np.matmul(A, m_prev)
+                P_pred = np.matmul(np.matmul(A, P_prev), _mT(A)) + Q
+                S = np.matmul(np.matmul(H, P_pred), H.T) + R
+                v = y - np.matmul(H, m_pred)
+                Si_v = np.linalg.solve(S, v)
+
+                if calc_log_likelihood:
+                    log_det_S = np.linalg.slogdet(S)[1]
+                    log_likelihood_update = -0.5 * ( measurement_dim*np.log(2*np.pi) + log_det_S[:,None] +
+                                                    np.sum(v * Si_v, axis=1) )
+                    log_likelihood += np.sum(log_likelihood_update[obs], axis=0)
+
+                if calc_grad_log_likelihood:
+                    d_log_likelihood, dm, dP = _parallel_filter_gradient_block(A, Q, dA,
+                                dQ, H, R, dH, dR, obs, m_prev, P_prev, m_pred, P_pred,
+                                S, v, Si_v, P[start+1:stop+1], dm, dP, pool, n_jobs)
+                    grad_log_likelihood += d_log_likelihood
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if calc_log_likelihood and measurement_dim == 1:
+            log_likelihood.shape = (1, time_series_no)
+        return (M, P, log_likelihood, grad_log_likelihood, p_dynamic_callables.reset(False))
+
+    @classmethod
+    def _cont_discr_rts_smoother_parallel(cls, state_dim, filter_means, filter_covars,
+                                          p_dynamic_callables, n_jobs=1, block_size=2**14):
+        """
+        Rauch-Tung-Striebel smoother by the associative (parallel) scan
+        (Sarkka and Garcia-Fernandez, 2021), see cont_discr_rts_smoother.
+        Blocks of block_size steps are processed from the end of the data.
+        """
+        no_steps = filter_covars.shape[0]-1# number of steps (minus initial covariance)
+
+        M = np.empty(filter_means.shape) # smoothed means
+        P = np.empty(filter_covars.shape) # smoothed covars
+        M[-1,:,:] = filter_means[-1,:,:]
+        P[-1,:,:] = filter_covars[-1,:,:]
+
+        pool = None
+        if n_jobs > 1:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(n_jobs)
+        try:
+            for stop in range(no_steps, 0, -block_size):
+                start = max(stop - block_size, 0)
+                A, Q, _, _ = _block_discrete_matrices(p_dynamic_callables, start, stop)
+                m = filter_means[start:stop]; Pf = filter_covars[start:stop]
+                P_pred = np.matmul(np.matmul(A, Pf), _mT(A)) + Q
+                APf = np.matmul(A, Pf)
+                try:
+                    E = _mT(np.linalg.solve(P_pred, APf))
+                except np.linalg.LinAlgError:
+                    # P_pred has near zero eigenvalues
+                    E = np.matmul(_mT(APf), np.linalg.pinv(P_pred))
+
+                # the last element is the smoothed distribution after the block
+                E = np.concatenate((E, np.zeros((1,state_dim,state_dim))))
+                g = np.concatenate((m - np.matmul(E[:-1], np.matmul(A, m)), M[stop][None]))
+                L = np.concatenate((Pf - np.matmul(E[:-1], APf), P[stop][None]))
+
+                _, g, L = associative_scan(_smoother_combine, (E, g, L), reverse=True, pool=pool, n_jobs=n_jobs)
+                M[start:stop] = g[:-1]
+                P[start:stop] = L[:-1]
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return (M, P)
+
+    @classmethod
+    def cont_discr_kalman_filter_batch(cls, F, L, Qc, p_H, p_R, P_inf, X, Y,
+                                       m_init=None, P_init=None,
+                                       calc_log_likelihood=True,
+                                       calc_grad_log_likelihood=False,
+                                       grad_params_no=0, grad_calc_params=None,
+                                       dt_quantum=None, discretization_cache=None):
+        """
+        Continuous-discrete Kalman filter for many independent time series
+        with the same state-space model, but each with its own time grid.
+        The series are filtered together: every prediction and update step
+        is one batched operation over all series.
+
+        Series of different lengths are padded at the end (see
+        pad_time_series) with steps of zero length and missing
+        measurements, which change neither the states nor the likelihood.
+
+        Input:
+        -----------------
+        F, L, Qc, p_H, p_R, P_inf: matrices
+            The model, as in cont_discr_kalman_filter. Measurements are
+            one dimensional.
+
+        X: (no_steps, series_no) matrix
+            Time points of every series (columns), sorted in time.
+
+        Y: (no_steps, series_no) matrix
+            Measurements, nan where missing.
+
+        m_init, P_init, calc_log_likelihood, calc_grad_log_likelihood,
+        grad_params_no, grad_calc_params, dt_quantum, discretization_cache:
+            As in cont_discr_kalman_filter. m_init is a (state_dim,) vector
+            shared by all series.
+
+        Output:
+        --------------
+        m, P: (series_no, state_dim) matrix, (series_no, state_dim, state_dim) 3D array
+            Filter distributions after the last step of every series.
+
+        log_likelihood: (series_no,) vector or None
+            Log marginal likelihood of every series.
+
+        grad_log_likelihood: (grad_params_no, series_no) matrix or None
+            Gradients of the log marginal likelihood of every series.
+        """
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float)
+        steps_no, series_no = Y.shape
+        state_dim = F.shape[0]
+
+        h = np.atleast_2d(p_H)
+        if h.shape[0] != 1:
+            raise ValueError("Only one dimensional measurements are supported.")
+        h = h[0]
+        R = float(np.squeeze(p_R))
+
+        # Discrete model matrices for all different time steps of all series
+        dt = np.zeros(X.shape)
+        dt[1:] = np.diff(X, axis=0)
+        if dt_quantum is not None:
+            dt = np.round(dt / dt_quantum) * dt_quantum
+
+        if calc_grad_log_likelihood:
+            dF = cls._check_grad_state_matrices(grad_calc_params.get('dF'), state_dim, grad_params_no, which = 'dA')
+            dQc = cls._check_grad_state_matrices(grad_calc_params.get('dQc'), state_dim, grad_params_no, which = 'dQ')
+            dP_inf = cls._check_grad_state_matrices(grad_calc_params.get('dP_inf'), state_dim, grad_params_no, which = 'dA')
+            dH = cls._check_grad_measurement_matrices(grad_calc_params.get('dH'), state_dim, grad_params_no, 1, which = 'dH')
+            dR = cls._check_grad_measurement_matrices(grad_calc_params.get('dR'), state_dim, grad_params_no, 1, which = 'dR')
+            dh = dH[0].T # (grad_params_no, state_dim)
+            dR = dR[0,0] # (grad_params_no,)
+            dP_init = grad_calc_params.get('dP_init')
+            if dP_init is None:
+                dP_init = dP_inf
+        else:
+            dF = dQc = dP_inf = None
+
+        As, Qs, index, dAs, dQs = cls.lti_sde_to_descrete(F, L, Qc, dt.ravel(), calc_grad_log_likelihood,
+                            grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc,
+                            cache=discretization_cache)
+        As = As.transpose(2,0,1); Qs = Qs.transpose(2,0,1)
+        if calc_grad_log_likelihood:
+            dAs = dAs.transpose(3,2,0,1); dQs = dQs.transpose(3,2,0,1)
+        index.shape = dt.shape
+
+        m = np.zeros((series_no, state_dim))
+        if m_init is not None:
+            m[:] = np.ravel(m_init)
+        if P_init is None:
+            P_init = P_inf
+        P = np.empty((series_no, state_dim, state_dim))
+        P[:] = 0.5*(P_init + P_init.T)
+
+        log_likelihood = np.zeros(series_no) if calc_log_likelihood else None
+        if calc_grad_log_likelihood:
+            grad_log_likelihood = np.zeros((series_no, grad_params_no))
+            dm = np.zeros((series_no, grad_params_no, state_dim))
+            dP = np.empty((series_no, grad_params_no, state_dim, state_dim))
+            dP[:] = dP_init.transpose(2,0,1)
+        else:
+            grad_log_likelihood = None
+
+        for k in range(steps_no):
+            A = As[index[k]]
+            Q = Qs[index[k]]
+            y = Y[k]
+            observed = ~np.isnan(y)
+
+            # Prediction step
+            m_pred = np.einsum('bij,bj->bi', A, m)
+            P_pred = np.einsum('bij,bjk,blk->bil', A, P, A) + Q
+
+            # Update step
+            Ph = np.einsum('bij,j->bi', P_pred, h)
+            S = np.einsum('bi,i->b', Ph, h) + R
+            v = np.where(observed, y, 0.) - m_pred.dot(h)
+            K = Ph / S[:,None]
+            K[~observed] = 0
+
+            if calc_log_likelihood:
+                log_likelihood -= 0.5 * observed * (np.log(2*np.pi) + np.log(S) + v*v/S)
+
+            if calc_grad_log_likelihood:
+                dA = dAs[index[k]]
+                dQ = dQs[index[k]]
+                dm_pred = np.einsum('bij,bpj->bpi', A, dm) + np.einsum('bpij,bj->bpi', dA, m)
+                dP_pred = np.einsum('bpij,bjk,blk->bpil', dA, P, A)
+                dP_pred += np.swapaxes(dP_pred, -1, -2)
+                dP_pred += np.einsum('bij,bpjk,blk->bpil', A, dP, A) + dQ
+
+                dS = 2*np.einsum('pi,bi->bp', dh, Ph) + np.einsum('i,bpij,j->bp', h, dP_pred, h) + dR
+                dv = - dh.dot(m_pred.T).T - dm_pred.dot(h)
+                dK = (np.einsum('bpij,j->bpi', dP_pred, h) + np.einsum('bij,pj->bpi', P_pred, dh) -
+                      Ph[:,None,:] * (dS / S[:,None])[:,:,None]) / S[:,None,None]
+                dK[~observed] = 0
+
+                grad_log_likelihood -= observed[:,None] * (0.5*dS/S[:,None] + (v/S)[:,None]*dv -
+                                                           0.5*(v*v/(S*S))[:,None]*dS)
+
+                dm = dm_pred + dK*v[:,None,None] + K[:,None,:]*dv[:,:,None]
+                dKK = np.einsum('bpi,bj->bpij', dK, K) * S[:,None,None,None]
+                dP = dP_pred - dKK - np.swapaxes(dKK, -1, -2) - \
+                     np.einsum('bi,bp,bj->bpij', K, dS, K)
+                dP = 0.5*(dP + np.swapaxes(dP, -1, -2))
+
+            m = m_pred + K*v[:,None]
+            P = P_pred - np.einsum('bi,bj->bij', K, K) * S[:,None,None]
+            P = 0.5*(P + np.swapaxes(P, -1, -2))
+
+        if calc_grad_log_likelihood:
+            grad_log_likelihood = grad_log_likelihood.T
+        return m, P, log_likelihood, grad_log_likelihood
+
     @classmethod
     def _cont_to_discrete_object(cls, X, F, L, Qc, compute_derivatives=False,
                                  grad_params_no=None,
-                                 P_inf=None, dP_inf=None, dF = None, dQc=None):
+                                 P_inf=None, dP_inf=None, dF = None, dQc=None,
+                                 dt_quantum=None, cache=None):
         """
         Function return the object which is used in Kalman filter and/or
         smoother to obtain matrices A, Q and their derivatives for discrete model
         from the continuous model.
 
         There are 2 objects AQcompute_once and AQcompute_batch and the function
-        returs the appropriate one based on the number of different time steps.
+        returs the appropriate one based on the memory needed to store the
+        matrices of all different time steps. AQcompute_once discretizes
+        blocks of AQcompute_once.block_size time steps at a time, so that
+        many irregular time steps need neither the memory of AQcompute_batch
+        nor one matrix exponent per step.
 
         Input:
         ----------------------
@@ -3098,6 +3466,12 @@ class ContDescrStateSpace(DescreteStateSpace):
         P_inf, dP_inf, dF, dQ: matrices and 3D objects
             Data necessary to compute derivatives.
 
+        dt_quantum: double or None
+            If given, time steps are rounded to multiples of dt_quantum.
+
+        cache: DiscretizationCache or None
+            Cache of the matrices of the batch object.
+
         Output:
         --------------------------
         AQcomp: object
@@ -3106,27 +3480,32 @@ class ContDescrStateSpace(DescreteStateSpace):
 
         """
 
-        unique_round_decimals = 10
-        threshold_number_of_unique_time_steps = 20 # above which matrices are separately each time
+        unique_round_decimals = 8
+        max_size_of_data = 256 * 2**20 # bytes, above which matrices are computed separately each time
         dt = np.empty((X.shape[0],))
         dt[1:] = np.diff(X[:,0],axis=0)
         dt[0]  = 0#dt[1]
+        if dt_quantum is not None:
+            dt = np.round(dt / dt_quantum) * dt_quantum
         unique_indices = np.unique(np.round(dt, decimals=unique_round_decimals))
         number_unique_indices = len(unique_indices)
+        # A, Q and optionally dA, dQ for every different time step
+        size_of_data = 2 * F.shape[0]**2 * (1 + (grad_params_no if compute_derivatives else 0)) * \
+                       number_unique_indices * np.dtype(float).itemsize
 
         #import pdb; pdb.set_trace()
         if use_cython:
             class AQcompute_batch(state_space_cython.AQcompute_batch_Cython):
-                def __init__(self, F,L,Qc,dt,compute_derivatives=False, grad_params_no=None, P_inf=None, dP_inf=None, dF = None, dQc=None):
+                def __init__(self, F,L,Qc,dt,compute_derivatives=False, grad_params_no=None, P_inf=None, dP_inf=None, dF = None, dQc=None, cache=None):
                     As, Qs, reconstruct_indices, dAs, dQs = ContDescrStateSpace.lti_sde_to_descrete(F,
                                 L,Qc,dt,compute_derivatives,
-                                grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc)
+                                grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc, cache=cache)
 
                     super(AQcompute_batch,self).__init__(As, Qs, reconstruct_indices, dAs,dQs)
         else:
             AQcompute_batch = cls.AQcompute_batch_Python
 
-        if number_unique_indices > threshold_number_of_unique_time_steps:
+        if size_of_data > max_size_of_data:
             AQcomp = cls.AQcompute_once(F,L,Qc, dt,compute_derivatives=compute_derivatives,
                                     grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc)
             if print_verbose:
@@ -3135,7 +3514,7 @@ class ContDescrStateSpace(DescreteStateSpace):
 
         else:
             AQcomp = AQcompute_batch(F,L,Qc,dt,compute_derivatives=compute_derivatives,
-                                    grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc)
+                                    grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc, cache=cache)
             if print_verbose:
                 print("CDO:  Continue-to-discrete BATCH object is created.")
                 print("CDO:  Number of different time steps: %i" % (number_unique_indices,) )
@@ -3146,7 +3525,7 @@ class ContDescrStateSpace(DescreteStateSpace):
     @staticmethod
     def lti_sde_to_descrete(F,L,Qc,dt,compute_derivatives=False,
                             grad_params_no=None, P_inf=None,
-                            dP_inf=None, dF = None, dQc=None):
+                            dP_inf=None, dF = None, dQc=None, cache=None):
         """
         Linear Time-Invariant Stochastic Differential Equation (LTI SDE):
 
@@ -3194,6 +3573,9 @@ class ContDescrStateSpace(DescreteStateSpace):
         dR: 3D array
             Derivatives of R
 
+        cache: DiscretizationCache or None
+            Cache of the matrices of an iterable dt.
+
         Output:
         --------------
 
@@ -3221,24 +3603,17 @@ class ContDescrStateSpace(DescreteStateSpace):
         # Dimensionality
         n = F.shape[0]
 
-        if not isinstance(dt, collections.Iterable): # not iterable, scalar
+        if np.ndim(dt) == 0: # not iterable, scalar
 
             # The dynamical model
             A  = matrix_exponent(F*dt)
             if np.any( np.isnan(A)):
                 A  = linalg.expm3(F*dt)
 
-            # The covariance matrix Q by matrix fraction decomposition ->
-            Phi = np.zeros((2*n,2*n))
-            Phi[:n,:n] = F
-            Phi[:n,n:] = L.dot(Qc).dot(L.T)
-            Phi[n:,n:] = -F.T
-            AB = matrix_exponent(Phi*dt)
-            AB = np.dot(AB, np.vstack((np.zeros((n,n)),np.eye(n))))
-
-            Q_noise_1 = linalg.solve(AB[n:,:].T,AB[:n,:].T)
+            # The covariance matrix Q from the stationary covariance. (The
+            # matrix fraction decomposition needs another matrix exponent and
+            # inaccuracies have been observed with it.)
             Q_noise_2  = P_inf - A.dot(P_inf).dot(A.T)
-            # The covariance matrix Q by matrix fraction decomposition <-
 
             if compute_derivatives:
                 dA = np.zeros([n, n, grad_params_no])
@@ -3278,36 +3653,34 @@ class ContDescrStateSpace(DescreteStateSpace):
               dA = None
               dQ = None
               Q_noise = Q_noise_2
-	      # Innacuracies have been observed when Q_noise_1 was used.
-	
-            #Q_noise = Q_noise_1
 
             # Return
             return A, Q_noise,None, dA, dQ
 
         else: # iterable, array
 
-            # Time discretizations (round to 14 decimals to avoid problems)
-            dt_unique, tmp, reconstruct_index = np.unique(np.round(dt,8),
-                                        return_index=True,return_inverse=True)
-            del tmp
-            # Allocate space for A and Q
-            A = np.empty((n,n,dt_unique.shape[0]))
-            Q_noise = np.empty((n,n,dt_unique.shape[0]))
+            # Time discretizations (round to 8 decimals to avoid problems)
+            dt_unique, reconstruct_index = np.unique(np.round(dt,8),
+                                        return_inverse=True)
+            reconstruct_index = reconstruct_index.ravel()
 
-            if compute_derivatives:
-                dA = np.empty((n,n,grad_params_no,dt_unique.shape[0]))
-                dQ = np.empty((n,n,grad_params_no,dt_unique.shape[0]))
+            # Compute the matrices for all unique dt at once, reusing those
+            # which are cached for the same model matrices if a cache is given
+            compute = lambda dts: lti_sde_to_descrete_batch(F, L, Qc, dts, compute_derivatives,
+                                    grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc)
+            if cache is None:
+                A, Q_noise, dA, dQ = compute(dt_unique)
             else:
-                dA = None
-                dQ = None
-            # Call this function for each unique dt
-            for j in range(0,dt_unique.shape[0]):
-                A[:,:,j], Q_noise[:,:,j], tmp1, dA_t, dQ_t = ContDescrStateSpace.lti_sde_to_descrete(F,L,Qc,dt_unique[j],
-                    compute_derivatives=compute_derivatives, grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF = dF, dQc=dQc)
-                if compute_derivatives:
-                    dA[:,:,:,j] = dA_t
-                    dQ[:,:,:,j] = dQ_t
+                key = cache.key(F, L, Qc, P_inf, compute_derivatives,
+                                dP_inf=dP_inf, dF=dF, dQc=dQc)
+                A, Q_noise, dA, dQ = cache(key, dt_unique, compute)
+
+            # Unique dt's go to the last dimension
+            A = np.ascontiguousarray(A.transpose(1,2,0))
+            Q_noise = np.ascontiguousarray(Q_noise.transpose(1,2,0))
+            if compute_derivatives:
+                dA = np.ascontiguousarray(dA.transpose(2,3,1,0))
+                dQ = np.ascontiguousarray(dQ.transpose(2,3,1,0))
 
             # Return
             return A, Q_noise, reconstruct_index, dA, dQ
@@ -3340,6 +3713,433 @@ def matrix_exponent(M):
 
     return Mexp
 
+# Coefficients of the [13/13] Pade approximant of the matrix exponent
+# (Higham, 2005. The scaling and squaring method for the matrix exponential revisited.)
+_pade13_b = (64764752532480000., 32382376266240000., 7771770303897600.,
+             1187353796428800., 129060195264000., 10559470521600.,
+             670442572800., 33522128640., 1323241920., 40840800., 960960.,
+             16380., 182., 1.)
+_pade13_theta = 5.371920351148152
+
+def matrix_exponent_batch(M):
+    """
+    Matrix exponents of a stack of matrices M (k,n,n), computed all at once
+    by scaling and squaring with the [13/13] Pade approximant, like
+    scipy.linalg.expm does for a single matrix.
+    """
+    M = np.asarray(M, dtype=float)
+    if M.shape[1] == 1: # 1*1 matrices
+        return np.exp(M)
+
+    b = _pade13_b
+    norms = np.abs(M).sum(axis=1).max(axis=1) # 1-norms
+    with np.errstate(divide='ignore'):
+        s = np.maximum(0, np.ceil(np.log2(norms / _pade13_theta))).astype(int)
+    M = M / (2.**s)[:, None, None]
+
+    I = np.eye(M.shape[1])
+    M2 = np.matmul(M, M)
+    M4 = np.matmul(M2, M2)
+    M6 = np.matmul(M2, M4)
+    U = np.matmul(M, np.matmul(M6, b[13]*M6 + b[11]*M4 + b[9]*M2)
+                  + b[7]*M6 + b[5]*M4 + b[3]*M2 + b[1]*I)
+    V = np.matmul(M6, b[12]*M6 + b[10]*M4 + b[8]*M2) + b[6]*M6 + b[4]*M4 + b[2]*M2 + b[0]*I
+    Mexp = np.linalg.solve(V - U, V + U)
+
+    for j in range(s.max() if s.size else 0):
+        square = s > j
+        Mexp[square] = np.matmul(Mexp[square], Mexp[square])
+
+    if np.any(np.isnan(Mexp)):
+        raise ValueError("Matrix Exponent is not computed")
+    return Mexp
+
+def lti_sde_to_descrete_batch(F, L, Qc, dt, compute_derivatives=False,
+                              grad_params_no=None, P_inf=None,
+                              dP_inf=None, dF=None, dQc=None, chunk_size=4096):
+    """
+    Vectorized ContDescrStateSpace.lti_sde_to_descrete for an array of time
+    steps dt (k,). The matrices for all dt are computed with batched matrix
+    exponents, chunk_size time steps at a time to bound the memory.
+
+    Output:
+    --------------
+    A, Q_noise: 3D arrays (k, n, n)
+
+    dA, dQ: 4D arrays (k, grad_params_no, n, n) or None
+    """
+    dt = np.asarray(dt, dtype=float).ravel()
+    n = F.shape[0]
+    k = dt.shape[0]
+
+    A = np.empty((k, n, n))
+    Q_noise = np.empty((k, n, n))
+    if compute_derivatives:
+        dA = np.empty((k, grad_params_no, n, n))
+        dQ = np.empty((k, grad_params_no, n, n))
+    else:
+        dA = None
+        dQ = None
+
+    for start in range(0, k, chunk_size):
+        c = slice(start, min(start + chunk_size, k))
+        dtc = dt[c][:, None, None]
+
+        if compute_derivatives and grad_params_no > 0:
+            # The dynamical model together with its derivatives, see the
+            # scalar case of lti_sde_to_descrete
+            FF = np.zeros((dtc.shape[0], grad_params_no, 2*n, 2*n))
+            FF[:, :, :n, :n] = F
+            FF[:, :, n:, :n] = dF.transpose(2, 0, 1)
+            FF[:, :, n:, n:] = F
+            FF *= dtc[:, None]
+            AA = matrix_exponent_batch(FF.reshape(-1, 2*n, 2*n)).reshape(FF.shape)
+            Ac = AA[:, 0, :n, :n]
+            dAc = AA[:, :, n:, :n]
+        else:
+            Ac = matrix_exponent_batch(F * dtc)
+
+        APA = np.einsum('kij,jl,kml->kim', Ac, P_inf, Ac)
+        A[c] = Ac
+        Q_noise[c] = P_inf - APA
+
+        if compute_derivatives:
+            if grad_params_no > 0:
+                dA[c] = dAc
+                dQ[c] = dP_inf.transpose(2, 0, 1) \
+                    - np.einsum('kpij,jl,kml->kpim', dAc, P_inf, Ac) \
+                    - np.einsum('kij,jlp,kml->kpim', Ac, dP_inf, Ac) \
+                    - np.einsum('kij,jl,kpml->kpim', Ac, P_inf, dAc)
+
+    return A, Q_noise, dA, dQ
+
+class DiscretizationCache(object):
+    """
+    LRU cache of the discrete model matrices A, Q (and the derivatives dA, dQ)
+    for time steps dt, keyed on the continuous model matrices. For each model
+    the matrices of all time steps seen so far are stored, so that only new
+    time steps are discretized, e.g. when predicting at new points with the
+    parameters of the last likelihood evaluation.
+
+    The matrices of at most maxsize models and max_bytes bytes in total are
+    kept. StateSpace models own one cache each; since the key contains the
+    kernel parameters, older entries are of no use once the parameters
+    have changed.
+
+    Set maxsize to 0 to switch off caching.
+    """
+    def __init__(self, maxsize=2, max_bytes=64 * 2**20):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self.nbytes = 0
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    @staticmethod
+    def key(F, L, Qc, P_inf, compute_derivatives, dP_inf=None, dF=None, dQc=None):
+        matrices = (F, L, Qc, P_inf)
+        if compute_derivatives:
+            matrices += (dP_inf, dF, dQc)
+        return (bool(compute_derivatives),) + tuple((np.shape(M), np.asarray(M, dtype=float).tobytes()) for M in matrices)
+
+    @staticmethod
+    def _entry_bytes(entry):
+        return sum(M.nbytes for M in entry if M is not None)
+
+    def __call__(self, key, dt, compute):
+        """
+        Matrices for the sorted unique time steps dt. compute(dt) computes
+        them for the time steps which are not cached.
+        """
+        if self.maxsize <= 0:
+            return compute(dt)
+
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= self._entry_bytes(entry)
+            cached_dt = entry[0]
+            index = np.minimum(np.searchsorted(cached_dt, dt), cached_dt.shape[0]-1)
+            missing = cached_dt[index] != dt
+            if np.any(missing):
+                computed = (dt[missing],) + tuple(compute(dt[missing]))
+                order = np.argsort(np.concatenate((cached_dt, dt[missing])), kind='mergesort')
+                entry = tuple(None if old is None else np.concatenate((old, new))[order]
+                              for old, new in zip(entry, computed))
+        else:
+            entry = (dt,) + tuple(compute(dt))
+
+        index = np.searchsorted(entry[0], dt)
+        result = tuple(None if M is None else M[index] for M in entry[1:])
+
+        entry_bytes = self._entry_bytes(entry)
+        if entry_bytes > self.max_bytes and entry[0].shape[0] > dt.shape[0]:
+            # the union with older time steps is too large, keep the current ones
+            entry = (dt,) + result
+            entry_bytes = self._entry_bytes(entry)
+        if entry_bytes <= self.max_bytes:
+            self._entries[key] = entry
+            self.nbytes += entry_bytes
+        while self._entries and (len(self._entries) > self.maxsize or self.nbytes > self.max_bytes):
+            self.nbytes -= self._entry_bytes(self._entries.popitem(last=False)[1])
+        return result
+
+def pad_time_series(X, Y):
+    """
+    Stack time series of different lengths into matrices for
+    ContDescrStateSpace.cont_discr_kalman_filter_batch. Every series is sorted
+    in time and padded at the end by repeating its last time point with a
+    missing (nan) measurement.
+
+    Input:
+    --------------
+    X, Y: lists of arrays
+        Time points and (one dimensional) measurements of every series.
+
+    Output:
+    --------------
+    X, Y: (max_length, series_no) matrices
+    """
+    lengths = [np.size(x) for x in X]
+    X_pad = np.empty((max(lengths), len(X)))
+    Y_pad = np.empty((max(lengths), len(X)))
+    Y_pad.fill(np.nan)
+    for i, (x, y) in enumerate(zip(X, Y)):
+        x = np.ravel(x); y = np.ravel(y)
+        if x.shape != y.shape:
+            raise ValueError("Series %i: X and Y data don't match" % i)
+        order = np.argsort(x, kind='mergesort')
+        X_pad[:x.shape[0], i] = x[order]
+        X_pad[x.shape[0]:, i] = x[order[-1]]
+        Y_pad[:x.shape[0], i] = y[order]
+    return X_pad, Y_pad
+
+def _mT(M):
+    """Transpose the matrices in the last two dimensions"""
+    return np.swapaxes(M, -1, -2)
+
+def _combine_in_chunks(combine, a, b, pool=None, n_jobs=1, min_chunk=512):
+    """
+    combine(a, b) for tuples of arrays a, b with the elements along the first
+    dimension. Large batches are split in n_jobs chunks which are combined on
+    the thread pool (numpy and LAPACK release the GIL).
+    """
+    size = a[0].shape[0]
+    if pool is None or size < 2*min_chunk:
+        return combine(a, b)
+    bounds = np.linspace(0, size, n_jobs+1).astype(int)
+    slices = [slice(bounds[i], bounds[i+1]) for i in range(n_jobs)]
+    parts = pool.map(lambda s: combine(tuple(x[s] for x in a), tuple(x[s] for x in b)), slices)
+    return tuple(np.concatenate(p) for p in zip(*parts))
+
+def associative_scan(combine, elems, reverse=False, pool=None, n_jobs=1):
+    """
+    Inclusive scan of elems with an associative operator, in O(log N)
+    vectorized steps (Blelloch, 1990).
+
+    Input:
+    --------------
+    combine: function (a, b)
+        The associative operator on tuples of arrays, vectorized along the
+        first dimension. a are the elements earlier in the sequence.
+
+    elems: tuple of arrays
+        Elements of the sequence along the first dimension.
+
+    reverse: boolean
+        Scan from the end, i.e. result k combines elements k,...,N-1.
+
+    Output:
+    --------------
+    Tuple of arrays: the combination of all elements up to (or from) k.
+    """
+    if reverse:
+        op = lambda a, b: combine(b, a)
+        elems = tuple(e[::-1] for e in elems)
+    else:
+        op = combine
+
+    def scan(elems):
+        N = elems[0].shape[0]
+        if N < 2:
+            return elems
+        # combine pairs, scan the pairs and fill in the elements in between
+        reduced = _combine_in_chunks(op, tuple(e[0:-1:2] for e in elems),
+                                     tuple(e[1::2] for e in elems), pool, n_jobs)
+        odd = scan(reduced)
+        if N > 2:
+            even = _combine_in_chunks(op, tuple(o[:(N-1)//2] for o in odd),
+                                      tuple(e[2::2] for e in elems), pool, n_jobs)
+        result = []
+        for j, e in enumerate(elems):
+            r = np.empty(e.shape)
+            r[0] = e[0]
+            r[1::2] = odd[j]
+            if N > 2:
+                r[2::2] = even[j]
+            result.append(r)
+        return tuple(result)
+
+    result = scan(elems)
+    if reverse:
+        result = tuple(r[::-1] for r in result)
+    return result
+
+def _filter_combine(a, b):
+    """
+    Operator of the parallel Kalman filter (Sarkka & Garcia-Fernandez, 2021.
+    Temporal parallelization of Bayesian smoothers.)
+    """
+    A1, b1, C1, eta1, J1 = a
+    A2, b2, C2, eta2, J2 = b
+    I = np.eye(A1.shape[-1])
+    W = _mT(np.linalg.solve(_mT(I + np.matmul(C1, J2)), _mT(A2)))
+    Z = _mT(np.linalg.solve(_mT(I + np.matmul(J2, C1)), A1))
+    A = np.matmul(W, A1)
+    b = np.matmul(W, b1 + np.matmul(C1, eta2)) + b2
+    C = np.matmul(np.matmul(W, C1), _mT(A2)) + C2
+    eta = np.matmul(Z, eta2 - np.matmul(J2, b1)) + eta1
+    J = np.matmul(np.matmul(Z, J2), A1) + J1
+    return A, b, 0.5*(C + _mT(C)), eta, 0.5*(J + _mT(J))
+
+def _mean_combine(a, b):
+    """Composition of the affine maps x -> T x + e: first a, then b"""
+    T1, e1 = a
+    T2, e2 = b
+    return np.matmul(T2, T1), np.matmul(T2, e1) + e2
+
+def _covariance_combine(a, b):
+    """Composition of the maps X -> T X T' + D: first a, then b"""
+    T1, D1 = a
+    T2, D2 = b
+    return np.matmul(T2, T1), np.matmul(np.matmul(T2, D1), _mT(T2)) + D2
+
+def _smoother_combine(a, b):
+    """Operator of the parallel RTS smoother, a earlier in time than b"""
+    E1, g1, L1 = a
+    E2, g2, L2 = b
+    L = np.matmul(np.matmul(E1, L2), _mT(E1)) + L1
+    return np.matmul(E1, E2), np.matmul(E1, g2) + g1, 0.5*(L + _mT(L))
+
+def _parallel_filter_block(A, Q, H, R, Y, observed, m_init, P_init, pool=None, n_jobs=1):
+    """
+    Filter means and covariances of a block of steps, starting from the
+    filter distribution N(m_init, P_init) before the block.
+    """
+    n = A.shape[1]
+    I = np.eye(n)
+
+    # Elements of the scan for every step, conditioned on the previous state
+    S = np.matmul(np.matmul(H, Q), H.T) + R
+    K = _mT(np.linalg.solve(S, np.matmul(H, Q)))
+    H_Si = _mT(np.linalg.solve(S, np.broadcast_to(H, (A.shape[0],) + H.shape)))
+    K[~observed] = 0
+    H_Si[~observed] = 0
+    G = I - np.matmul(K, H)
+    A_el = np.matmul(G, A)
+    b = np.matmul(K, Y)
+    C = np.matmul(G, Q)
+    C = 0.5*(C + _mT(C))
+    At_H_Si = np.matmul(_mT(A), H_Si)
+    eta = np.matmul(At_H_Si, Y)
+    J = np.matmul(np.matmul(At_H_Si, H), A)
+
+    # The first element is the filter distribution after the first step
+    m_pred = A[0].dot(m_init)
+    P_pred = A[0].dot(P_init).dot(A[0].T) + Q[0]
+    if observed[0]:
+        S0 = H.dot(P_pred).dot(H.T) + R
+        K0 = linalg.solve(S0, H.dot(P_pred)).T
+        b[0] = m_pred + K0.dot(Y[0] - H.dot(m_pred))
+        C[0] = P_pred - K0.dot(S0).dot(K0.T)
+    else:
+        b[0] = m_pred
+        C[0] = P_pred
+    A_el[0] = 0; eta[0] = 0; J[0] = 0
+
+    _, b, C, _, _ = associative_scan(_filter_combine, (A_el, b, C, eta, J), pool=pool, n_jobs=n_jobs)
+    return b, C
+
+def _parallel_filter_gradient_block(A, Q, dA, dQ, H, R, dH, dR, observed, m_prev, P_prev, m_pred, P_pred,
+                                    S, v, Si_v, P_upd, dm_init, dP_init, pool=None, n_jobs=1):
+    """
+    Derivatives of the log likelihood for a block of steps of the parallel
+    filter (see _kalman_prediction_step and _kalman_update_step for the
+    formulas). The derivatives dP and dm of the filter distribution are
+    affine recursions in time, and scanned as such.
+
+    Output:
+    --------------
+    d_log_likelihood: (grad_params_no, time_series_no) matrix
+
+    dm, dP: derivatives of the filter distribution after the block
+    """
+    n = A.shape[1]
+    Si = np.linalg.inv(S)
+    K = np.matmul(np.matmul(P_pred, H.T), Si)
+    K[~observed] = 0
+    G = np.eye(n) - np.matmul(K, H)
+    T = np.matmul(G, A)[:,None]
+    G = G[:,None]; K = K[:,None]; A = A[:,None]; P_pred = P_pred[:,None]
+
+    # covariances: dP_k = T_k dP_{k-1} T_k' + D_k
+    dA_P_At = np.matmul(np.matmul(dA, P_prev[:,None]), _mT(A))
+    dP_const = dA_P_At + _mT(dA_P_At) + dQ # of the prediction
+    X = np.matmul(np.matmul(P_upd[:,None], _mT(dH)), _mT(K))
+    D = np.matmul(np.matmul(G, dP_const), _mT(G)) - X - _mT(X) + np.matmul(np.matmul(K, dR), _mT(K))
+    D[0] += np.matmul(np.matmul(T[0], dP_init), _mT(T[0]))
+    _, dP = associative_scan(_covariance_combine, (T, D), pool=pool, n_jobs=n_jobs)
+    dP = 0.5*(dP + _mT(dP))
+
+    dP_prev = np.concatenate((dP_init[None], dP[:-1]))
+    dP_pred = np.matmul(np.matmul(A, dP_prev), _mT(A)) + dP_const
+    dH_P_Ht = np.matmul(np.matmul(dH, P_pred), H.T)
+    dS = dH_P_Ht + _mT(dH_P_Ht) + np.matmul(np.matmul(H, dP_pred), H.T) + dR
+    dK = np.matmul(np.matmul(dP_pred, H.T) + np.matmul(P_pred, _mT(dH)) - np.matmul(K, dS), Si[:,None])
+    dK[~observed] = 0
+
+    # means: dm_k = T_k dm_{k-1} + e_k
+    dA_m = np.matmul(dA, m_prev[:,None])
+    e = np.matmul(G, dA_m) + np.matmul(dK, v[:,None]) - np.matmul(K, np.matmul(dH, m_pred[:,None]))
+    e[0] += np.matmul(T[0], dm_init)
+    _, dm = associative_scan(_mean_combine, (T, e), pool=pool, n_jobs=n_jobs)
+
+    dm_prev = np.concatenate((dm_init[None], dm[:-1]))
+    dm_pred = np.matmul(A, dm_prev) + dA_m
+    dv = - np.matmul(dH, m_pred[:,None]) - np.matmul(H, dm_pred)
+    Si_v = Si_v[:,None]
+    d_log_likelihood = -(0.5*np.trace(np.matmul(Si[:,None], dS), axis1=-2, axis2=-1)[:,:,None] +
+                np.sum(Si_v*dv, axis=-2) - 0.5 * np.sum(Si_v * np.matmul(dS, Si_v), axis=-2))
+    return np.sum(d_log_likelihood[observed], axis=0), dm[-1], dP[-1]
+
+def _block_discrete_matrices(p_dynamic_callables, start, stop, compute_derivatives=False):
+    """
+    A, Q (stop-start, n, n) and dA, dQ (stop-start, params, n, n) of the
+    steps start, ..., stop-1 from the object returned by
+    _cont_to_discrete_object.
+    """
+    dA = None; dQ = None
+    if hasattr(p_dynamic_callables, 'As'):
+        index = p_dynamic_callables.reconstruct_indices[start:stop]
+        A = p_dynamic_callables.As.transpose(2,0,1)[index]
+        Q = p_dynamic_callables.Qs.transpose(2,0,1)[index]
+        if compute_derivatives:
+            dA = p_dynamic_callables.dAs.transpose(3,2,0,1)[index]
+            dQ = p_dynamic_callables.dQs.transpose(3,2,0,1)[index]
+    elif hasattr(p_dynamic_callables, 'block_matrices'):
+        A, Q, dA, dQ = p_dynamic_callables.block_matrices(start, stop)
+        if not compute_derivatives:
+            dA = None; dQ = None
+    else:
+        A = np.array([p_dynamic_callables.Ak(k, None, None) for k in range(start, stop)])
+        Q = np.array([p_dynamic_callables.Qk(k) for k in range(start, stop)])
+        if compute_derivatives:
+            dA = np.array([p_dynamic_callables.dAk(k).transpose(2,0,1) for k in range(start, stop)])
+            dQ = np.array([p_dynamic_callables.dQk(k).transpose(2,0,1) for k in range(start, stop)])
+    return A, Q, dA, dQ
+
 def balance_matrix(A):
     """
     Balance matrix, i.e. finds such similarity transformation of the original
@@ -14,6 +14,7 @@
 #  }
 #
 
+import warnings
 import numpy as np
 from scipy import stats
 from .. import likelihoods
@@ -23,7 +24,7 @@ from . import state_space_main as ssm
 from . import state_space_setup as ss_setup
 
 class StateSpace(Model):
-    def __init__(self, X, Y, kernel=None, noise_var=1.0, kalman_filter_type = 'regular', use_cython = False, name='StateSpace'):
+    def __init__(self, X, Y, kernel=None, noise_var=1.0, kalman_filter_type = 'regular', use_cython = False, dt_quantum=None, n_jobs=1, name='StateSpace'):
         super(StateSpace, self).__init__(name=name)
 
         if len(X.shape) == 1:
@@ -47,6 +48,12 @@ class StateSpace(Model):
         assert self.output_dim == 1, "State space methods are for single outputs only"
 
         self.kalman_filter_type = kalman_filter_type
+        # Round the time steps to multiples of dt_quantum, which bounds the
+        # number of transition matrices to compute for irregular data
+        self.dt_quantum = dt_quantum
+        # 'parallel' runs the Kalman filter and smoother as associative scans
+        # over time, which may use n_jobs threads
+        self.n_jobs = n_jobs
         #self.kalman_filter_type = 'svd' # temp test
         ss_setup.use_cython = use_cython
 
@@ -56,6 +63,8 @@ class StateSpace(Model):
         #from . import state_space_main as ssm
         if (ssm.cython_code_available) and (ssm.use_cython != ss_setup.use_cython):
             reload(ssm)
+        # Discrete model matrices of the last parameters, reused e.g. for predictions
+        self.discretization_cache = ssm.DiscretizationCache()
         # Make sure the observations are ordered in time
         sort_index = np.argsort(X[:,0])
         self.X = X[sort_index]
@@ -79,15 +88,12 @@ class StateSpace(Model):
             raise NotImplementedError('SDE must be implemented for the kernel being used')
         #assert self.kern.sde() not False, "This kernel is not supported for state space estimation"
 
-    def parameters_changed(self):
+    def _sde_matrices(self):
         """
-        Parameters have now changed
+        The state-space model matrices of the kernel, and their derivatives
+        with respect to the kernel parameters and the noise variance (last)
+        for the gradient calculation of the Kalman filter.
         """
-
-        #np.set_printoptions(16)
-        #print(self.param_array)
-        #import pdb; pdb.set_trace()
-
         # Get the model matrices from the kernel
         (F,L,Qc,H,P_inf, P0, dFt,dQct,dP_inft, dP0t) = self.kern.sde()
 
@@ -122,6 +128,20 @@ class StateSpace(Model):
         grad_calc_params['dR'] = dR
         grad_calc_params['dP_init'] = dP0
 
+        return (F,L,Qc,H,P_inf, P0, grad_params_no, grad_calc_params)
+
+    def parameters_changed(self):
+        """
+        Parameters have now changed
+        """
+
+        #np.set_printoptions(16)
+        #print(self.param_array)
+        #import pdb; pdb.set_trace()
+
+        # Get the model matrices from the kernel
+        (F,L,Qc,H,P_inf, P0, grad_params_no, grad_calc_params) = self._sde_matrices()
+
         kalman_filter_type = self.kalman_filter_type
 
         # The following code is required because sometimes the shapes of self.Y
@@ -138,7 +158,9 @@ class StateSpace(Model):
                                       P_init=P0, p_kalman_filter_type = kalman_filter_type, calc_log_likelihood=True,
                                       calc_grad_log_likelihood=True,
                                       grad_params_no=grad_params_no,
-                                      grad_calc_params=grad_calc_params)
+                                      grad_calc_params=grad_calc_params,
+                                      dt_quantum=self.dt_quantum, n_jobs=self.n_jobs,
+                                      discretization_cache=self.discretization_cache)
 
         if np.any( np.isfinite(log_likelihood) == False):
             #import pdb; pdb.set_trace()
@@ -192,14 +214,23 @@ class StateSpace(Model):
         if Ynew is None:
             Ynew = self.Y
 
+        return self._raw_predict_data(self.X, Ynew, Xnew, filteronly=filteronly)
+
+    def _raw_predict_data(self, X_train, Y_train, Xnew=None, filteronly=False):
+        """
+        Prediction of the state-space model with training points X_train,
+        Y_train (sorted in time) at the new points Xnew, see _raw_predict.
+        """
+        num_data = X_train.shape[0]
+
         # Make a single matrix containing training and testing points
         if Xnew is not None:
-            X = np.vstack((self.X, Xnew))
-            Y = np.vstack((Ynew, np.nan*np.zeros(Xnew.shape)))
+            X = np.vstack((X_train, Xnew))
+            Y = np.vstack((Y_train, np.nan*np.zeros(Xnew.shape)))
             predict_only_training = False
         else:
-            X = self.X
-            Y = Ynew
+            X = X_train
+            Y = Y_train
             predict_only_training = True
 
         # Sort the matrix (save the order)
@@ -221,7 +252,9 @@ class StateSpace(Model):
                                       F,L,Qc,H,float(self.Gaussian_noise.variance),P_inf,X,Y,m_init=None,
                                       P_init=P0, p_kalman_filter_type = kalman_filter_type,
                                       calc_log_likelihood=False,
-                                      calc_grad_log_likelihood=False)
+                                      calc_grad_log_likelihood=False,
+                                      dt_quantum=self.dt_quantum, n_jobs=self.n_jobs,
+                                      discretization_cache=self.discretization_cache)
 
 #        (filter_means, filter_covs, log_likelihood,
 #         grad_log_likelihood,SmootherMatrObject) = ssm.ContDescrStateSpace.cont_discr_kalman_filter(F,L,Qc,H,
@@ -234,7 +267,8 @@ class StateSpace(Model):
         # Run the Rauch-Tung-Striebel smoother
         if not filteronly:
             (M, P) = ssm.ContDescrStateSpace.cont_discr_rts_smoother(state_dim, M, P,
-                                p_dynamic_callables=SmootherMatrObject, X=X, F=F,L=L,Qc=Qc)
+                                p_dynamic_callables=SmootherMatrObject, X=X, F=F,L=L,Qc=Qc,
+                                p_kalman_filter_type=kalman_filter_type, n_jobs=self.n_jobs)
 
         # remove initial values
         M = M[1:,:,:]
@@ -246,8 +280,8 @@ class StateSpace(Model):
 
         # Only return the values for Xnew
         if not predict_only_training:
-            M = M[self.num_data:,:,:]
-            P = P[self.num_data:,:,:]
+            M = M[num_data:,:,:]
+            P = P[num_data:,:,:]
 
         # Calculate the mean and variance
         # after einsum m has dimension in 3D (sample_num, dim_no,time_series_no)
@@ -283,6 +317,92 @@ class StateSpace(Model):
         return  [stats.norm.ppf(q/100.)*np.sqrt(var + float(self.Gaussian_noise.variance)) + mu for q in quantiles]
 
 
+class StateSpaceMultiSeries(StateSpace):
+    """
+    State-space GP model of many independent time series, which share the
+    kernel and the noise variance but each have their own time points.
+    The Kalman filters of all series run together
+    (see ssm.ContDescrStateSpace.cont_discr_kalman_filter_batch), instead of
+    one filter after the other.
+
+    :param X: list of time points (vectors or (n_i,1) matrices), one per series
+    :param Y: list of observations of the same shapes as X, nan where missing
+    """
+    def __init__(self, X, Y, kernel=None, noise_var=1.0, dt_quantum=None, name='StateSpaceMultiSeries'):
+        Model.__init__(self, name=name)
+
+        assert len(X) == len(Y), "X and Y data don't match"
+        self.X_list = [np.atleast_2d(np.ravel(x)).T for x in X]
+        self.Y_list = [np.atleast_2d(np.ravel(y)).T for y in Y]
+        for x, y in zip(self.X_list, self.Y_list):
+            assert x.shape == y.shape, "X and Y data don't match"
+        self.series_no = len(self.X_list)
+        self.X_padded, self.Y_padded = ssm.pad_time_series(self.X_list, self.Y_list)
+
+        self.input_dim = self.output_dim = 1
+        self.ts_number = None
+        self.kalman_filter_type = 'regular'
+        self.dt_quantum = dt_quantum
+        self.discretization_cache = ssm.DiscretizationCache()
+        self.n_jobs = 1
+
+        self.likelihood = likelihoods.Gaussian(variance=noise_var)
+        if kernel is None:
+            raise ValueError("State-Space Model: the kernel must be provided.")
+        self.kern = kernel
+
+        self.link_parameter(self.kern)
+        self.link_parameter(self.likelihood)
+        self.posterior = None
+
+        if not hasattr(self.kern, 'sde'):
+            raise NotImplementedError('SDE must be implemented for the kernel being used')
+
+    def parameters_changed(self):
+        (F,L,Qc,H,P_inf, P0, grad_params_no, grad_calc_params) = self._sde_matrices()
+
+        (_, _, log_likelihood,
+         grad_log_likelihood) = ssm.ContDescrStateSpace.cont_discr_kalman_filter_batch(F,L,Qc,H,
+                                      float(self.Gaussian_noise.variance),P_inf,self.X_padded,self.Y_padded,
+                                      m_init=None, P_init=P0, calc_log_likelihood=True,
+                                      calc_grad_log_likelihood=True,
+                                      grad_params_no=grad_params_no,
+                                      grad_calc_params=grad_calc_params,
+                                      dt_quantum=self.dt_quantum,
+                                      discretization_cache=self.discretization_cache)
+
+        if np.any( np.isfinite(log_likelihood) == False):
+            warnings.warn("State-Space: NaN values in the log_likelihood")
+
+        if np.any( np.isfinite(grad_log_likelihood) == False):
+            warnings.warn("State-Space: NaN values in the grad_log_likelihood")
+
+        grad_log_likelihood_sum = np.sum(grad_log_likelihood,axis=1)
+        self._log_marginal_likelihood = np.sum(log_likelihood)
+        self.likelihood.update_gradients(grad_log_likelihood_sum[-1])
+
+        self.kern.sde_update_gradient_full(grad_log_likelihood_sum[:-1])
+
+    def _raw_predict(self, Xnew=None, Ynew=None, filteronly=False, series=0, **kw):
+        """
+        Prediction of the series with index series, see StateSpace._raw_predict.
+        """
+        order = np.argsort(self.X_list[series][:,0])
+        if Ynew is None:
+            Ynew = self.Y_list[series][order]
+        return self._raw_predict_data(self.X_list[series][order], Ynew, Xnew, filteronly=filteronly)
+
+    def predict(self, Xnew=None, filteronly=False, include_likelihood=True, series=0, **kw):
+        (m, V) = self._raw_predict(Xnew, filteronly=filteronly, series=series)
+        if include_likelihood:
+            V += float(self.likelihood.variance)
+        return m, V
+
+    def predict_quantiles(self, Xnew=None, quantiles=(2.5, 97.5), series=0, **kw):
+        mu, var = self._raw_predict(Xnew, series=series)
+        return  [stats.norm.ppf(q/100.)*np.sqrt(var + float(self.Gaussian_noise.variance)) + mu for q in quantiles]
+
+
 #    def plot(self, plot_limits=None, levels=20, samples=0, fignum=None,
 #            ax=None, resolution=None, plot_raw=False, plot_filter=False,
 #            linecol=Tango.colorsHex['darkBlue'],fillcol=Tango.colorsHex['lightBlue']):
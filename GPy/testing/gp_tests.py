@@ -59,6 +59,111 @@ class Test(unittest.TestCase):
         np.testing.assert_allclose(mu, mu2)
         np.testing.assert_allclose(var, var2)
 
+    def test_append_data_gp(self):
+        k = GPy.kern.RBF(1)
+        m = GPy.models.GPRegression(self.X[:10], self.Y[:10], kernel=k)
+        m.append_data(self.X[10:11], self.Y[10:11])
+        m.append_data(self.X[11:], self.Y[11:])
+        m_full = GPy.models.GPRegression(self.X, self.Y, kernel=k.copy())
+        np.testing.assert_allclose(m.log_likelihood(), m_full.log_likelihood())
+        np.testing.assert_allclose(m.gradient, m_full.gradient)
+        mu, var = m.predict(self.X_new)
+        mu2, var2 = m_full.predict(self.X_new)
+        np.testing.assert_allclose(mu, mu2)
+        np.testing.assert_allclose(var, var2)
+        assert(m.checkgrad())
+
+    def test_append_data_sliding_window(self):
+        k = GPy.kern.RBF(1)
+        m = GPy.models.GPRegression(self.X[:10], self.Y[:10], kernel=k)
+        m.append_data(self.X[10:], self.Y[10:], max_num_data=15)
+        self.assertEqual(m.num_data, 15)
+        m_full = GPy.models.GPRegression(self.X[5:], self.Y[5:], kernel=k.copy())
+        np.testing.assert_allclose(m.log_likelihood(), m_full.log_likelihood())
+        np.testing.assert_allclose(m.gradient, m_full.gradient)
+        mu, var = m.predict(self.X_new)
+        mu2, var2 = m_full.predict(self.X_new)
+        np.testing.assert_allclose(mu, mu2)
+        np.testing.assert_allclose(var, var2)
+
+    def test_predict_batch_size(self):
+        k = GPy.kern.RBF(1)
+        m = GPy.models.GPRegression(self.X, self.Y, kernel=k, normalizer=True)
+        mu, var = m.predict(self.X_new)
+        mu2, var2 = m.predict(self.X_new, batch_size=7)
+        np.testing.assert_allclose(mu, mu2)
+        np.testing.assert_allclose(var, var2)
+        out = (np.empty((self.N_new, self.D)), np.empty((self.N_new, self.D)))
+        mu3, var3 = m.predict_noiseless(self.X_new, batch_size=16, out=out)
+        self.assertIs(mu3, out[0])
+        np.testing.assert_allclose(mu3, m.predict_noiseless(self.X_new)[0])
+        q = m.predict_quantiles(self.X_new)
+        q2 = m.predict_quantiles(self.X_new, batch_size=9)
+        np.testing.assert_allclose(q, q2)
+
+    def test_predict_n_jobs(self):
+        k = GPy.kern.RBF(1, active_dims=[1]) + GPy.kern.Linear(1, active_dims=[0])
+        X = np.hstack((self.X, self.X**2))
+        X_new = np.hstack((self.X_new, self.X_new**2))
+        m = GPy.models.GPRegression(X, self.Y, kernel=k)
+        mu, var = m.predict(X_new)
+        mu2, var2 = m.predict(X_new, n_jobs=4)
+        np.testing.assert_allclose(mu, mu2)
+        np.testing.assert_allclose(var, var2)
+        mu3, var3 = m.predict(X_new, n_jobs=3, batch_size=4)
+        np.testing.assert_allclose(mu, mu3)
+        np.testing.assert_allclose(var, var3)
+        np.testing.assert_allclose(m.predict_quantiles(X_new), m.predict_quantiles(X_new, n_jobs=2))
+        np.random.seed(3)
+        s = m.posterior_samples_f(X_new, full_cov=False)
+        np.random.seed(3)
+        s2 = m.posterior_samples_f(X_new, full_cov=False, n_jobs=2)
+        np.testing.assert_allclose(s, s2)
+
+    def test_profiling(self):
+        m = GPy.models.SparseGPRegression(self.X, self.Y, num_inducing=5)
+        profiler = m.enable_profiling()
+        m.optimize(max_iters=5)
+        for phase in ['inference', 'kernel', 'kernel_gradient', 'likelihood_gradient', 'cholesky']:
+            self.assertGreater(profiler.timings[phase][0], 0)
+        stats = profiler.cache_stats()
+        self.assertTrue(len(stats) > 0)
+        self.assertTrue(sum(hits for hits, _ in stats.values()) > 0)
+        self.assertIn('inference', profiler.report())
+        mu = m.predict(self.X_new)[0]
+        self.assertIs(m.disable_profiling(), profiler)
+        calls = profiler.timings['inference'][0]
+        m.kern.lengthscale[:] = m.kern.lengthscale + 0.1
+        m.kern.lengthscale[:] = m.kern.lengthscale - 0.1
+        self.assertEqual(profiler.timings['inference'][0], calls)
+        np.testing.assert_allclose(mu, m.predict(self.X_new)[0])
+
+    def test_profiling_threads(self):
+        import threading, pickle
+        from GPy.util import profiling
+        profiler = profiling.Profiler()
+        inside, done = threading.Event(), threading.Event()
+        def update():
+            with profiling.activate(profiler):
+                with profiling.phase('inference'):
+                    inside.set()
+                    done.wait(1.)
+        t = threading.Thread(target=update)
+        t.start()
+        inside.wait(1.)
+        # the profiler is only active in the thread which activated it
+        with profiling.phase('inference'):
+            pass
+        self.assertNotIn('inference', profiler.timings)
+        # the same phase open in two threads is timed in both
+        with profiling.activate(profiler):
+            with profiling.phase('inference'):
+                pass
+        done.set()
+        t.join()
+        self.assertEqual(profiler.timings['inference'][0], 2)
+        self.assertEqual(pickle.loads(pickle.dumps(profiler)).timings, profiler.timings)
+
     def test_mean_function(self):
         from GPy.core.parameterization.param import Param
         from GPy.core.mapping import Mapping
@@ -90,6 +90,45 @@ class StateSpaceKernelsTests(np.testing.TestCase):
                            compare_with_GP=True, gp_kernel=gp_kernel,
                            mean_compare_decimal=5, var_compare_decimal=5)
 
+    def test_Matern52_kernel_parallel(self,):
+        np.random.seed(234) # seed the random number generator
+        (X,Y) = generate_sine_data(x_points=None, sin_period=5.0, sin_ampl=10.0, noise_var=2.0,
+                        plot = False, points_num=50, x_interval = (0, 20), random=True)
+        X.shape = (X.shape[0],1); Y.shape = (Y.shape[0],1)
+
+        ss_kernel = GPy.kern.sde_Matern52(1,active_dims=[0,])
+        gp_kernel = GPy.kern.Matern52(1,active_dims=[0,])
+
+        self.run_for_model(X, Y, ss_kernel, kalman_filter_type = 'parallel',
+                           check_gradients=True,
+                           optimize = True, predict_X=X,
+                           compare_with_GP=True, gp_kernel=gp_kernel,
+                           mean_compare_decimal=5, var_compare_decimal=5)
+
+    def test_Matern32_kernel_multi_series(self,):
+        np.random.seed(234) # seed the random number generator
+        X = []; Y = []
+        for points_num in (1, 20, 35):
+            (x,y) = generate_sine_data(x_points=None, sin_period=5.0, sin_ampl=10.0, noise_var=2.0,
+                            plot = False, points_num=points_num, x_interval = (0, 20), random=True)
+            X.append(x.reshape(-1,1)); Y.append(y.reshape(-1,1))
+        Y[2][[3,10]] = np.nan
+
+        ss_kernel = GPy.kern.sde_Matern32(1, active_dims=[0,])
+        model = GPy.models.StateSpaceMultiSeries(X, Y, ss_kernel, noise_var=2.0)
+        self.assertTrue(model.checkgrad())
+
+        log_likelihood = 0; gradient = 0
+        for x, y in zip(X, Y):
+            m = GPy.models.StateSpace(x, y, ss_kernel.copy(), noise_var=2.0)
+            log_likelihood += m.log_likelihood()
+            gradient += m.gradient
+        np.testing.assert_allclose(model.log_likelihood(), log_likelihood)
+        np.testing.assert_allclose(model.gradient, gradient)
+
+        m = GPy.models.StateSpace(X[1], Y[1], ss_kernel.copy(), noise_var=2.0)
+        np.testing.assert_allclose(model.predict(X[2], series=1), m.predict(X[2]))
+
     def test_RBF_kernel(self,):
         np.random.seed(234) # seed the random number generator
         (X,Y) = generate_sine_data(x_points=None, sin_period=5.0, sin_ampl=10.0, noise_var=2.0,
@@ -64,7 +64,35 @@ class HMCSamplerTest(unittest.TestCase):
 
         hmc = GPy.inference.mcmc.HMC(m,stepsize=1e-2)
         s = hmc.sample(num_samples=3)
-        
+
+    def test_sampling_chains(self):
+        np.random.seed(1)
+        x = np.linspace(0.,2*np.pi,30)[:,None]
+        y = -np.cos(x)+np.random.randn(*x.shape)*0.3+1
+
+        m = GPy.models.GPRegression(x,y)
+        m.kern.lengthscale.set_prior(GPy.priors.Gamma.from_EV(1.,10.))
+        m.kern.variance.set_prior(GPy.priors.Gamma.from_EV(1.,10.))
+        m.likelihood.variance.set_prior(GPy.priors.Gamma.from_EV(1.,10.))
+        theta = m.optimizer_array.copy()
+
+        hmc = GPy.inference.mcmc.HMC(m, stepsize=1e-2)
+        chains, diagnostics = hmc.sample_chains(num_chains=2, parallel=False, num_samples=10, hmc_iters=5, num_warmup=20)
+        self.assertEqual(chains.shape, (2, 10, 3))
+        self.assertEqual(diagnostics['rhat'].shape, (3,))
+        self.assertEqual(diagnostics['ess'].shape, (3,))
+        self.assertEqual(diagnostics['stepsize'].shape, (2,))
+        self.assertEqual(hmc.stepsize, 1e-2)
+        np.testing.assert_array_equal(m.optimizer_array, theta)
+
+    def test_diagnostics(self):
+        np.random.seed(1)
+        chains = np.random.randn(4, 500, 2)
+        np.testing.assert_allclose(GPy.inference.mcmc.rhat(chains), 1., atol=0.02)
+        ess = GPy.inference.mcmc.effective_sample_size(chains)
+        self.assertTrue(np.all(ess > 1000) and np.all(ess < 4000))
+        self.assertTrue(np.all(GPy.inference.mcmc.rhat(chains + np.arange(4)[:, None, None]) > 1.2))
+
 class MCMCSamplerTest(unittest.TestCase):
 
     def test_sampling(self):
@@ -79,6 +107,52 @@ class MCMCSamplerTest(unittest.TestCase):
 
         mcmc = GPy.inference.mcmc.Metropolis_Hastings(m)
         mcmc.sample(Ntotal=100, Nburn=10)
+        self.assertEqual(mcmc.chains[-1].shape, (8, 3))
+
+        theta = m.optimizer_array.copy()
+        chains, diagnostics = mcmc.sample_chains(num_chains=2, parallel=False, Ntotal=50, Nburn=10, Nthin=5)
+        self.assertEqual(chains.shape, (2, 7, 3))
+        self.assertEqual(diagnostics['rhat'].shape, (3,))
+        self.assertEqual(diagnostics['acceptance_rate'].shape, (2,))
+        self.assertEqual(len(mcmc.chains), 3)
+        np.testing.assert_array_equal(m.optimizer_array, theta)
+
+class EPParallelTest(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.X = np.random.rand(40, 1)*6
+        self.Y = (np.sin(self.X) + 0.3*np.random.randn(40, 1) > 0).astype(float)
+
+    def test_moments_match_ep_vectorized(self):
+        tau_cav = np.random.rand(self.Y.shape[0]) + 2.
+        v_cav = np.random.randn(self.Y.shape[0])
+        Y_count = np.random.poisson(2., self.Y.shape).astype(float)
+        for lik, Y in [(GPy.likelihoods.Bernoulli(), self.Y), (GPy.likelihoods.Poisson(), Y_count)]:
+            serial = np.array([lik.moments_match_ep(Y[i], tau_cav[i], v_cav[i]) for i in range(Y.shape[0])]).reshape(-1, 3).T
+            vectorized = np.vstack(lik.moments_match_ep_vectorized(Y, tau_cav, v_cav))
+            np.testing.assert_allclose(serial, vectorized, rtol=1e-3)
+
+    def test_parallel_updates(self):
+        lik = GPy.likelihoods.Bernoulli()
+        m_serial = GPy.core.GP(self.X, self.Y, kernel=GPy.kern.RBF(1), likelihood=lik,
+                               inference_method=GPy.inference.latent_function_inference.EP())
+        m_parallel = GPy.core.GP(self.X, self.Y, kernel=GPy.kern.RBF(1), likelihood=lik.copy(),
+                                 inference_method=GPy.inference.latent_function_inference.EP(parallel_updates=True, delta=.5))
+        np.testing.assert_allclose(m_serial.log_likelihood(), m_parallel.log_likelihood(), rtol=1e-4)
+        np.testing.assert_allclose(m_serial.predict(self.X)[0], m_parallel.predict(self.X)[0], atol=1e-3)
+        self.assertTrue(m_parallel.checkgrad())
+
+    def test_parallel_updates_dtc(self):
+        lik = GPy.likelihoods.Bernoulli()
+        Z = np.linspace(0, 6, 8)[:, None]
+        m_serial = GPy.core.SparseGP(self.X, self.Y, Z, kernel=GPy.kern.RBF(1), likelihood=lik,
+                                     inference_method=GPy.inference.latent_function_inference.EPDTC(epsilon=1e-10))
+        m_parallel = GPy.core.SparseGP(self.X, self.Y, Z.copy(), kernel=GPy.kern.RBF(1), likelihood=lik.copy(),
+                                       inference_method=GPy.inference.latent_function_inference.EPDTC(epsilon=1e-10, parallel_updates=True, delta=.5))
+        np.testing.assert_allclose(m_serial.log_likelihood(), m_parallel.log_likelihood(), rtol=1e-4)
+        np.testing.assert_allclose(m_serial.predict(self.X)[0], m_parallel.predict(self.X)[0], atol=1e-3)
+        self.assertTrue(m_parallel.checkgrad())
 
 if __name__ == "__main__":
     unittest.main()
@@ -436,6 +436,58 @@ class KernelGradientTestsContinuous(unittest.TestCase):
         k.randomize()
         self.assertTrue(check_kernel_gradient_functions(k, X=self.X, X2=self.X2, verbose=verbose))
 
+    def test_EQ_ODE1(self):
+        k = GPy.kern.EQ_ODE1(2, output_dim=3, rank=2)
+        X = np.c_[np.random.rand(12)*5, np.repeat(np.arange(3), 4)]
+        Z = np.c_[np.random.rand(6)*5, 3 + np.repeat(np.arange(2), 3)]
+        self.assertTrue(Kern_check_dK_dtheta(k, X=X, X2=Z).checkgrad(verbose=verbose))
+        self.assertTrue(Kern_check_dK_dtheta(k, X=Z, X2=X).checkgrad(verbose=verbose))
+        self.assertTrue(Kern_check_dK_dtheta(k, X=Z).checkgrad(verbose=verbose))
+        self.assertTrue(Kern_check_dKdiag_dtheta(k, X=X).checkgrad(verbose=verbose))
+
+    def test_EQ_ODE2(self):
+        k = GPy.kern.EQ_ODE2(2, output_dim=3, rank=2)
+        X = np.c_[np.random.rand(12)*5, np.repeat(np.arange(3), 4)]
+        Z = np.c_[np.random.rand(6)*5, 3 + np.repeat(np.arange(2), 3)]
+        self.assertTrue(Kern_check_dK_dtheta(k, X=X, X2=Z).checkgrad(verbose=verbose))
+        self.assertTrue(Kern_check_dK_dtheta(k, X=Z, X2=X).checkgrad(verbose=verbose))
+        self.assertTrue(Kern_check_dK_dtheta(k, X=Z).checkgrad(verbose=verbose))
+        self.assertTrue(Kern_check_dKdiag_dtheta(k, X=X).checkgrad(verbose=verbose))
+
+    def test_integral_limits_K_elementwise(self):
+        # the broadcasted covariances agree with the scalar helpers
+        k = GPy.kern.Integral_Limits(2)
+        k.randomize()
+        X, X2 = self.X[:, :2], self.X2[:, :2]
+        l, v = float(k.lengthscale), float(k.variances)
+        K = np.array([[v*k.k_xx(x[0], x2[0], x[1], x2[1], l) for x2 in X] for x in X])
+        K_xf = np.array([[v*k.k_xf(x[0], x2[0], x[1], l) for x2 in X2] for x in X])
+        np.testing.assert_allclose(k.K(X), K)
+        np.testing.assert_allclose(k.K(X, X2), K_xf)
+
+        k = GPy.kern.Multidimensional_Integral_Limits(4, lengthscale=[.5, 2.])
+        k.randomize()
+        X = self.X[:, :4]
+        K = np.array([[float(k.variances)*k.k_xx(x[0], x2[0], x[1], x2[1], k.lengthscale[0])*
+                       k.k_xx(x[2], x2[2], x[3], x2[3], k.lengthscale[1]) for x2 in X] for x in X])
+        np.testing.assert_allclose(k.K(X), K)
+
+    def test_cached_by_value(self):
+        k = GPy.kern.Integral_Limits(2)
+        calls = []
+        def compute():
+            calls.append(1)
+            return len(calls)
+        X = self.X[:, :2]
+        self.assertEqual(k._cached_by_value('test', (X,), compute, limit=2), 1)
+        self.assertEqual(k._cached_by_value('test', (X.copy(),), compute, limit=2), 1)
+        self.assertEqual(k._cached_by_value('test', (X+1,), compute, limit=2), 2)
+        self.assertEqual(k._cached_by_value('test', (X,), compute, limit=2), 1)
+        self.assertEqual(k._cached_by_value('test', (X+2,), compute, limit=2), 3)
+        self.assertEqual(k._cached_by_value('test', (X+1,), compute, limit=2), 2)
+        self.assertEqual(k._cached_by_value('test', (X,), compute, limit=2), 4)
+        self.assertEqual(k.copy()._value_cache, {})
+
     def test_Linear(self):
         k = GPy.kern.Linear(self.D)
         k.randomize()
@@ -515,6 +567,22 @@ class KernelTestsMiscellaneous(unittest.TestCase):
         np.testing.assert_array_equal(tmp.active_dims, [0,1,2,3,7,9])
         np.testing.assert_array_equal(tmp._all_dims_active, range(10))
 
+    def test_stationary_distance_cache(self):
+        from paramz import ObsAr
+        X = ObsAr(self.X)
+        dL_dK = np.random.randn(X.shape[0], X.shape[0])
+        for ARD in [False, True]:
+            k = GPy.kern.RBF(3, ARD=ARD, active_dims=[1, 4, 5])
+            K = k.K(X)
+            k.lengthscale[:] = k.lengthscale*np.random.uniform(.5, 2., k.lengthscale.size)
+            # a plain array bypasses all caches:
+            np.testing.assert_allclose(k.K(X), k.K(X.values))
+            self.assertFalse(np.allclose(k.K(X), K))
+            k.update_gradients_full(dL_dK, X)
+            g = k.gradient.copy()
+            k.update_gradients_full(dL_dK, X.values)
+            np.testing.assert_allclose(g, k.gradient)
+
 class KernelTestsNonContinuous(unittest.TestCase):
     def setUp(self):
         N0 = 3
@@ -568,6 +636,30 @@ class KernelTestsNonContinuous(unittest.TestCase):
         kern = GPy.kern.Coregionalize(1, output_dim=3, active_dims=[-1])
         self.assertTrue(check_kernel_gradient_functions(kern, X=self.X, X2=self.X2, verbose=verbose, fixed_X_dims=-1))
 
+class Coregionalize_numpy_test(unittest.TestCase):
+    """
+    Check the segment reduction of the numpy coregionalize kernel against
+    explicit sums over the blocks of each pair of outputs
+    """
+    def setUp(self):
+        self.k = GPy.kern.Coregionalize(1, output_dim=6)
+        self.X = np.random.randint(0,5,(40,1))
+        self.X2 = np.sort(np.random.randint(0,6,(30,1)), 0)
+
+    def test_gradient_reduce(self):
+        dL_dK = np.random.randn(40, 30)
+        dL_dK_small = np.zeros((6, 6))
+        for i in range(6):
+            for j in range(6):
+                dL_dK_small[j,i] = dL_dK[self.X[:,0]==i][:, self.X2[:,0]==j].sum()
+        self.assertTrue(np.allclose(self.k._gradient_reduce_numpy(dL_dK, self.X, self.X2), dL_dK_small))
+        self.assertTrue(np.allclose(self.k._K_numpy(self.X, self.X2), self.k.B[self.X, self.X2.T]))
+
+    def test_gradients_diag(self):
+        dL_dKdiag = np.random.randn(40)
+        self.k.update_gradients_diag(dL_dKdiag, self.X)
+        self.assertTrue(np.allclose(self.k.kappa.gradient, [dL_dKdiag[self.X[:,0]==i].sum() for i in range(6)]))
+
 @unittest.skipIf(not config.getboolean('cython', 'working'),"Cython modules have not been built on this machine")
 class Coregionalize_cython_test(unittest.TestCase):
     """
@@ -834,6 +834,104 @@ class LaplaceTests(unittest.TestCase):
         self.assertTrue(m1.checkgrad(verbose=True))
         self.assertTrue(m2.checkgrad(verbose=True))
 
+    def test_laplace_warm_start(self):
+        X = np.linspace(0, 10, 50)[:, None]
+        Y = np.random.poisson(np.exp(np.sin(X) + 1)).astype(float)
+        m = GPy.core.GP(X, Y, GPy.kern.RBF(1), likelihood=GPy.likelihoods.Poisson(),
+                        inference_method=GPy.inference.latent_function_inference.Laplace())
+        cold = m.inference_method.mode_finding_stats
+        m.kern.lengthscale = 1.1
+        warm = m.inference_method.mode_finding_stats
+        self.assertFalse(cold['warm_start'])
+        self.assertTrue(warm['warm_start'])
+        self.assertTrue(warm['iterations'] < cold['iterations'])
+
+        # same mode and marginal as a cold start
+        m2 = GPy.core.GP(X, Y, GPy.kern.RBF(1, lengthscale=1.1), likelihood=GPy.likelihoods.Poisson(),
+                         inference_method=GPy.inference.latent_function_inference.Laplace())
+        np.testing.assert_almost_equal(m.log_likelihood(), m2.log_likelihood(), decimal=4)
+
+    def test_laplace_warm_start_at_mode(self):
+        # warm starting at the mode makes the line search objective flat
+        self.assertEqual(GPy.inference.latent_function_inference.Laplace()._line_search(lambda step: 1.), 1.)
+
+        np.random.seed(4)
+        X = np.random.uniform(0, 10, (30, 1))
+        Y = np.random.poisson(np.exp(np.sin(X))).astype(float)
+        m = GPy.core.GP(X, Y, GPy.kern.RBF(1), likelihood=GPy.likelihoods.Poisson(),
+                        inference_method=GPy.inference.latent_function_inference.Laplace())
+        log_likelihood = m.log_likelihood()
+        m.kern.lengthscale += .5
+        m.kern.lengthscale -= .5
+        np.testing.assert_almost_equal(m.log_likelihood(), log_likelihood, decimal=4)
+
+class QuadratureTests(unittest.TestCase):
+    """
+    Gauss-Hermite quadrature against the adaptive quadrature fallback
+    """
+
+    def setUp(self):
+        np.random.seed(fixed_seed)
+        self.N = 10
+        self.mu = np.random.randn(self.N, 1)
+        self.var = np.random.rand(self.N, 1) + 0.1
+        self.Y = np.random.poisson(2., (self.N, 1)).astype(float)
+
+    def test_poisson_predictive_quadrature(self):
+        lik = GPy.likelihoods.Poisson()
+        mean = lik.predictive_mean(self.mu, self.var)
+        var = lik.predictive_variance(self.mu, self.var, mean)
+        lik.adaptive_quadrature = True
+        np.testing.assert_allclose(mean, lik.predictive_mean(self.mu, self.var), rtol=1e-4)
+        np.testing.assert_allclose(var, lik.predictive_variance(self.mu, self.var, mean), rtol=1e-4)
+
+    def test_student_t_log_predictive_density(self):
+        lik = GPy.likelihoods.StudentT(deg_free=5, sigma2=0.5)
+        Y = self.mu + np.random.randn(self.N, 1)
+        lpd = lik.log_predictive_density(Y, self.mu, self.var)
+        lik.adaptive_quadrature = True
+        np.testing.assert_allclose(lpd, lik.log_predictive_density(Y, self.mu, self.var), rtol=1e-3)
+
+    def test_moments_match_ep(self):
+        lik = GPy.likelihoods.Poisson()
+        gh = np.array(lik.moments_match_ep(self.Y[0], 2., 0.5))
+        lik.adaptive_quadrature = True
+        np.testing.assert_allclose(gh, np.array(lik.moments_match_ep(self.Y[0], 2., 0.5)), rtol=1e-3)
+
+class MixedNoiseTests(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(fixed_seed)
+        self.N, self.P = 12, 4
+        self.variances = np.random.rand(self.P) + 0.1
+        self.lik = GPy.likelihoods.MixedNoise([GPy.likelihoods.Gaussian(variance=v, name='Gaussian_noise_%s' % j) for j, v in enumerate(self.variances)])
+        self.Y_metadata = {'output_index': np.random.randint(0, self.P, (self.N, 1))}
+        self.ind = self.Y_metadata['output_index'].flatten()
+        self.mu = np.random.randn(self.N, 1)
+        self.var = np.random.rand(self.N, 1) + 0.1
+
+    def test_gaussian_variance(self):
+        np.testing.assert_allclose(self.lik.gaussian_variance(self.Y_metadata), self.variances[self.ind])
+        self.lik.likelihoods_list[1].variance = 3.
+        self.variances[1] = 3.
+        np.testing.assert_allclose(self.lik.gaussian_variance(self.Y_metadata), self.variances[self.ind])
+
+    def test_exact_inference_gradients(self):
+        dL_dKdiag = np.random.randn(self.N)
+        grad = self.lik.exact_inference_gradients(dL_dKdiag, self.Y_metadata)
+        np.testing.assert_allclose(grad, [dL_dKdiag[self.ind == j].sum() for j in range(self.P)])
+
+    def test_predictive(self):
+        _, var = self.lik.predictive_values(self.mu, self.var.copy(), Y_metadata=self.Y_metadata)
+        np.testing.assert_allclose(var, self.var + self.variances[self.ind][:, None])
+        cov = np.diagflat(self.var)
+        _, cov = self.lik.predictive_values(self.mu, cov, full_cov=True, Y_metadata=self.Y_metadata)
+        np.testing.assert_allclose(cov, np.diagflat(var))
+        quantiles = self.lik.predictive_quantiles(self.mu, self.var, (2.5, 97.5), self.Y_metadata)
+        for j in range(self.P):
+            q = self.lik.likelihoods_list[j].predictive_quantiles(self.mu, self.var, (2.5, 97.5))
+            for qi, qj in zip(quantiles, q):
+                np.testing.assert_allclose(qi[self.ind == j], qj[self.ind == j])
+
 if __name__ == "__main__":
     print("Running unit tests")
     unittest.main()
@@ -1,6 +1,6 @@
 import numpy as np
 import scipy as sp
-from ..util.linalg import jitchol,trace_dot, ijk_jlk_to_il, ijk_ljk_to_ilk
+from ..util.linalg import jitchol,trace_dot, ijk_jlk_to_il, ijk_ljk_to_ilk, chol_append, chol_update, chol_remove_leading
 
 class LinalgTests(np.testing.TestCase):
     def setUp(self):
@@ -58,3 +58,15 @@ class LinalgTests(np.testing.TestCase):
         pure = np.einsum('ijk,ljk->ilk', A, B)
         quick = ijk_ljk_to_ilk(A,B)
         np.testing.assert_allclose(pure, quick)
+
+    def test_chol_append(self):
+        L = jitchol(self.A)
+        Lnew = chol_append(jitchol(self.A[:15, :15]), self.A[:15, 15:], self.A[15:, 15:])
+        np.testing.assert_allclose(L, Lnew)
+
+    def test_chol_update(self):
+        X = np.random.randn(20, 3)
+        np.testing.assert_allclose(chol_update(jitchol(self.A), X), jitchol(self.A + X.dot(X.T)))
+
+    def test_chol_remove_leading(self):
+        np.testing.assert_allclose(chol_remove_leading(jitchol(self.A), 4), jitchol(self.A[4:, 4:]))
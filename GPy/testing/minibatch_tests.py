@@ -51,6 +51,17 @@ class BGPLVMTest(unittest.TestCase):
         np.testing.assert_allclose(mu1, mu2)
         np.testing.assert_allclose(var1[:,[0]], var2)
 
+    def test_missing_data_n_jobs(self):
+        # Threaded inference over the output groups has to give the exact same result
+        Y = self.Y.copy()
+        Y[self.inan] = np.nan
+        m = GPy.models.bayesian_gplvm_minibatch.BayesianGPLVMMiniBatch(Y, self.Q, init='random', missing_data=True)
+        m_jobs = GPy.models.bayesian_gplvm_minibatch.BayesianGPLVMMiniBatch(Y, self.Q, init='random', missing_data=True, n_jobs=4)
+        m_jobs[:] = m[:]
+        np.testing.assert_array_equal(m_jobs.log_likelihood(), m.log_likelihood())
+        np.testing.assert_array_equal(m_jobs.gradient, m.gradient)
+        assert(m_jobs.checkgrad())
+
     def test_lik_comparisons_m0_s0(self):
         # Test if the different implementations give the exact same likelihood as the full model.
         # All of the following settings should give the same likelihood and gradients as the full model:
@@ -224,6 +235,22 @@ class SparseGPMinibatchTest(unittest.TestCase):
         np.testing.assert_allclose(m.gradient, self.m_full.gradient)
         assert(m.checkgrad())
 
+class MissingDataPatternsTest(unittest.TestCase):
+    def test_patterns(self):
+        from GPy.inference.optimization.stochastics import missing_data_patterns
+        np.random.seed(1)
+        Y = np.random.normal(0, 1, (20, 6))
+        Y[:5, [0, 3]] = np.nan
+        Y[7, [1, 4, 5]] = np.nan
+        index, masks = missing_data_patterns(Y)
+        self.assertEqual(len(masks), 3)
+        self.assertEqual(index[0], index[3])
+        self.assertEqual(index[1], index[4])
+        self.assertEqual(index[1], index[5])
+        self.assertNotEqual(index[0], index[2])
+        for d in range(Y.shape[1]):
+            np.testing.assert_array_equal(masks[index[d]], ~np.isnan(Y[:, d]))
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
@@ -692,6 +692,55 @@ class GradientTests(np.testing.TestCase):
         m = GPy.models.SparseGPClassification(X, Y, kernel=kernel, Z=Z)
         self.assertTrue(m.checkgrad())
 
+    def test_sparse_laplace_DTC_probit(self):
+        np.random.seed(0)
+        N = 20
+        X = np.hstack([np.random.normal(5, 2, N // 2), np.random.normal(10, 2, N // 2)])[:, None]
+        Y = np.hstack([np.ones(N // 2), np.zeros(N // 2)])[:, None]
+        Z = np.linspace(0, 15, 4)[:, None]
+        kernel = GPy.kern.RBF(1)
+        m = GPy.models.SparseGPClassification(X, Y, kernel=kernel, Z=Z, inference_method=GPy.inference.latent_function_inference.LaplaceDTC())
+        # the mode is only found to within the tolerance on the objective,
+        # which swamps the finite differences at the default step
+        m.inference_method._mode_finding_tolerance = 1e-8
+        self.assertTrue(m.checkgrad(step=1e-4))
+
+    def test_sparse_laplace_DTC_poisson(self):
+        N = 30
+        X = np.random.uniform(0, 10, (N, 1))
+        Y = np.random.poisson(np.exp(np.sin(X)))
+        Z = np.linspace(0, 10, 5)[:, None]
+        # non-Gaussian likelihoods default to LaplaceDTC
+        m = GPy.core.SparseGP(X, Y, Z, GPy.kern.RBF(1), GPy.likelihoods.Poisson())
+        self.assertIsInstance(m.inference_method, GPy.inference.latent_function_inference.LaplaceDTC)
+        self.assertTrue(m.checkgrad())
+        # with the inducing inputs at the data the prior is exact, as is dense Laplace
+        m = GPy.core.SparseGP(X, Y, X.copy(), GPy.kern.RBF(1), GPy.likelihoods.Poisson())
+        m_full = GPy.core.GP(X, Y, GPy.kern.RBF(1), GPy.likelihoods.Poisson(), inference_method=GPy.inference.latent_function_inference.Laplace())
+        np.testing.assert_allclose(m.log_likelihood(), m_full.log_likelihood(), rtol=1e-4)
+        np.testing.assert_allclose(m.predict_noiseless(X)[0], m_full.predict_noiseless(X)[0], atol=1e-3)
+
+    def test_sparse_laplace_DTC_studentT(self):
+        # not log-concave: W is clipped in the Woodbury products
+        np.random.seed(0)
+        N = 30
+        X = np.random.uniform(0, 10, (N, 1))
+        Y = np.sin(X) + np.random.randn(N, 1) * 0.1
+        Y[[3, 17]] += 3.
+        Z = np.linspace(0, 10, 5)[:, None]
+        m = GPy.core.SparseGP(X, Y, Z, GPy.kern.RBF(1), GPy.likelihoods.StudentT(deg_free=4., sigma2=.1),
+                              inference_method=GPy.inference.latent_function_inference.LaplaceDTC())
+        m.likelihood.deg_free.fix()
+        m.inference_method._mode_finding_tolerance = 1e-8
+        self.assertTrue(m.checkgrad(step=1e-4))
+        # with the inducing inputs at the data the prior is exact, as is dense Laplace
+        m = GPy.core.SparseGP(X, Y, X.copy(), GPy.kern.RBF(1), GPy.likelihoods.StudentT(deg_free=4., sigma2=.1),
+                              inference_method=GPy.inference.latent_function_inference.LaplaceDTC())
+        m_full = GPy.core.GP(X, Y, GPy.kern.RBF(1), GPy.likelihoods.StudentT(deg_free=4., sigma2=.1),
+                             inference_method=GPy.inference.latent_function_inference.Laplace())
+        np.testing.assert_allclose(m.log_likelihood(), m_full.log_likelihood(), atol=1e-3)
+        np.testing.assert_allclose(m.predict_noiseless(X)[0], m_full.predict_noiseless(X)[0], atol=1e-3)
+
     def test_sparse_EP_DTC_probit_uncertain_inputs(self):
         N = 20
         X = np.hstack([np.random.normal(5, 2, N / 2), np.random.normal(10, 2, N / 2)])[:, None]
@@ -717,6 +766,30 @@ class GradientTests(np.testing.TestCase):
         #m.constrain_fixed('.*rbf_var', 1.)
         self.assertTrue(m.checkgrad())
 
+    def test_multioutput_regression_kronecker(self):
+        X = np.random.rand(20, 1) * 8
+        Y_list = [np.sin(X) + np.random.randn(*X.shape) * 0.05 for _ in range(3)]
+        m = GPy.models.GPCoregionalizedRegression(X_list=[X]*3, Y_list=Y_list,
+                                                  kernel=GPy.util.multioutput.ICM(1, 3, GPy.kern.RBF(1), W_rank=2))
+        mk = GPy.models.GPCoregionalizedRegression(X_list=[X]*3, Y_list=Y_list,
+                                                   kernel=GPy.util.multioutput.ICM(1, 3, GPy.kern.RBF(1), W_rank=2),
+                                                   inference_method=GPy.inference.latent_function_inference.KroneckerGaussianInference())
+        m.randomize()
+        mk[:] = m[:]
+        self.assertTrue(isinstance(mk.posterior, GPy.inference.latent_function_inference.posterior.PosteriorKronecker))
+        np.testing.assert_allclose(mk.log_likelihood(), m.log_likelihood())
+        np.testing.assert_allclose(mk.gradient, m.gradient, atol=1e-6)
+        Xnew = np.hstack([np.random.rand(5, 1) * 8, np.random.randint(0, 3, (5, 1))])
+        for full_cov in [False, True]:
+            mu, var = m._raw_predict(Xnew, full_cov=full_cov)
+            muk, vark = mk._raw_predict(Xnew, full_cov=full_cov)
+            np.testing.assert_allclose(muk, mu, atol=1e-6)
+            np.testing.assert_allclose(vark, var, atol=1e-6)
+        np.testing.assert_allclose(mk.posterior.woodbury_inv, m.posterior.woodbury_inv, atol=1e-6)
+        for g, gk in zip(m.predictive_gradients(Xnew), mk.predictive_gradients(Xnew)):
+            np.testing.assert_allclose(gk, g, atol=1e-6)
+        self.assertTrue(mk.checkgrad())
+
     def test_multioutput_sparse_regression_1D(self):
         X1 = np.random.rand(500, 1) * 8
         X2 = np.random.rand(300, 1) * 5
@@ -787,6 +860,37 @@ class GradientTests(np.testing.TestCase):
         self.assertTrue( np.allclose(mean1, mean2) )
         self.assertTrue( np.allclose(var1, var2) )
 
+    def test_gp_kronecker_gaussian_nd(self):
+        np.random.seed(0)
+        Ns = (6, 5, 4)
+        X_list = [np.sort(np.random.randn(N, 1), 0) for N in Ns]
+        Y = np.random.randn(*Ns)
+        m = GPy.models.GPKroneckerGaussianRegressionND(X_list, Y, [GPy.kern.RBF(1) for _ in Ns])
+
+        # build the model the dumb way
+        grid = lambda X_list: np.vstack([g.flatten() for g in np.meshgrid(*[X[:, 0] for X in X_list], indexing='ij')]).T
+        kg = GPy.kern.RBF(1, active_dims=[0]) * GPy.kern.RBF(1, active_dims=[1]) * GPy.kern.RBF(1, active_dims=[2])
+        mm = GPy.models.GPRegression(grid(X_list), Y.reshape(-1, 1), kernel=kg)
+
+        m.randomize()
+        mm[:] = m[:]
+        self.assertTrue(np.allclose(m.log_likelihood(), mm.log_likelihood()))
+        self.assertTrue(np.allclose(m.gradient, mm.gradient))
+        X_list_test = [np.random.randn(3, 1) for _ in Ns]
+        mean1, var1 = m.predict(X_list_test)
+        mean2, var2 = mm.predict(grid(X_list_test))
+        self.assertTrue(np.allclose(mean1, mean2))
+        self.assertTrue(np.allclose(var1, var2))
+
+        # missing cells: the posterior mean given the observed cells is exact
+        Y[1, 2, 0] = Y[4, 0, 3] = np.nan
+        observed = ~np.isnan(Y.flatten())
+        m = GPy.models.GPKroneckerGaussianRegressionND(X_list, Y, [GPy.kern.RBF(1) for _ in Ns], cg_tol=1e-10)
+        mm = GPy.models.GPRegression(grid(X_list)[observed], Y.reshape(-1, 1)[observed], kernel=kg.copy())
+        mm[:] = m[:]
+        self.assertTrue(np.allclose(m.predict(X_list_test)[0], mm.predict(grid(X_list_test))[0]))
+        self.assertTrue(m.checkgrad())
+
     def test_gp_VGPC(self):
         np.random.seed(10)
         num_obs = 25
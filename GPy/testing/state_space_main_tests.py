@@ -722,6 +722,80 @@ class StateSpaceKernelsTests(np.testing.TestCase):
             # plotting <-
         # 2D measurement, 3 ts_no <-
             
+    def test_matrix_exponent_batch(self):
+        import scipy.linalg as linalg
+        np.random.seed(1)
+        M = np.random.randn(20,4,4) * np.random.uniform(0.01, 30, (20,1,1))
+        Mexp = ssm.matrix_exponent_batch(M)
+        for j in range(M.shape[0]):
+            np.testing.assert_allclose(Mexp[j], linalg.expm(M[j]), rtol=1e-8, atol=1e-10*np.abs(Mexp[j]).max())
+
+    def test_lti_sde_to_descrete_batch(self):
+        """
+        Matrices for all unique time steps at once (and from the cache) equal
+        the ones computed for each time step separately.
+        """
+        try:
+            import GPy
+        except ImportError as e:
+            return None
+
+        kernel = GPy.kern.sde_Matern52(1, variance=2., lengthscale=0.7)
+        (F,L,Qc,H,P_inf,P0, dF,dQc,dP_inf,dP0) = kernel.sde()
+        grad_params_no = dF.shape[2]
+        dt = np.round(np.abs(np.random.randn(50)), 8)
+
+        cache = ssm.DiscretizationCache()
+        for repeat in range(2):
+            A, Q, index, dA, dQ = ssm.ContDescrStateSpace.lti_sde_to_descrete(F,L,Qc,dt,
+                            True, grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc, cache=cache)
+            for k in range(0, dt.shape[0], 7):
+                A_k, Q_k, _, dA_k, dQ_k = ssm.ContDescrStateSpace.lti_sde_to_descrete(F,L,Qc,dt[k],
+                            True, grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc)
+                np.testing.assert_allclose(A[:,:,index[k]], A_k, atol=1e-10)
+                np.testing.assert_allclose(Q[:,:,index[k]], Q_k, atol=1e-10)
+                np.testing.assert_allclose(dA[:,:,:,index[k]], dA_k, atol=1e-10)
+                np.testing.assert_allclose(dQ[:,:,:,index[k]], dQ_k, atol=1e-10)
+            dt = dt[::-1]
+        self.assertEqual(len(cache._entries), 1)
+        self.assertTrue(0 < cache.nbytes <= cache.max_bytes)
+
+        # entries larger than max_bytes are not kept
+        cache = ssm.DiscretizationCache(max_bytes=A.nbytes)
+        ssm.ContDescrStateSpace.lti_sde_to_descrete(F,L,Qc,dt,
+                            True, grad_params_no=grad_params_no, P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc, cache=cache)
+        self.assertEqual(cache.nbytes, 0)
+
+    def test_discretization_in_blocks(self):
+        """
+        AQcompute_once, used for many different time steps, discretizes them
+        in blocks with the same results as the batch object.
+        """
+        try:
+            import GPy
+        except ImportError as e:
+            return None
+
+        kernel = GPy.kern.sde_Matern32(1, variance=2., lengthscale=0.7)
+        (F,L,Qc,H,P_inf,P0, dF,dQc,dP_inf,dP0) = kernel.sde()
+        grad_params_no = dF.shape[2]
+        dt = np.abs(np.random.randn(50))
+        once = ssm.ContDescrStateSpace.AQcompute_once(F,L,Qc,dt,True, grad_params_no=grad_params_no,
+                            P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc)
+        once.block_size = 16
+        batch = ssm.ContDescrStateSpace.AQcompute_batch_Python(F,L,Qc,dt,True, grad_params_no=grad_params_no,
+                            P_inf=P_inf, dP_inf=dP_inf, dF=dF, dQc=dQc)
+        for k in list(range(dt.shape[0])) + list(range(dt.shape[0]-1, -1, -3)):
+            np.testing.assert_allclose(once.Ak(k, None, None), batch.Ak(k, None, None), atol=1e-10)
+            np.testing.assert_allclose(once.Qk(k), batch.Qk(k), atol=1e-10)
+            np.testing.assert_allclose(once.dAk(k), batch.dAk(k), atol=1e-10)
+            np.testing.assert_allclose(once.dQk(k), batch.dQk(k), atol=1e-10)
+
+        # blocks of the parallel filter
+        for M_once, M_batch in zip(ssm._block_discrete_matrices(once, 10, 40, True),
+                                   ssm._block_discrete_matrices(batch, 10, 40, True)):
+            np.testing.assert_allclose(M_once, M_batch, atol=1e-10)
+
     def test_continuos_ss(self,plot=False):
         """
         This function tests the continuos state-space model.
@@ -52,3 +52,91 @@ class SVGP_Poisson_with_meanfunction(np.testing.TestCase):
         assert self.m.checkgrad(step=1e-4)
 
 
+
+class SVGP_streaming(np.testing.TestCase):
+    """
+    SVGP on minibatches streamed from memory mapped files
+    """
+    def setUp(self):
+        import tempfile, os
+        np.random.seed(0)
+        self.X = np.random.rand(200, 1)*10
+        self.Y = np.sin(self.X) + np.random.randn(*self.X.shape)*0.1
+        self.Z = np.linspace(0,10,10).reshape(-1,1)
+        self.tmpdir = tempfile.mkdtemp()
+        self.X_file, self.Y_file = os.path.join(self.tmpdir, 'X.npy'), os.path.join(self.tmpdir, 'Y.npy')
+        np.save(self.X_file, self.X)
+        np.save(self.Y_file, self.Y)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def test_batches_cover_data(self):
+        batches = GPy.util.minibatch.ArrayBatches.from_npy(self.X_file, self.Y_file, 30)
+        X = np.vstack([next(batches)[0] for _ in range(7)])
+        np.testing.assert_array_equal(np.sort(X, 0), np.sort(self.X, 0))
+
+    def test_streaming_optimize(self):
+        batches = GPy.util.minibatch.ArrayBatches.from_npy(self.X_file, self.Y_file, 50)
+        m = GPy.core.SVGP(None, None, Z=self.Z, kernel=GPy.kern.RBF(1), likelihood=GPy.likelihoods.Gaussian(),
+                          batches=batches, prefetch=2)
+        self.assertEqual(m.total_num_data, 200)
+        assert m.checkgrad()
+        m_full = GPy.core.SVGP(self.X, self.Y, Z=self.Z, kernel=GPy.kern.RBF(1), likelihood=GPy.likelihoods.Gaussian())
+        before = m_full.log_likelihood()
+        m.optimize_stochastic(max_iters=200, step_rate=0.05)
+        m_full[:] = m[:]
+        self.assertGreater(m_full.log_likelihood(), before)
+
+    def test_prefetch_copy_and_pickle(self):
+        import pickle
+        batches = GPy.util.minibatch.ArrayBatches(self.X, self.Y, 50, random_state=0)
+        m = GPy.core.SVGP(None, None, Z=self.Z, kernel=GPy.kern.RBF(1), likelihood=GPy.likelihoods.Gaussian(),
+                          batches=batches, prefetch=2)
+        for m2 in [m.copy(), pickle.loads(pickle.dumps(m))]:
+            self.assertIsNot(m2.batches._thread, m.batches._thread)
+            np.testing.assert_array_equal(m2.log_likelihood(), m.log_likelihood())
+            X, _ = m2.new_batch()
+            self.assertEqual(X.shape, (50, 1))
+
+    def test_prefetch_collected(self):
+        # the loading thread stops when the prefetcher is collected
+        import gc
+        batches = GPy.util.minibatch.Prefetcher(GPy.util.minibatch.ArrayBatches(self.X, self.Y, 50), 2)
+        thread = batches._thread
+        del batches
+        gc.collect()
+        thread.join(1.)
+        self.assertFalse(thread.is_alive())
+
+    def test_prefetch_close_finite(self):
+        # closing while the loader waits to put the end of a finite source
+        source = iter([(self.X[:10], self.Y[:10])]*3)
+        batches = GPy.util.minibatch.Prefetcher(source, 1)
+        next(batches), next(batches)
+        batches.close()
+        self.assertFalse(batches._thread.is_alive())
+
+class SVGP_natural_gradients(np.testing.TestCase):
+    """
+    Natural gradient steps for q(u) in the SVGP
+    """
+    def setUp(self):
+        np.random.seed(0)
+        X = np.random.rand(100, 1)*10
+        Y = np.hstack((np.sin(X), np.cos(X))) + np.random.randn(100, 2)*0.1
+        Z = np.linspace(0,10,10).reshape(-1,1)
+        self.m = GPy.core.SVGP(X, Y, Z=Z, kernel=GPy.kern.RBF(1), likelihood=GPy.likelihoods.Gaussian())
+
+    def test_gaussian_one_step(self):
+        # a unit step gives the optimal q(u) for Gaussian likelihoods
+        self.m.natural_gradient_step(1.)
+        np.testing.assert_allclose(self.m.grad_dict['dL_dm'], 0., atol=1e-5)
+        np.testing.assert_allclose(self.m.grad_dict['dL_dchol'], 0., atol=1e-5)
+        assert self.m.checkgrad()
+
+    def test_optimize_with_natural_gradients(self):
+        before = self.m.log_likelihood()
+        self.m.optimize_stochastic(max_iters=20, step_rate=0.01, natgrad_step_rate=1.)
+        self.assertGreater(self.m.log_likelihood(), before)
@@ -9,6 +9,7 @@ import numpy as np
 from scipy import linalg
 from scipy.linalg import lapack, blas
 from .config import config
+from .profiling import profiled
 import logging
 
 try:
@@ -54,6 +55,7 @@ def force_F_ordered(A):
 #         return jitchol(A+np.eye(A.shape[0])*jitter, maxtries-1)
 
 
+@profiled('cholesky')
 def jitchol(A, maxtries=5):
     A = np.ascontiguousarray(A)
     L, info = lapack.dpotrf(A, lower=1)
@@ -228,6 +230,122 @@ def dtrtri(L):
     return lapack.dtrtri(L, lower=1)[0]
 
 
+def chol_append(L, B, C):
+    """
+    Extend a Cholesky decomposition by new rows and columns.
+
+    Given the lower Cholesky factor L of A, return the lower Cholesky factor
+    of the block matrix [[A, B], [B.T, C]]. Only the new block rows are
+    computed, which costs O(N^2 k) instead of O((N+k)^3).
+
+    :param L: NxN lower Cholesky factor of A
+    :param B: Nxk cross block
+    :param C: kxk new diagonal block
+    :rtype: (N+k)x(N+k) lower triangular matrix (F ordered)
+
+    """
+    N, k = B.shape
+    S, _ = dtrtrs(L, B, lower=1)
+    L22 = jitchol(C - tdot(S.T))
+    Lnew = np.zeros((N+k, N+k), order='F')
+    Lnew[:N, :N] = L
+    Lnew[N:, :N] = S.T
+    Lnew[N:, N:] = L22
+    return Lnew
+
+def chol_update(L, X):
+    """
+    Rank-k update of a Cholesky decomposition.
+
+    Given the lower Cholesky factor L of A, return the lower Cholesky factor
+    of A + X X^T by a sequence of rank-one updates (Givens style), which
+    costs O(N^2 k).
+
+    :param L: NxN lower Cholesky factor of A
+    :param X: Nxk update (or N vector for rank-one)
+    :rtype: NxN lower triangular matrix (F ordered)
+
+    """
+    L = np.array(L, order='F', copy=True)
+    X = np.array(X, dtype=np.float64, copy=True).reshape(L.shape[0], -1)
+    N = L.shape[0]
+    for x in X.T:
+        for i in range(N):
+            r = np.hypot(L[i, i], x[i])
+            c = r / L[i, i]
+            s = x[i] / L[i, i]
+            L[i, i] = r
+            if i + 1 < N:
+                L[i+1:, i] = (L[i+1:, i] + s * x[i+1:]) / c
+                x[i+1:] = c * x[i+1:] - s * L[i+1:, i]
+    return L
+
+def chol_remove_leading(L, num):
+    """
+    Remove the first num rows and columns from a Cholesky decomposition.
+
+    Given the lower Cholesky factor L of A, return the lower Cholesky factor
+    of A[num:, num:] in O(N^2 num), using
+
+        A[num:, num:] = L21 L21^T + L22 L22^T
+
+    :param L: NxN lower Cholesky factor of A
+    :param int num: number of leading rows/columns to remove
+    :rtype: (N-num)x(N-num) lower triangular matrix (F ordered)
+
+    """
+    return chol_update(L[num:, num:], L[num:, :num])
+
+def kron_mvprod(As, X):
+    """
+    Product of the Kronecker product A_1 kron ... kron A_D with a vector,
+    without forming the Kronecker product: every factor is applied along its
+    axis of the vector reshaped to a tensor, which costs O(N sum_d M_d)
+    instead of O(N^2).
+
+    :param As: list of D matrices (M_d x N_d); None stands for an identity
+    :param X: the vector as a tensor of shape (N_1, ..., N_D) (C ordered, i.e. the vector is X.flatten())
+    :rtype: tensor of shape (M_1, ..., M_D)
+
+    """
+    for d, A in enumerate(As):
+        if A is not None:
+            X = np.moveaxis(np.tensordot(A, X, axes=(1, d)), 0, d)
+    return X
+
+def pcg(A, b, M=None, x0=None, tol=1e-6, maxiter=1000):
+    """
+    Preconditioned conjugate gradients for A x = b, A symmetric positive
+    definite and only given through products with vectors.
+
+    :param A: function returning the product A v
+    :param b: right hand side vector
+    :param M: function returning the product of the preconditioner (an approximation of A^-1) with v
+    :param x0: initial guess, defaults to zeros
+    :param tol: stop when |A x - b| <= tol |b|
+    :param maxiter: maximum number of iterations
+    :returns: (x, number of iterations)
+
+    """
+    x = np.zeros_like(b) if x0 is None else np.array(x0, dtype=float)
+    r = b - A(x)
+    z = r if M is None else M(r)
+    p = z.copy()
+    rz = r.dot(z)
+    stop = tol*np.sqrt(b.dot(b))
+    for i in range(maxiter):
+        if np.sqrt(r.dot(r)) <= stop:
+            return x, i
+        Ap = A(p)
+        a = rz/p.dot(Ap)
+        x += a*p
+        r -= a*Ap
+        z = r if M is None else M(r)
+        rz, rz_old = r.dot(z), rz
+        p = z + (rz/rz_old)*p
+    logging.warning('pcg: no convergence in {} iterations, relative residual {:.3e}'.format(maxiter, np.sqrt(r.dot(r))/np.sqrt(b.dot(b))))
+    return x, maxiter
+
 def multiple_pdinv(A):
     """
     :param A: A DxDxN numpy array (each A[:,:,i] is pd)
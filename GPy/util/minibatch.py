@@ -0,0 +1,170 @@
+# Copyright (c) 2016, GPy authors (see AUTHORS.txt).
+# Licensed under the BSD 3-clause license (see LICENSE.txt)
+
+"""
+Minibatch sources for stochastic inference (see :class:`~GPy.core.svgp.SVGP`).
+
+A minibatch source is any iterator returning pairs (X_batch, Y_batch) of
+in-memory arrays. The sources here draw contiguous chunks of (possibly memory
+mapped) arrays, so that data sets larger than the memory can be streamed from
+disk, and can load the next batches in a background thread.
+"""
+
+import threading
+import numpy as np
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+class ArrayBatches(object):
+    """
+    Endless minibatches of contiguous rows of X and Y. The order of the chunks
+    is shuffled in every pass over the data, like climin.util.draw_mini_slices.
+
+    X and Y can be anything supporting slicing of rows, e.g. numpy memmaps
+    (see from_npy) or h5py datasets; only the rows of the current batch are
+    read into memory.
+
+    :param X: inputs (N x input_dim)
+    :param Y: outputs (N x output_dim)
+    :param int batchsize: number of rows per batch
+    :param bool shuffle: shuffle the order of the chunks in every pass
+    :param random_state: seed or numpy RandomState for the shuffling
+    """
+    def __init__(self, X, Y, batchsize, shuffle=True, random_state=None):
+        assert X.shape[0] == Y.shape[0], "X and Y need the same number of rows"
+        self.X, self.Y = X, Y
+        self.batchsize = int(batchsize)
+        self.shuffle = shuffle
+        if not isinstance(random_state, np.random.RandomState):
+            random_state = np.random.RandomState(random_state)
+        self.random_state = random_state
+        self._starts = []
+
+    @classmethod
+    def from_npy(cls, X_file, Y_file, batchsize, **kwargs):
+        """
+        Stream the batches from the .npy files X_file and Y_file, which are
+        memory mapped instead of being loaded.
+        """
+        return cls(np.load(X_file, mmap_mode='r'), np.load(Y_file, mmap_mode='r'), batchsize, **kwargs)
+
+    @property
+    def num_data(self):
+        return self.X.shape[0]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if len(self._starts) == 0:
+            starts = np.arange(0, self.num_data, self.batchsize)
+            if self.shuffle:
+                self.random_state.shuffle(starts)
+            self._starts = list(starts[::-1])
+        i = self._starts.pop()
+        s = slice(i, i + self.batchsize)
+        return np.array(self.X[s]), np.array(self.Y[s])
+    next = __next__
+
+def _put(q, stop, item):
+    """Put item on the queue q unless stop is set first; returns whether it was put"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _load(batches, q, stop, sentinel):
+    """
+    Load the batches onto the queue q until stop is set. This does not hold
+    on to the Prefetcher, so that it can be collected (and stops the thread).
+    """
+    try:
+        for batch in batches:
+            if not _put(q, stop, batch):
+                return
+    except Exception as e:
+        _put(q, stop, e)
+        return
+    _put(q, stop, sentinel)
+
+class Prefetcher(object):
+    """
+    Wrap a minibatch source, loading up to num_prefetch batches ahead in a
+    background thread, e.g. while the gradients of the current batch are
+    computed.
+
+    The thread stops on close() or when the Prefetcher is collected. Copies
+    and pickles hold the source and the batches queued so far, and start
+    their own thread (a batch waiting for room in the queue is skipped).
+
+    :param batches: the minibatch source (iterator of (X_batch, Y_batch))
+    :param int num_prefetch: number of batches to load ahead
+    """
+    _sentinel = object()
+
+    def __init__(self, batches, num_prefetch=1):
+        self.batches = batches
+        self.num_prefetch = max(int(num_prefetch), 1)
+        self._start()
+
+    def _start(self, pending=(), closed=False):
+        self._queue = queue.Queue(maxsize=max(self.num_prefetch, len(pending)))
+        for batch in pending:
+            self._queue.put(batch)
+        self._stop = threading.Event()
+        if closed:
+            self._stop.set()
+        self._thread = threading.Thread(target=_load, args=(self.batches, self._queue, self._stop, self._sentinel))
+        self._thread.daemon = True
+        if not closed:
+            self._thread.start()
+
+    @property
+    def num_data(self):
+        return self.batches.num_data
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._stop.is_set():
+            raise StopIteration
+        batch = self._queue.get()
+        if batch is self._sentinel:
+            self._stop.set()
+            raise StopIteration
+        if isinstance(batch, Exception):
+            self._stop.set()
+            raise batch
+        return batch
+    next = __next__
+
+    def close(self):
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def __del__(self):
+        if hasattr(self, '_stop'):
+            self._stop.set()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_queue'], state['_stop'], state['_thread']
+        with self._queue.mutex:
+            state['_pending'] = [b for b in self._queue.queue if b is not self._sentinel]
+        state['_closed'] = self._stop.is_set()
+        return state
+
+    def __setstate__(self, state):
+        state = state.copy()
+        pending, closed = state.pop('_pending'), state.pop('_closed')
+        self.__dict__.update(state)
+        self._start(pending, closed)
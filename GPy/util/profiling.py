@@ -0,0 +1,196 @@
+# Copyright (c) 2016, GPy authors (see AUTHORS.txt).
+# Licensed under the BSD 3-clause license (see LICENSE.txt)
+
+"""
+Opt-in timing of the phases of a model update (inference, kernel evaluation,
+kernel and likelihood gradients, Cholesky decompositions), together with
+hit/miss counts of the Cache_this caches of the model.
+
+Profiling is switched on per model::
+
+    profiler = m.enable_profiling()
+    m.optimize()
+    print(profiler.report())
+    profiler.dump('profile.json')
+
+Phases are only recorded while a profiled model updates itself (in
+parameters_changed). Phases nest: the time of e.g. the kernel evaluation
+inside the inference is included in the inference time as well. Nested calls
+of the same phase (e.g. the parts of a sum kernel) are counted once.
+
+The profiler is active only in the thread updating the model. Work handed to
+other threads (e.g. the thread pools of n_jobs) is not timed, and models
+updating in other threads are not charged to it.
+"""
+
+import json
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+from paramz.caching import Cacher, FunctionCache
+
+#: _active.profiler is the profiler of the model currently updating in this
+#: thread, None (or missing) if not profiling
+_active = threading.local()
+
+def _active_profiler():
+    return getattr(_active, 'profiler', None)
+
+class _CountingCacher(Cacher):
+    """
+    A Cacher which counts its calls and the calls of its operation (misses).
+    Cachers are switched to this class in place by Profiler.instrument_caches.
+    """
+    def __call__(self, *args, **kw):
+        self.calls += 1
+        return super(_CountingCacher, self).__call__(*args, **kw)
+
+def _count_misses(cacher, operation):
+    @wraps(operation)
+    def counted(*args, **kw):
+        cacher.misses += 1
+        return operation(*args, **kw)
+    return counted
+
+class Profiler(object):
+    def __init__(self):
+        self._cachers = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Delete all recorded timings and cache counts"""
+        with self._lock:
+            # phase name -> [number of calls, total time in seconds]
+            self.timings = {}
+            # _open.names: the phases open in this thread
+            self._open = threading.local()
+            for _, c in self._cachers:
+                c.calls = c.misses = 0
+
+    @contextmanager
+    def phase(self, name):
+        open_phases = getattr(self._open, 'names', None)
+        if open_phases is None:
+            open_phases = self._open.names = set()
+        if name in open_phases:
+            yield
+            return
+        open_phases.add(name)
+        t_st = time.time()
+        try:
+            yield
+        finally:
+            open_phases.discard(name)
+            t = time.time() - t_st
+            with self._lock:
+                record = self.timings.setdefault(name, [0, 0.])
+                record[0] += 1
+                record[1] += t
+
+    def instrument_caches(self, parameterized):
+        """
+        Count the hits and misses of all caches in the hierarchy of
+        parameterized. Caches are created on first use, so this is called
+        after every profiled update to pick up new ones.
+        """
+        def visit(p):
+            cache = p.__dict__.get('cache', None)
+            if not isinstance(cache, FunctionCache):
+                return
+            for c in cache.values():
+                if type(c) is Cacher:
+                    c.__class__ = _CountingCacher
+                    c.calls = c.misses = 0
+                    c._operation = c.operation
+                    c.operation = _count_misses(c, c.operation)
+                    self._cachers.append(('{}.{}'.format(p.name, c.__name__), c))
+        parameterized.traverse(visit)
+
+    def uninstrument_caches(self):
+        for _, c in self._cachers:
+            c.operation = c._operation
+            c.__class__ = Cacher
+            del c._operation, c.calls, c.misses
+        self._cachers = []
+
+    def cache_stats(self):
+        """
+        :returns: dict of cache name -> (hits, misses), summed over caches with the same name
+        """
+        stats = {}
+        for name, c in self._cachers:
+            hits, misses = stats.get(name, (0, 0))
+            stats[name] = (hits + c.calls - c.misses, misses + c.misses)
+        return stats
+
+    def to_dict(self):
+        return {'phases':{name:{'calls':calls, 'time':t} for name, (calls, t) in self.timings.items()},
+                'caches':{name:{'hits':hits, 'misses':misses} for name, (hits, misses) in self.cache_stats().items()}}
+
+    def report(self):
+        """A human readable table of the phase timings and cache counts"""
+        lines = ['{:<24s} {:>8s} {:>12s} {:>12s}'.format('phase', 'calls', 'total(s)', 'mean(ms)')]
+        for name, (calls, t) in sorted(self.timings.items(), key=lambda x: -x[1][1]):
+            lines.append('{:<24s} {:>8d} {:>12.4f} {:>12.4f}'.format(name, calls, t, 1e3*t/calls))
+        stats = self.cache_stats()
+        if stats:
+            lines.append('')
+            lines.append('{:<40s} {:>8s} {:>8s}'.format('cache', 'hits', 'misses'))
+            for name, (hits, misses) in sorted(stats.items()):
+                lines.append('{:<40s} {:>8d} {:>8d}'.format(name, hits, misses))
+        return '\n'.join(lines)
+
+    def dump(self, fname):
+        """Write the timings and cache counts to fname as JSON"""
+        with open(fname, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1, sort_keys=True)
+
+    def __getstate__(self):
+        # Cachers, locks and thread locals cannot be pickled
+        state = self.__dict__.copy()
+        state['_cachers'] = []
+        del state['_lock'], state['_open']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._open = threading.local()
+
+@contextmanager
+def activate(profiler):
+    """Record phases of this thread into profiler (if not None) within this context"""
+    if profiler is None:
+        yield
+        return
+    previous, _active.profiler = _active_profiler(), profiler
+    try:
+        yield
+    finally:
+        _active.profiler = previous
+
+@contextmanager
+def phase(name):
+    """Time the enclosed block as phase name, if profiling"""
+    profiler = _active_profiler()
+    if profiler is None:
+        yield
+    else:
+        with profiler.phase(name):
+            yield
+
+def profiled(name):
+    """Decorator timing every call of the function as phase name, if profiling"""
+    def decorator(f):
+        @wraps(f)
+        def g(*args, **kw):
+            profiler = _active_profiler()
+            if profiler is None:
+                return f(*args, **kw)
+            with profiler.phase(name):
+                return f(*args, **kw)
+        return g
+    return decorator
@@ -0,0 +1,77 @@
+# Copyright (c) 2016, GPy authors (see AUTHORS.txt).
+# Licensed under the BSD 3-clause license (see LICENSE.txt)
+
+import abc
+import numpy as np
+import GPy
+from tasks import SinusoidRegression, LatentEmbedding
+
+class ThroughputMethod(object):
+    """
+    A model class under benchmark. build returns a model ready for
+    optimization; the timed predictions are made at the test inputs.
+    """
+    __metaclass__ = abc.ABCMeta
+    task = SinusoidRegression
+    sparse = False
+
+    def supports(self, input_dim):
+        return True
+
+    @abc.abstractmethod
+    def build(self, train_data, num_inducing):
+        """Return the model for the training data"""
+        return None
+
+    def _inducing_inputs(self, X, num_inducing):
+        rs = np.random.RandomState(0)
+        return X[rs.permutation(X.shape[0])[:num_inducing]].copy()
+
+class GPRegression_RBF(ThroughputMethod):
+    name = 'GPRegression'
+
+    def build(self, train_data, num_inducing):
+        X, Y = train_data
+        return GPy.models.GPRegression(X, Y, kernel=GPy.kern.RBF(X.shape[1], ARD=True))
+
+class SparseGPRegression_RBF(ThroughputMethod):
+    name = 'SparseGPRegression'
+    sparse = True
+
+    def build(self, train_data, num_inducing):
+        X, Y = train_data
+        return GPy.models.SparseGPRegression(X, Y, kernel=GPy.kern.RBF(X.shape[1], ARD=True),
+                                             Z=self._inducing_inputs(X, num_inducing))
+
+class SVGP_RBF(ThroughputMethod):
+    name = 'SVGP'
+    sparse = True
+    batchsize = 256
+
+    def build(self, train_data, num_inducing):
+        X, Y = train_data
+        return GPy.core.SVGP(X, Y, Z=self._inducing_inputs(X, num_inducing),
+                             kernel=GPy.kern.RBF(X.shape[1], ARD=True),
+                             likelihood=GPy.likelihoods.Gaussian(),
+                             batchsize=min(self.batchsize, X.shape[0]))
+
+class BayesianGPLVM_RBF(ThroughputMethod):
+    name = 'BayesianGPLVM'
+    task = LatentEmbedding
+    sparse = True
+
+    def build(self, train_data, num_inducing):
+        Y = train_data[1]
+        input_dim = train_data[0].shape[1]
+        return GPy.models.BayesianGPLVM(Y, input_dim, kernel=GPy.kern.RBF(input_dim, ARD=True),
+                                        num_inducing=min(num_inducing, Y.shape[0]))
+
+class StateSpace_Matern32(ThroughputMethod):
+    name = 'StateSpace'
+
+    def supports(self, input_dim):
+        return input_dim == 1
+
+    def build(self, train_data, num_inducing):
+        X, Y = train_data
+        return GPy.models.StateSpace(X, Y, kernel=GPy.kern.sde_Matern32(1))
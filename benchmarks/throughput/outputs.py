@@ -0,0 +1,40 @@
+# Copyright (c) 2016, GPy authors (see AUTHORS.txt).
+# Licensed under the BSD 3-clause license (see LICENSE.txt)
+
+from __future__ import print_function
+import abc
+import os
+import json
+
+class Output(object):
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractmethod
+    def output(self, config, results):
+        """Write out the list of benchmark records"""
+        return None
+
+class ScreenOutput(Output):
+
+    def output(self, config, results):
+        print('='*10+'Report'+'='*10)
+        phases = [p for p, _ in config['phases']]
+        print('\t'.join(['model', 'N', 'M', 'D']+[p+'(s)' for p in phases]+['peak(MB)']))
+        for record in results:
+            times = ['%e' % record['phases'][p]['time_mean'] for p in phases]
+            peak = max(record['phases'][p]['peak_memory'] or 0 for p in phases)/2.**20
+            print('\t'.join([record['model'], str(record['num_data']), str(record['num_inducing']),
+                             str(record['input_dim'])]+times+['%.1f' % peak]))
+
+class JSONOutput(Output):
+    """
+    Machine readable results, one record per model and sweep point, together
+    with the versions the benchmark ran with.
+    """
+
+    def __init__(self, outpath, prjname):
+        self.fname = os.path.join(outpath, prjname+'.json')
+
+    def output(self, config, results):
+        with open(self.fname, 'w') as f:
+            json.dump({'environment': config['environment'], 'results': results}, f, indent=1, sort_keys=True)
@@ -0,0 +1,122 @@
+# Copyright (c) 2016, GPy authors (see AUTHORS.txt).
+# Licensed under the BSD 3-clause license (see LICENSE.txt)
+
+"""
+Training and prediction throughput of the main model classes on synthetic data.
+
+For every model, number of data N, number of inducing points M (sparse models
+only) and input dimension D, the following phases are timed:
+
+    log_likelihood: inference, log likelihood and gradient evaluation
+    optimize: one optimizer iteration (averaged over optimize_iters iterations)
+    predict: prediction at num_test inputs
+
+Usage: python run.py [--quick] [--outpath DIR]
+"""
+
+from __future__ import print_function
+from methods import GPRegression_RBF, SparseGPRegression_RBF, SVGP_RBF, BayesianGPLVM_RBF, StateSpace_Matern32
+from outputs import ScreenOutput, JSONOutput
+import argparse
+import itertools
+import platform
+import time
+import numpy as np
+import GPy
+
+try:
+    import tracemalloc
+except ImportError:
+    # python 2: no peak memory
+    tracemalloc = None
+
+def evaluate_gradients(m, test_data, config):
+    m.parameters_changed()
+    m.log_likelihood()
+    m._log_likelihood_gradients()
+
+def optimize(m, test_data, config):
+    m.optimize(max_iters=config['optimize_iters'])
+
+def predict(m, test_data, config):
+    m.predict(test_data[0])
+
+outpath = '.'
+prjname = 'throughput'
+config = {
+          'methods':[GPRegression_RBF, SparseGPRegression_RBF, SVGP_RBF, BayesianGPLVM_RBF, StateSpace_Matern32],
+          'phases':[('log_likelihood', evaluate_gradients), ('optimize', optimize), ('predict', predict)],
+          'num_data':[500, 1000, 2000, 4000],
+          'num_inducing':[50, 100, 200],
+          'input_dim':[1, 5],
+          'num_test':1000,
+          'optimize_iters':10,
+          'repeats':3,
+          }
+quick_config = {
+          'num_data':[200, 400],
+          'num_inducing':[20],
+          'input_dim':[1, 2],
+          'num_test':200,
+          'optimize_iters':2,
+          'repeats':1,
+          }
+
+def time_phase(method, phase, train, test, num_inducing, config):
+    """
+    Time one phase on a freshly built model per repeat, so that earlier
+    repeats (e.g. optimization) do not change the work done later.
+    """
+    times, peak = [], None
+    for _ in range(config['repeats']):
+        m = method.build(train, num_inducing)
+        if tracemalloc is not None:
+            tracemalloc.start()
+        t_st = time.time()
+        phase(m, test, config)
+        times.append(time.time() - t_st)
+        if tracemalloc is not None:
+            peak = max(peak or 0, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return np.array(times), peak
+
+def run(config):
+    results = []
+    for method_cls, input_dim, num_data in itertools.product(config['methods'], config['input_dim'], config['num_data']):
+        method = method_cls()
+        if not method.supports(input_dim):
+            continue
+        dataset = method.task(num_data, input_dim, num_test=config['num_test'])
+        dataset.load_data()
+        train, test = dataset.get_training_data(), dataset.get_test_data()
+        for num_inducing in (config['num_inducing'] if method.sparse else [None]):
+            print('Benchmarking '+method.name+' on '+dataset.name+('' if num_inducing is None else ' M=%i' % num_inducing), end='')
+            phases = {}
+            for phase_name, phase in config['phases']:
+                times, peak = time_phase(method, phase, train, test, num_inducing, config)
+                if phase_name == 'optimize':
+                    times = times/config['optimize_iters']
+                phases[phase_name] = {'time_mean':times.mean(), 'time_min':times.min(),
+                                      'time_std':times.std(), 'peak_memory':peak}
+                print('.', end='')
+            print()
+            results.append({'model':method.name, 'task':dataset.name, 'num_data':num_data,
+                            'num_inducing':num_inducing, 'input_dim':input_dim,
+                            'num_test':config['num_test'], 'phases':phases})
+    return results
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='GPy training and prediction throughput benchmark')
+    parser.add_argument('--quick', action='store_true', help='small sweep, e.g. for a smoke test')
+    parser.add_argument('--outpath', default=outpath, help='directory of the JSON report')
+    args = parser.parse_args()
+
+    if args.quick:
+        config.update(quick_config)
+    config['environment'] = {'gpy':GPy.__version__, 'numpy':np.__version__, 'python':platform.python_version(),
+                             'platform':platform.platform(), 'date':time.strftime('%Y-%m-%dT%H:%M:%S'),
+                             'repeats':config['repeats'], 'optimize_iters':config['optimize_iters']}
+    config['outputs'] = [ScreenOutput(), JSONOutput(args.outpath, prjname)]
+
+    results = run(config)
+    [out.output(config, results) for out in config['outputs']]
@@ -0,0 +1,70 @@
+# Copyright (c) 2016, GPy authors (see AUTHORS.txt).
+# Licensed under the BSD 3-clause license (see LICENSE.txt)
+
+import abc
+import numpy as np
+
+class SyntheticTask(object):
+    """
+    Self-contained synthetic data set, so the benchmark does not need network access.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self, num_data, input_dim, num_test=1000, seed=0):
+        self.num_data = num_data
+        self.input_dim = input_dim
+        self.num_test = num_test
+        self.seed = seed
+
+    @property
+    def name(self):
+        return '{}(N={},D={})'.format(self.__class__.__name__, self.num_data, self.input_dim)
+
+    def load_data(self):
+        rs = np.random.RandomState(self.seed)
+        X = self._inputs(rs, self.num_data)
+        self.train = (X, self._outputs(rs, X))
+        Xtest = self._inputs(rs, self.num_test)
+        self.test = (Xtest, self._outputs(rs, Xtest))
+        return True
+
+    def get_training_data(self):
+        return self.train
+
+    def get_test_data(self):
+        return self.test
+
+    @abc.abstractmethod
+    def _inputs(self, rs, num_data):
+        """Draw num_data inputs of dimension input_dim"""
+        return None
+
+    @abc.abstractmethod
+    def _outputs(self, rs, X):
+        """Noisy observations at the inputs X"""
+        return None
+
+class SinusoidRegression(SyntheticTask):
+    "Sum of sinusoids over uniform inputs, one output"
+
+    def _inputs(self, rs, num_data):
+        return rs.uniform(-3., 3., (num_data, self.input_dim))
+
+    def _outputs(self, rs, X):
+        frequencies = np.linspace(1., 2., self.input_dim)
+        f = np.sin(X*frequencies).sum(1)[:, None]/np.sqrt(self.input_dim)
+        return f + 0.1*rs.randn(X.shape[0], 1)
+
+class LatentEmbedding(SyntheticTask):
+    """
+    High dimensional observations generated from a low dimensional
+    latent space (of dimension input_dim), for latent variable models.
+    """
+    output_dim = 10
+
+    def _inputs(self, rs, num_data):
+        return rs.randn(num_data, self.input_dim)
+
+    def _outputs(self, rs, X):
+        W = np.random.RandomState(self.seed+1).randn(self.input_dim, self.output_dim)
+        return np.tanh(np.dot(X, W)) + 0.05*rs.randn(X.shape[0], self.output_dim)